@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Path A Execution Mode Comparison
+
+Runs the same M12b sample through every way the orchestrator can label a
+keyword R/S/C/N and compares accuracy, tokens, cost and latency, so the
+fastest mode that holds accuracy can be picked:
+
+    m12b        one M12b call per keyword (combined decision tree)
+    m12b_pack   M12b batch prompt, keywords packed by product context (--pack)
+    cascade     sequential Path A per keyword, M12 -> M13 -> M14/M15 -> M16
+                with early exit (--cascade)
+    fused       M12 per pack, then M13-M16 in one call per pack (--fused)
+
+Each mode is an `orchestrator.py run --module m12b --jsonl` subprocess with
+its own results directory (and LLM_CACHE=0, so no mode reads another's
+responses; with --mock also LLM_TRACES=0, keeping mock calls out of the
+trace report); per-record rows come from the JSONL sidecar. Per mode:
+- accuracy overall and per gold label (R/S/C/N), failed rows
+- LLM calls, prompt/completion tokens and cost per record
+- run time (orchestrator's own timer) and records/sec
+- p50/p95 time per record: a cascade record's steps summed, a packed
+  record's call time(s)
+
+The recommendation is the fastest mode whose accuracy is within
+--tolerance of the most accurate one. Runs are appended to
+benchmarks/results/path_a_history.json.
+
+By default the configured provider is called (real tokens and cost). With
+--mock the modes run against scripts/llm/mock_server.py instead: answers come
+from the dataset gold, so accuracy is not meaningful there, but calls,
+tokens and throughput are.
+
+Usage:
+    python benchmarks/compare_path_a.py --samples 200 --parallel 20
+    python benchmarks/compare_path_a.py --modes cascade,fused --samples 100 --model gpt-4o-mini
+    python benchmarks/compare_path_a.py --mock --latency lognormal:0.8,0.4
+    python benchmarks/compare_path_a.py --samples 200 --results-dir experiment_results/path_a_compare
+"""
+
+import argparse
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from run_benchmarks import (
+    PROJECT_ROOT, SCRIPTS_DIR, git_revision, load_history, percentile, read_jsonl, save_history,
+)
+
+from config import DEFAULT_MODEL
+
+HISTORY_FILE = Path(__file__).parent / "results" / "path_a_history.json"
+
+MODULE = "m12b"
+LABELS = ("R", "S", "C", "N")
+
+# mode -> extra orchestrator arguments
+MODES: Dict[str, List[str]] = {
+    "m12b": [],
+    "m12b_pack": ["--pack"],
+    "cascade": ["--cascade"],
+    "fused": ["--fused"],
+}
+
+DEFAULT_TOLERANCE = 0.01  # Accuracy (absolute) a faster mode may give up
+
+COMPLETED_LINE = re.compile(r"Completed in ([\d.]+)s \((\d+) calls")
+
+
+# ============================================================================
+# Modes
+# ============================================================================
+
+def run_mode(mode: str, args, results_dir: Path, env: dict) -> dict:
+    """Run one mode through the orchestrator and summarize its JSONL rows."""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        sys.executable, str(SCRIPTS_DIR / "orchestrator.py"), "run",
+        "--module", MODULE,
+        "--samples", str(args.samples),
+        "--parallel", str(args.parallel),
+        "--model", args.model,
+        "--version", f"compare_{mode}",
+        "--jsonl",
+        *MODES[mode],
+    ]
+    if mode in ("m12b_pack", "fused"):
+        cmd += ["--pack-size", str(args.pack_size)]
+    start = time.perf_counter()
+    proc = subprocess.run(
+        cmd, cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env=dict(env, EXPERIMENT_RESULTS_DIR=str(results_dir)),
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return {"status": "failed", "reason": f"orchestrator exited {proc.returncode}: {proc.stderr.strip()[-500:]}"}
+
+    rows = [row for path in results_dir.rglob("*.jsonl") for row in read_jsonl(path)]
+    completed = COMPLETED_LINE.search(proc.stdout)
+    if not rows or not completed:
+        return {"status": "failed", "reason": f"no results: {proc.stdout.strip()[-500:]}"}
+    return {"status": "ok", **summarize_rows(rows, float(completed.group(1)), int(completed.group(2)), wall)}
+
+
+def summarize_rows(rows: List[dict], run_seconds: float, calls: int, wall: float) -> dict:
+    """Accuracy, tokens, cost and latency of one mode's result rows."""
+    records = len(rows)
+    expected = Counter()
+    correct = Counter()
+    for row in rows:
+        label = (row.get("expected") or {}).get("relevancy")
+        expected[label] += 1
+        if row.get("comparison", {}).get("match"):
+            correct[label] += 1
+
+    def total(name: str) -> float:
+        return sum(row.get(name) or 0 for row in rows)
+
+    durations = [row.get("duration") or 0.0 for row in rows]
+    return {
+        "records": records,
+        "accuracy": round(sum(correct.values()) / records, 4),
+        "label_accuracy": {
+            label: round(correct[label] / expected[label], 4) for label in LABELS if expected[label]
+        },
+        "errors": sum(1 for row in rows if "error" in (row.get("output") or {})),
+        "calls": calls,
+        "calls_per_record": round(calls / records, 3),
+        "prompt_tokens_per_record": round(total("prompt_tokens") / records, 1),
+        "completion_tokens_per_record": round(total("completion_tokens") / records, 1),
+        "tokens_per_record": round(total("total_tokens") / records, 1),
+        "cost": round(total("estimated_cost"), 6),
+        "run_seconds": run_seconds,
+        "wall_seconds": round(wall, 3),
+        "records_per_sec": round(records / run_seconds, 2) if run_seconds else None,
+        "latency_p50_ms": round(percentile(durations, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(durations, 95) * 1000, 1),
+    }
+
+
+def recommend(results: Dict[str, dict], tolerance: float) -> Optional[str]:
+    """Fastest mode (records/sec) within `tolerance` of the best accuracy."""
+    finished = {mode: m for mode, m in results.items() if m.get("status") == "ok" and m.get("records_per_sec")}
+    if not finished:
+        return None
+    best = max(m["accuracy"] for m in finished.values())
+    holding = {mode: m for mode, m in finished.items() if m["accuracy"] >= best - tolerance}
+    return max(holding, key=lambda mode: holding[mode]["records_per_sec"])
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    def fmt(value):
+        return "-" if value is None else str(value)
+
+    columns = [
+        ("Mode", 11), ("Status", 8), ("Acc", 8), ("R/S/C/N acc", 25), ("Err", 5), ("Calls", 7),
+        ("Tok/rec", 9), ("Cost $", 10), ("Run s", 8), ("Rec/s", 8), ("p50 ms", 9), ("p95 ms", 9),
+    ]
+    print("".join(title.ljust(width) for title, width in columns))
+    print("-" * sum(width for _, width in columns))
+    for mode, m in results.items():
+        labels = m.get("label_accuracy") or {}
+        values = [
+            mode, m.get("status"), m.get("accuracy"),
+            "/".join(fmt(labels.get(label)) for label in LABELS) if labels else None,
+            m.get("errors"), m.get("calls"), m.get("tokens_per_record"), m.get("cost"),
+            m.get("run_seconds"), m.get("records_per_sec"), m.get("latency_p50_ms"), m.get("latency_p95_ms"),
+        ]
+        print("".join(fmt(v).ljust(width) for v, (_, width) in zip(values, columns)))
+        if m.get("status") != "ok":
+            print(f"  {m.get('reason')}")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare M12b, sequential Path A (cascade) and fused Path A on the same sample",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmarks/compare_path_a.py --samples 200 --parallel 20
+  python benchmarks/compare_path_a.py --modes cascade,fused --samples 100
+  python benchmarks/compare_path_a.py --mock --latency lognormal:0.8,0.4
+        """
+    )
+    parser.add_argument("--modes", default=",".join(MODES),
+                        help=f"Comma-separated modes (default: all: {', '.join(MODES)})")
+    parser.add_argument("--samples", "-n", type=int, default=100, help="M12b records per mode (default: 100)")
+    parser.add_argument("--parallel", "-p", type=int, default=10, help="Concurrent LLM calls (default: 10)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model for every mode (default: {DEFAULT_MODEL})")
+    parser.add_argument("--pack-size", type=int, default=50, help="Max keywords per packed call (default: 50)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Accuracy a faster mode may give up (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--mock", action="store_true", help="Run against the offline mock provider")
+    parser.add_argument("--latency", default="lognormal:0.8,0.4",
+                        help="Mock latency (--mock): fixed:S | uniform:A,B | normal:MU,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--results-dir", type=Path,
+                        help="Keep each mode's experiment results under DIR/<mode> (default: temporary)")
+    parser.add_argument("--history-file", type=Path, default=HISTORY_FILE,
+                        help="JSON history file (default: benchmarks/results/path_a_history.json)")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history")
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+
+    env = dict(os.environ, LLM_CACHE="0", PYTHONUNBUFFERED="1")
+    server = None
+    if args.mock:
+        from llm.mock_server import MockConfig, start_mock_server
+
+        server, base_url = start_mock_server(MockConfig(latency=args.latency))
+        env.update(OPENAI_BASE_URL=base_url, OPENAI_API_KEY="mock", LLM_TRACES="0")
+        print(f"Mock provider: {base_url} (latency={args.latency})")
+    print(f"Modes: {', '.join(modes)} | {MODULE} samples={args.samples} parallel={args.parallel} model={args.model}\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="compare_path_a_") as tmp:
+        base_dir = args.results_dir or Path(tmp)
+        try:
+            for mode in modes:
+                print(f"▶ {mode}...", flush=True)
+                results[mode] = run_mode(mode, args, base_dir / mode, env)
+        finally:
+            if server:
+                server.shutdown()
+
+    print()
+    print_table(results)
+    choice = recommend(results, args.tolerance)
+    print()
+    if choice:
+        best = max(m["accuracy"] for m in results.values() if m.get("status") == "ok")
+        print(f"Fastest mode within {args.tolerance:.1%} of the best accuracy ({best:.1%}): {choice}")
+    else:
+        print("No mode finished.")
+
+    if not args.no_save:
+        history = load_history(args.history_file)
+        history.append({
+            "timestamp": datetime.now().isoformat(),
+            "git_sha": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "samples": args.samples,
+                "parallel": args.parallel,
+                "model": args.model,
+                "pack_size": args.pack_size,
+                "provider": f"mock:{args.latency}" if args.mock else "api",
+            },
+            "modes": results,
+            "recommended": choice,
+        })
+        save_history(args.history_file, history)
+        print(f"History: {args.history_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,620 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+
+Runs the main entry points against the offline mock provider
+(scripts/llm/mock_server.py) and records, per case:
+- records/sec (wall clock)
+- p50/p95/p99 latency per record (ms)
+- tokens per record
+- peak RSS of the case process and its children (MB)
+
+Cases:
+    orchestrator      scripts/orchestrator.py run (subprocess, --jsonl sidecar)
+    batch_generate    scripts/batch/generate_batch_requests.py generate_module_batch()
+    judge_eval        evaluation_KD/evaluation_experimentV5/run_evaluation_v2.py run_evaluation()
+    scorers           scorers/braintrust_scorers.py *_handler functions
+    dashboard_update  tracking_dashboard/scripts/update_all.py (on a sandbox copy)
+
+A "record" is one LLM call for orchestrator/judge_eval, one batch request for
+batch_generate, one handler call for scorers and one judge-results file for
+dashboard_update (whose latency is per pipeline step).
+
+Each case runs in its own worker process, so peak RSS is per case and nothing
+is written to the repo: experiment results, judge results, batch files and
+dashboard data all go to a scratch directory. Every run is appended to
+benchmarks/results/history.json and compared with the last run of the same
+case with the same parameters; a >10% drop in records/sec or rise in p95/p99
+latency, tokens per record or peak RSS is reported as a regression.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --cases orchestrator,judge_eval --samples 200
+    python benchmarks/run_benchmarks.py --latency lognormal:0.4,0.5 --parallel 20
+    python benchmarks/run_benchmarks.py --fail-on-regression   # CI: exit 1 on regression
+    python benchmarks/run_benchmarks.py --no-save              # don't append to history
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARKS_DIR = Path(__file__).parent
+PROJECT_ROOT = BENCHMARKS_DIR.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+DATASETS_DIR = PROJECT_ROOT / "datasets" / "single"
+PROMPTS_DIR = PROJECT_ROOT / "prompts" / "modules" / "single"
+SCHEMAS_DIR = PROJECT_ROOT / "prompts" / "json_schemas" / "single"
+EVALUATION_DIR = PROJECT_ROOT / "evaluation_KD" / "evaluation_experimentV5"
+SCORERS_DIR = PROJECT_ROOT / "scorers"
+TRACKING_DIR = PROJECT_ROOT / "tracking_dashboard"
+HISTORY_FILE = BENCHMARKS_DIR / "results" / "history.json"
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+# Worker -> parent: last stdout line starting with this marker carries the metrics
+RESULT_MARKER = "BENCHMARK_RESULT "
+
+# Relative change that counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+# metric -> True if higher is better
+TRACKED_METRICS = {
+    "records_per_sec": True,
+    "latency_p95_ms": False,
+    "latency_p99_ms": False,
+    "tokens_per_record": False,
+    "peak_rss_mb": False,
+}
+
+# Latency changes below this are timer noise, not regressions
+MIN_LATENCY_MS = 1.0
+
+CHARS_PER_TOKEN = 4  # Same heuristic as llm/rate_limiter.py
+
+
+class SkipCase(Exception):
+    """Case cannot run in this environment (missing optional dependency/data)."""
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for an empty list)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(latencies: List[float], wall: float, records: int,
+              tokens: Optional[int] = None, errors: int = 0) -> dict:
+    """Case metrics from per-record latencies (seconds) and the wall time."""
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "records": records,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "records_per_sec": round(records / wall, 2) if wall > 0 else None,
+        "latency_p50_ms": ms(percentile(latencies, 50)),
+        "latency_p95_ms": ms(percentile(latencies, 95)),
+        "latency_p99_ms": ms(percentile(latencies, 99)),
+        "tokens_per_record": round(tokens / records, 1) if tokens is not None and records else None,
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak RSS of this process or any waited-for child, in MB."""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is KB on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def read_jsonl(path: Path, limit: Optional[int] = None) -> List[dict]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if limit is not None and len(records) >= limit:
+                break
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+def find_module_file(directory: Path, module_id: str, suffix: str) -> Path:
+    """First `{module_id}_*{suffix}` file (sorted), e.g. m13_v1_check_product_type.jsonl."""
+    matches = sorted(directory.glob(f"{module_id}_*{suffix}"))
+    if not matches:
+        raise SkipCase(f"no {module_id} file in {directory.relative_to(PROJECT_ROOT)}")
+    return matches[0]
+
+
+# ============================================================================
+# Cases (run inside the worker process)
+# ============================================================================
+
+def bench_orchestrator(args, workdir: Path) -> dict:
+    """orchestrator.py run as a subprocess; per-record metrics from the JSONL sidecar."""
+    cmd = [
+        sys.executable, str(SCRIPTS_DIR / "orchestrator.py"), "run",
+        "--module", args.module,
+        "--samples", str(args.samples),
+        "--parallel", str(args.parallel),
+        "--version", "bench",
+        "--jsonl",
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"orchestrator exited {proc.returncode}: {proc.stderr.strip()[-500:]}")
+
+    results_dir = Path(os.environ["EXPERIMENT_RESULTS_DIR"])
+    rows = [row for path in results_dir.rglob("*.jsonl") for row in read_jsonl(path)]
+    if not rows:
+        raise RuntimeError(f"orchestrator wrote no results: {proc.stdout.strip()[-500:]}")
+
+    errors = sum(1 for row in rows if isinstance(row.get("output"), dict) and "error" in row["output"])
+    return summarize(
+        [row.get("duration") or 0.0 for row in rows],
+        wall,
+        len(rows),
+        tokens=sum(row.get("total_tokens") or 0 for row in rows),
+        errors=errors,
+    )
+
+
+def bench_batch_generate(args, workdir: Path) -> dict:
+    """generate_module_batch() on the first --samples records of the module dataset."""
+    sys.path.insert(0, str(SCRIPTS_DIR / "batch"))
+    import generate_batch_requests as gbr
+
+    dataset_path = find_module_file(DATASETS_DIR, args.module, ".jsonl")
+    prompt_path = find_module_file(PROMPTS_DIR, args.module, ".md")
+    schema_path = find_module_file(SCHEMAS_DIR, args.module, ".json")
+
+    # Truncated dataset copy so --samples applies
+    datasets_dir = workdir / "datasets"
+    (datasets_dir / "single").mkdir(parents=True)
+    with open(dataset_path, "r", encoding="utf-8") as src, \
+            open(datasets_dir / "single" / dataset_path.name, "w", encoding="utf-8") as dst:
+        for idx, line in enumerate(src):
+            if idx >= args.samples:
+                break
+            dst.write(line)
+    gbr.DATASETS_DIR = datasets_dir
+    gbr.PROMPTS_DIR = PROMPTS_DIR.parent
+    gbr.SCHEMAS_DIR = SCHEMAS_DIR.parent
+
+    # Per-record latency: template fill through request build
+    latencies = []
+    started = []
+    fill_prompt_template = gbr.fill_prompt_template
+    create_batch_request = gbr.create_batch_request
+
+    def timed_fill(*fargs, **fkwargs):
+        started.append(time.perf_counter())
+        return fill_prompt_template(*fargs, **fkwargs)
+
+    def timed_create(*cargs, **ckwargs):
+        request = create_batch_request(*cargs, **ckwargs)
+        latencies.append(time.perf_counter() - started[-1])
+        return request
+
+    gbr.fill_prompt_template = timed_fill
+    gbr.create_batch_request = timed_create
+
+    output_dir = workdir / "batch_requests"
+    output_dir.mkdir()
+    config = {
+        "name": args.module,
+        "dataset": f"single/{dataset_path.name}",
+        "prompt": f"single/{prompt_path.name}",
+        "schema": f"single/{schema_path.name}",
+    }
+    start = time.perf_counter()
+    result = gbr.generate_module_batch(args.module, config, output_dir)
+    wall = time.perf_counter() - start
+    if result.get("status") != "success":
+        raise RuntimeError(result.get("error", "batch generation failed"))
+
+    tokens = 0
+    for request in read_jsonl(Path(result["output_file"])):
+        for message in request["body"].get("messages", []):
+            tokens += estimate_tokens(message.get("content") or "")
+    return summarize(latencies, wall, result["records"], tokens=tokens)
+
+
+def bench_judge_eval(args, workdir: Path) -> dict:
+    """run_evaluation() for one module; every judge call is a record."""
+    sys.path.insert(0, str(EVALUATION_DIR))
+    import run_evaluation_v2 as evaluation
+
+    evaluation.OUTPUT_DIR = workdir / "judge_results"
+    evaluation.add_run_to_history = None
+
+    # Tee the engine's results to collect per-call latency/usage
+    calls = []
+    engine = evaluation.get_engine()
+    iter_results = engine.iter_results
+
+    def tee(requests, concurrency=None):
+        for idx, result in iter_results(requests, concurrency):
+            calls.append(result)
+            yield idx, result
+
+    engine.iter_results = tee
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = evaluation.run_evaluation(args.eval_module, limit=args.samples, parallel=args.parallel)
+    wall = time.perf_counter() - start
+    if not output:
+        raise SkipCase(f"no experiment CSV for {args.eval_module}")
+
+    return summarize(
+        [call.duration for call in calls],
+        wall,
+        len(calls),
+        tokens=sum(call.total_tokens for call in calls),
+        errors=sum(1 for call in calls if not call.ok),
+    )
+
+
+def bench_scorers(args, workdir: Path) -> dict:
+    """Every *_handler in braintrust_scorers.py on its module's expected outputs."""
+    sys.path.insert(0, str(SCORERS_DIR))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import braintrust_scorers as scorers
+    except ImportError as e:
+        raise SkipCase(f"braintrust_scorers not importable: {e}")
+
+    handlers = [
+        (name, handler) for name, handler in vars(scorers).items()
+        if name.endswith("_handler") and callable(handler)
+    ]
+    expected_by_module: Dict[str, List[dict]] = {}
+    latencies = []
+    errors = 0
+
+    start = time.perf_counter()
+    for name, handler in handlers:
+        match = re.match(r"m(\d+)_", name)
+        if not match:
+            continue
+        module_id = f"m{int(match.group(1)):02d}"
+        if module_id not in expected_by_module:
+            try:
+                dataset_path = find_module_file(DATASETS_DIR, module_id, ".jsonl")
+            except SkipCase:
+                expected_by_module[module_id] = []
+            else:
+                expected_by_module[module_id] = [
+                    record.get("expected") or {} for record in read_jsonl(dataset_path, args.samples)
+                ]
+        for expected in expected_by_module[module_id]:
+            call_start = time.perf_counter()
+            try:
+                handler(dict(expected), expected)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - call_start)
+    wall = time.perf_counter() - start
+
+    return summarize(latencies, wall, len(latencies), errors=errors)
+
+
+def bench_dashboard_update(args, workdir: Path) -> dict:
+    """update_all.py on a copy of tracking_dashboard/ (judge results, results and scripts/ read via symlink)."""
+    sandbox = workdir / "project"
+    shutil.copytree(TRACKING_DIR, sandbox / "tracking_dashboard",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    for name in ("evaluation_KD", "experiment_results", "scripts"):  # scripts/: pricing registry
+        (sandbox / name).symlink_to(PROJECT_ROOT / name, target_is_directory=True)
+
+    judge_files = len(list((EVALUATION_DIR / "judge_results").glob("*.json")))
+
+    sys.path.insert(0, str(sandbox / "tracking_dashboard" / "scripts"))
+    import update_all
+
+    latencies = []
+    run_script = update_all.run_script
+
+    def timed_run_script(*rargs, **rkwargs):
+        step_start = time.perf_counter()
+        outcome = run_script(*rargs, **rkwargs)
+        latencies.append(time.perf_counter() - step_start)
+        return outcome
+
+    update_all.run_script = timed_run_script
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        sys.argv = ["update_all.py"]
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) as captured:
+                update_all.main()
+        except SystemExit as e:
+            if e.code:
+                raise RuntimeError(f"update_all failed: {captured.getvalue().strip()[-500:]}")
+    wall = time.perf_counter() - start
+
+    return summarize(latencies, wall, judge_files * args.repeat)
+
+
+CASES: Dict[str, Callable] = {
+    "orchestrator": bench_orchestrator,
+    "batch_generate": bench_batch_generate,
+    "judge_eval": bench_judge_eval,
+    "scorers": bench_scorers,
+    "dashboard_update": bench_dashboard_update,
+}
+
+
+def run_worker(args) -> None:
+    """Run one case in this process and print its metrics for the parent."""
+    workdir = Path(args.workdir)
+    try:
+        metrics = CASES[args.worker](args, workdir)
+        metrics["status"] = "ok"
+    except SkipCase as e:
+        metrics = {"status": "skipped", "reason": str(e)}
+    except Exception as e:
+        metrics = {"status": "failed", "reason": f"{type(e).__name__}: {e}"}
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    print(RESULT_MARKER + json.dumps(metrics), flush=True)
+
+
+# ============================================================================
+# Runner (parent process)
+# ============================================================================
+
+def run_case(name: str, args, base_url: str) -> dict:
+    """Run a case in a fresh worker process against the mock server."""
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as tmp:
+        workdir = Path(tmp)
+        env = dict(
+            os.environ,
+            OPENAI_BASE_URL=base_url,
+            OPENAI_API_KEY="mock",
+            LLM_CACHE="0",
+            LLM_TRACES="0",  # Mock calls must not reach the real trace store / report
+            EXPERIMENT_RESULTS_DIR=str(workdir / "experiment_results"),
+            PYTHONUNBUFFERED="1",
+        )
+        cmd = [
+            sys.executable, str(Path(__file__).resolve()),
+            "--worker", name,
+            "--workdir", str(workdir),
+            "--module", args.module,
+            "--eval-module", args.eval_module,
+            "--samples", str(args.samples),
+            "--parallel", str(args.parallel),
+            "--repeat", str(args.repeat),
+        ]
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    return {"status": "failed", "reason": f"worker exited {proc.returncode}: {proc.stderr.strip()[-500:]}"}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True)
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+# ============================================================================
+# History
+# ============================================================================
+
+def load_history(path: Path) -> List[dict]:
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path: Path, history: List[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def previous_metrics(history: List[dict], case: str, params: dict) -> Optional[dict]:
+    """Most recent successful metrics for `case` run with the same parameters."""
+    for run in reversed(history):
+        metrics = run.get("cases", {}).get(case)
+        if run.get("params") == params and metrics and metrics.get("status") == "ok":
+            return {**metrics, "git_sha": run.get("git_sha"), "timestamp": run.get("timestamp")}
+    return None
+
+
+def find_regressions(case: str, current: dict, baseline: dict, threshold: float) -> List[str]:
+    regressions = []
+    for metric, higher_is_better in TRACKED_METRICS.items():
+        new, old = current.get(metric), baseline.get(metric)
+        if not new or not old:
+            continue
+        if metric.startswith("latency_") and max(new, old) < MIN_LATENCY_MS:
+            continue
+        change = (new - old) / old
+        if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+            regressions.append(
+                f"{case}: {metric} {old} -> {new} ({change:+.1%}) vs {baseline.get('git_sha') or 'previous run'}"
+            )
+    return regressions
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    def fmt(value):
+        return "-" if value is None else str(value)
+
+    columns = [
+        ("Case", 18), ("Status", 8), ("Records", 8), ("Rec/s", 9), ("p50 ms", 9),
+        ("p95 ms", 9), ("p99 ms", 9), ("Tok/rec", 8), ("RSS MB", 8),
+    ]
+    print("".join(title.ljust(width) for title, width in columns))
+    print("-" * sum(width for _, width in columns))
+    for name, m in results.items():
+        values = [
+            name, m.get("status"), m.get("records"), m.get("records_per_sec"), m.get("latency_p50_ms"),
+            m.get("latency_p95_ms"), m.get("latency_p99_ms"), m.get("tokens_per_record"), m.get("peak_rss_mb"),
+        ]
+        print("".join(fmt(v).ljust(width) for v, (_, width) in zip(values, columns)))
+        if m.get("status") != "ok":
+            print(f"  {m.get('reason')}")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the main entry points against the offline mock provider",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmarks/run_benchmarks.py
+  python benchmarks/run_benchmarks.py --cases orchestrator,judge_eval --samples 200
+  python benchmarks/run_benchmarks.py --latency lognormal:0.4,0.5 --parallel 20
+  python benchmarks/run_benchmarks.py --fail-on-regression
+        """
+    )
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help=f"Comma-separated cases (default: all: {', '.join(CASES)})")
+    parser.add_argument("--module", default="m13", help="Module for orchestrator/batch_generate (default: m13)")
+    parser.add_argument("--eval-module", default="m13",
+                        help="run_evaluation_v2 module key for judge_eval (default: m13)")
+    parser.add_argument("--samples", "-n", type=int, default=100, help="Records per case (default: 100)")
+    parser.add_argument("--parallel", "-p", type=int, default=10, help="Concurrent LLM calls (default: 10)")
+    parser.add_argument("--repeat", type=int, default=3, help="dashboard_update pipeline runs (default: 3)")
+    parser.add_argument("--latency", default="fixed:0.05",
+                        help="Mock latency: fixed:S | uniform:A,B | normal:MU,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock 5xx rate")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Mock 429 rate")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Relative change reported as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--history-file", type=Path, default=HISTORY_FILE,
+                        help="JSON history file (default: benchmarks/results/history.json)")
+    parser.add_argument("--no-save", action="store_true", help="Don't append this run to the history")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any regression is found")
+    parser.add_argument("--worker", choices=list(CASES), help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    from llm.mock_server import MockConfig, start_mock_server
+
+    mock_config = MockConfig(latency=args.latency, error_rate=args.error_rate,
+                             rate_limit_rate=args.rate_limit_rate)
+    server, base_url = start_mock_server(mock_config)
+
+    params = {
+        "module": args.module,
+        "eval_module": args.eval_module,
+        "samples": args.samples,
+        "parallel": args.parallel,
+        "repeat": args.repeat,
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+    }
+    print(f"Mock provider: {base_url} (latency={args.latency})")
+    print(f"Cases: {', '.join(cases)} | samples={args.samples} parallel={args.parallel}\n")
+
+    results = {}
+    try:
+        for name in cases:
+            print(f"▶ {name}...", flush=True)
+            results[name] = run_case(name, args, base_url)
+    finally:
+        server.shutdown()
+
+    print()
+    print_table(results)
+
+    history = load_history(args.history_file)
+    regressions = []
+    for name, metrics in results.items():
+        if metrics.get("status") != "ok":
+            continue
+        baseline = previous_metrics(history, name, params)
+        if baseline:
+            regressions.extend(find_regressions(name, metrics, baseline, args.threshold))
+
+    print()
+    if regressions:
+        print(f"⚠ {len(regressions)} regression(s) (threshold {args.threshold:.0%}):")
+        for line in regressions:
+            print(f"  - {line}")
+    else:
+        print("No regressions against the previous run with the same parameters.")
+
+    if not args.no_save:
+        history.append({
+            "timestamp": datetime.now().isoformat(),
+            "git_sha": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+            "cases": results,
+        })
+        save_history(args.history_file, history)
+        print(f"History: {args.history_file}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
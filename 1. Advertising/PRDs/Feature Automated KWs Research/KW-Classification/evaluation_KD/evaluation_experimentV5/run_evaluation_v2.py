@@ -20,8 +20,6 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
-from openai import OpenAI
-
 # Import progress tracker for auto-history
 try:
     from progress_tracker import add_run_to_history
@@ -36,6 +34,10 @@ EXPERIMENT_DATA_DIR = PROJECT_ROOT / "experiment_results"
 OUTPUT_DIR = SCRIPT_DIR / "judge_results"
 CONFIG_DIR = EVALUATION_KD_DIR / "config"
 
+# Shared LLM engine lives in <project_root>/scripts/llm
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+from llm import LLMEngine, LLMRequest, LLMResult, get_engine
+
 # Module to CSV file mapping - ALL MODULES M01-M16
 MODULE_CSV_MAP = {
     # ==========================================================================
@@ -493,29 +495,37 @@ Return ONLY a JSON object with this exact format:
 """
 
 
-def run_judge(client: OpenAI, rubric: dict, input_data: dict, expected: dict, output: dict, model: str) -> dict:
-    """Run the LLM judge for a single rubric evaluation."""
+def build_judge_request(rubric: dict, input_data: dict, expected: dict, output: dict, model: str) -> LLMRequest:
+    """Build the engine request for a single rubric evaluation."""
     prompt = create_judge_prompt(rubric, input_data, expected, output)
+    return LLMRequest.from_prompt(
+        prompt,
+        model=model,
+        temperature=0,
+        response_format={"type": "json_object"},
+        metadata={"module": f"judge:{rubric.get('module', '')}"},
+    )
+
 
+def parse_judge_result(llm_result: LLMResult) -> dict:
+    """Parse an engine result into a verdict dict."""
+    if not llm_result.ok:
+        return {'verdict': 'ERROR', 'reasoning': llm_result.error, 'tokens': 0}
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0
-        )
-        result = json.loads(response.choices[0].message.content)
-        return {
-            'verdict': result.get('verdict', 'ERROR'),
-            'reasoning': result.get('reasoning', ''),
-            'tokens': response.usage.total_tokens if response.usage else 0
-        }
-    except Exception as e:
-        return {
-            'verdict': 'ERROR',
-            'reasoning': str(e),
-            'tokens': 0
-        }
+        result = json.loads(llm_result.content)
+    except (TypeError, json.JSONDecodeError) as e:
+        return {'verdict': 'ERROR', 'reasoning': str(e), 'tokens': 0}
+    return {
+        'verdict': result.get('verdict', 'ERROR'),
+        'reasoning': result.get('reasoning', ''),
+        'tokens': llm_result.total_tokens,
+    }
+
+
+def run_judge(engine: LLMEngine, rubric: dict, input_data: dict, expected: dict, output: dict, model: str) -> dict:
+    """Run the LLM judge for a single rubric evaluation."""
+    request = build_judge_request(rubric, input_data, expected, output, model)
+    return parse_judge_result(engine.complete(request))
 
 
 def run_evaluation(
@@ -523,7 +533,8 @@ def run_evaluation(
     rubric_id: Optional[str] = None,
     limit: int = 10,
     judge_model: str = "gpt-4o-mini",
-    rubrics_version: str = DEFAULT_RUBRICS_VERSION
+    rubrics_version: str = DEFAULT_RUBRICS_VERSION,
+    parallel: int = 10,
 ) -> dict:
     """Run the full evaluation for a module."""
 
@@ -564,48 +575,60 @@ def run_evaluation(
     data = data[:limit]
     print(f"Samples to evaluate: {len(data)}")
 
-    # Initialize OpenAI
+    # Shared engine (pooled client)
     load_env()
-    client = OpenAI()
+    engine = get_engine()
+
+    # One judge call per (sample, rubric) - all independent
+    jobs = []
+    for idx, record in enumerate(data):
+        for rubric in rubrics:
+            jobs.append((idx, record, rubric))
+
+    requests = [
+        build_judge_request(
+            rubric,
+            record.get('input', {}),
+            record.get('expected', {}),
+            record.get('output', {}),
+            judge_model,
+        )
+        for _, record, rubric in jobs
+    ]
+
+    print(f"Running {len(requests)} judge calls (parallel={parallel})...")
 
     # Run evaluations
-    all_evaluations = []
+    all_evaluations = [None] * len(jobs)
     summary = {'pass': 0, 'fail': 0, 'error': 0}
 
-    for idx, record in enumerate(data):
+    for done, (job_idx, llm_result) in enumerate(engine.iter_results(requests, concurrency=parallel), 1):
+        idx, record, rubric = jobs[job_idx]
         asin = record.get('asin', f'sample_{idx}')
-        print(f"\n--- Sample {idx + 1}/{len(data)}: {asin} ---")
-
-        input_data = record.get('input', {})
-        expected = record.get('expected', {})
-        output = record.get('output', {})
-
-        for rubric in rubrics:
-            print(f"  Evaluating: {rubric['criterion']}...", end=" ")
-
-            result = run_judge(client, rubric, input_data, expected, output, judge_model)
-            verdict = result['verdict']
-
-            if verdict == 'PASS':
-                summary['pass'] += 1
-                print("✓ PASS")
-            elif verdict == 'FAIL':
-                summary['fail'] += 1
-                print("✗ FAIL")
-            else:
-                summary['error'] += 1
-                print("⚠ ERROR")
-
-            all_evaluations.append({
-                'sample_id': asin,
-                'rubric_id': rubric['id'],
-                'criterion': rubric['criterion'],
-                'verdict': verdict,
-                'reasoning': result['reasoning'],
-                'input': input_data,
-                'expected': expected,
-                'output': output,
-            })
+        result = parse_judge_result(llm_result)
+        verdict = result['verdict']
+
+        if verdict == 'PASS':
+            summary['pass'] += 1
+            status = "✓ PASS"
+        elif verdict == 'FAIL':
+            summary['fail'] += 1
+            status = "✗ FAIL"
+        else:
+            summary['error'] += 1
+            status = "⚠ ERROR"
+        print(f"  [{done}/{len(jobs)}] {asin} | {rubric['criterion']}: {status}")
+
+        all_evaluations[job_idx] = {
+            'sample_id': asin,
+            'rubric_id': rubric['id'],
+            'criterion': rubric['criterion'],
+            'verdict': verdict,
+            'reasoning': result['reasoning'],
+            'input': record.get('input', {}),
+            'expected': record.get('expected', {}),
+            'output': record.get('output', {}),
+        }
 
     # Calculate pass rate
     total = summary['pass'] + summary['fail']
@@ -664,6 +687,8 @@ def main():
                         help="Model for LLM judge (default: gpt-4o-mini)")
     parser.add_argument("--rubrics-version", "-v", type=str, default=DEFAULT_RUBRICS_VERSION,
                         help=f"Rubric version (default: {DEFAULT_RUBRICS_VERSION})")
+    parser.add_argument("--parallel", "-p", type=int, default=10,
+                        help="Concurrent judge calls (default: 10)")
     parser.add_argument("--list-modules", action="store_true",
                         help="List available modules")
 
@@ -691,6 +716,7 @@ def main():
                     limit=args.limit,
                     judge_model=args.judge_model,
                     rubrics_version=args.rubrics_version,
+                    parallel=args.parallel,
                 )
                 all_results[module] = result.get('pass_rate', -1)
             except Exception as e:
@@ -711,6 +737,7 @@ def main():
         limit=args.limit,
         judge_model=args.judge_model,
         rubrics_version=args.rubrics_version,
+        parallel=args.parallel,
     )
 
 
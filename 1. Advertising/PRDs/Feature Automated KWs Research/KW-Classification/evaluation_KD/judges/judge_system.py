@@ -9,16 +9,23 @@ Based on LLM Evals course best practices:
 """
 
 import json
+import sys
 from typing import Any, Optional
 from pathlib import Path
 
-import openai
 from dotenv import load_dotenv
 
 from .rubric_loader import RubricLoader
 
 load_dotenv()
 
+# Shared LLM engine lives in <project_root>/scripts/llm
+SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from llm import LLMRequest, LLMResult, get_engine
+
 
 class JudgeSystem:
     """
@@ -38,7 +45,7 @@ class JudgeSystem:
         self.loader = RubricLoader(rubric_config)
         self.use_poll = use_poll
         self.verbose = verbose
-        self.client = openai.OpenAI()
+        self.engine = get_engine()
 
     def evaluate(
         self,
@@ -157,16 +164,22 @@ Return ONLY this JSON (no other text):
 
         return prompt
 
-    def _run_single_judge(self, prompt: str, model: str) -> dict:
-        """Run evaluation with a single judge model."""
+    def _build_judge_request(self, prompt: str, model: str) -> LLMRequest:
+        """Build engine request for a judge call."""
+        return LLMRequest.from_prompt(
+            prompt,
+            model=model,
+            temperature=0.0,
+            response_format={"type": "json_object"},
+            metadata={"module": "judge"},
+        )
+
+    def _parse_judge_result(self, llm_result: LLMResult, model: str) -> dict:
+        """Parse engine result into a judge verdict."""
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.0
-            )
-            result = json.loads(response.choices[0].message.content)
+            if not llm_result.ok:
+                raise RuntimeError(llm_result.error)
+            result = json.loads(llm_result.content)
             result["judge_model"] = model
 
             # Normalize label
@@ -182,18 +195,26 @@ Return ONLY this JSON (no other text):
                 "reasoning": f"Judge error: {str(e)}"
             }
 
+    def _run_single_judge(self, prompt: str, model: str) -> dict:
+        """Run evaluation with a single judge model."""
+        llm_result = self.engine.complete(self._build_judge_request(prompt, model))
+        return self._parse_judge_result(llm_result, model)
+
     def _run_poll_evaluation(self, prompt: str, rubric_id: str) -> dict:
         """Run PoLL evaluation with 3 diverse judges, using majority vote."""
         panel = self.loader.get_poll_panel()
-        results = []
+        models = [judge_config["model"] for judge_config in panel]
+        if self.verbose:
+            print(f"  Running judges: {', '.join(models)}")
 
-        for judge_config in panel:
-            model = judge_config["model"]
-            if self.verbose:
-                print(f"  Running judge: {model}")
-
-            result = self._run_single_judge(prompt, model)
-            results.append(result)
+        # Panel judges are independent - run them concurrently
+        llm_results = self.engine.run_many(
+            [self._build_judge_request(prompt, model) for model in models]
+        )
+        results = [
+            self._parse_judge_result(llm_result, model)
+            for llm_result, model in zip(llm_results, models)
+        ]
 
         # Majority vote for binary Pass/Fail
         pass_count = sum(1 for r in results if r.get("label") == "Pass")
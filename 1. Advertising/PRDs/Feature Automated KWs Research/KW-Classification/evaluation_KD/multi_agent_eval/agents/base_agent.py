@@ -2,7 +2,7 @@
 Base Agent - Abstract base class for all multi-agent evaluation agents.
 
 Provides:
-- Unified OpenAI LLM client
+- Unified LLM access through the shared engine (scripts/llm)
 - JSON response format enforcement
 - Prompt building and response parsing
 - Error handling and logging
@@ -10,14 +10,21 @@ Provides:
 
 import json
 import os
+import sys
 from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Any, Optional
 
 import yaml
-from openai import OpenAI
 from dotenv import load_dotenv
 
+# Shared LLM engine lives in <project_root>/scripts/llm
+SCRIPTS_DIR = Path(__file__).resolve().parents[3] / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from llm import LLMRequest, get_engine
+
 
 class BaseAgent(ABC):
     """
@@ -67,8 +74,8 @@ class BaseAgent(ABC):
         else:
             self.temperature = config.get('temperatures', {}).get(agent_name, 0.3)
 
-        # Initialize OpenAI client
-        self.client = OpenAI()
+        # Shared engine (pooled client, bounded concurrency)
+        self.engine = get_engine()
 
         if self.verbose:
             print(f"[{self.__class__.__name__}] Initialized with model={self.model}, temp={self.temperature}")
@@ -176,45 +183,52 @@ class BaseAgent(ABC):
         if self.verbose:
             print(f"[{self.__class__.__name__}] Executing with prompt length: {len(prompt)}")
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=self.temperature,
-            )
-
-            raw_content = response.choices[0].message.content
-
-            if self.verbose:
-                print(f"[{self.__class__.__name__}] Raw response: {raw_content[:200]}...")
-
-            # Parse JSON response
-            try:
-                result = json.loads(raw_content)
-            except json.JSONDecodeError as e:
-                return {
-                    "error": True,
-                    "error_message": f"JSON parse error: {str(e)}",
-                    "raw_response": raw_content,
-                }
-
-            # Validate and parse through subclass method
-            parsed = self.parse_response(result)
-            parsed["_meta"] = {
-                "model": self.model,
-                "temperature": self.temperature,
-                "tokens": response.usage.total_tokens if response.usage else 0,
+        result = self.engine.complete(LLMRequest.from_prompt(
+            prompt,
+            model=self.model,
+            temperature=self.temperature,
+            response_format={"type": "json_object"},
+            metadata={"module": f"agent:{self._get_agent_name()}"},
+        ))
+
+        if not result.ok:
+            return {
+                "error": True,
+                "error_message": result.error,
             }
 
-            return parsed
+        raw_content = result.content or ""
+
+        if self.verbose:
+            print(f"[{self.__class__.__name__}] Raw response: {raw_content[:200]}...")
 
+        # Parse JSON response
+        try:
+            data = json.loads(raw_content)
+        except json.JSONDecodeError as e:
+            return {
+                "error": True,
+                "error_message": f"JSON parse error: {str(e)}",
+                "raw_response": raw_content,
+            }
+
+        # Validate and parse through subclass method
+        try:
+            parsed = self.parse_response(data)
         except Exception as e:
             return {
                 "error": True,
                 "error_message": str(e),
             }
 
+        parsed["_meta"] = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "tokens": result.total_tokens,
+        }
+
+        return parsed
+
     def _format_json(self, data: Any) -> str:
         """Format data as JSON string for prompt inclusion."""
         return json.dumps(data, indent=2, default=str)
@@ -6,10 +6,8 @@ Runs iterative experiments: Write fix → Test → Analyze failures → Improve
 Each iteration learns from previous failures and builds cumulative fixes.
 """
 
-import os
 import sys
 import json
-import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict
@@ -21,9 +19,10 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from dotenv import load_dotenv
 load_dotenv(PROJECT_ROOT / ".env")
 
-from openai import OpenAI
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+from llm import LLMRequest, get_engine
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+engine = get_engine()
 MODEL = "gpt-4o-mini"
 
 
@@ -36,19 +35,19 @@ def load_prompt(prompt_path: str) -> str:
 
 def call_gpt(prompt: str, temperature: float = 0) -> dict:
     """Call GPT model with the prompt."""
+    result = engine.complete(LLMRequest.from_prompt(
+        prompt,
+        system="You are an Amazon marketplace expert. Return valid JSON only.",
+        model=MODEL,
+        temperature=temperature,
+        response_format={"type": "json_object"},
+        metadata={"module": "iterative_experiment"},
+    ))
+    if not result.ok:
+        return {"success": False, "error": result.error}
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": "You are an Amazon marketplace expert. Return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content)
-        return {"success": True, "output": result}
-    except Exception as e:
+        return {"success": True, "output": json.loads(result.content)}
+    except (TypeError, json.JSONDecodeError) as e:
         return {"success": False, "error": str(e)}
 
 
@@ -221,8 +220,6 @@ def run_m03_iteration(base_prompt: str, fix: str, samples: List[dict], iteration
             "details": evaluation["details"]
         })
 
-        time.sleep(0.3)
-
     passed = sum(1 for r in results if r["pass"])
 
     return {
@@ -639,8 +636,6 @@ def run_m08_iteration(base_prompt: str, fix: str, samples: List[dict], iteration
             "details": evaluation["details"]
         })
 
-        time.sleep(0.3)
-
     passed = sum(1 for r in results if r["pass"])
 
     return {
@@ -959,8 +954,6 @@ def run_m11_iteration(base_prompt: str, fix: str, samples: List[dict], iteration
             "details": evaluation["details"]
         })
 
-        time.sleep(0.3)
-
     passed = sum(1 for r in results if r["pass"])
 
     return {
@@ -1259,8 +1252,6 @@ def run_m15_iteration(base_prompt: str, fix: str, samples: List[dict], iteration
             "details": evaluation["details"]
         })
 
-        time.sleep(0.3)
-
     passed = sum(1 for r in results if r["pass"])
 
     return {
@@ -1544,8 +1535,6 @@ def run_m04_iteration(base_prompt: str, fix: str, samples: List[dict], iteration
             "details": evaluation["details"]
         })
 
-        time.sleep(0.3)
-
     passed = sum(1 for r in results if r["pass"])
 
     return {
@@ -1810,8 +1799,6 @@ def run_m06_iteration(base_prompt: str, fix: str, samples: List[dict], iteration
             "details": evaluation["details"]
         })
 
-        time.sleep(0.3)
-
     passed = sum(1 for r in results if r["pass"])
 
     return {
@@ -9,7 +9,6 @@ Tests original vs modified prompts and measures improvement.
 import os
 import sys
 import json
-import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -21,10 +20,11 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from dotenv import load_dotenv
 load_dotenv(PROJECT_ROOT / ".env")
 
-from openai import OpenAI
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+from llm import LLMRequest, get_engine
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Shared LLM engine (pooled client)
+engine = get_engine()
 
 def load_prompt(prompt_path: str) -> str:
     """Load prompt template from file."""
@@ -54,19 +54,19 @@ def fill_prompt_template(prompt: str, sample: dict) -> str:
 
 def call_gpt(prompt: str, model: str = "gpt-4o-mini", temperature: float = 0) -> dict:
     """Call GPT model with the prompt."""
+    result = engine.complete(LLMRequest.from_prompt(
+        prompt,
+        system="You are a quality assurance specialist. Return valid JSON only.",
+        model=model,
+        temperature=temperature,
+        response_format={"type": "json_object"},
+        metadata={"module": "prompt_experiment"},
+    ))
+    if not result.ok:
+        return {"success": False, "error": result.error}
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a quality assurance specialist. Return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content)
-        return {"success": True, "output": result}
-    except Exception as e:
+        return {"success": True, "output": json.loads(result.content)}
+    except (TypeError, json.JSONDecodeError) as e:
         return {"success": False, "error": str(e)}
 
 def evaluate_output(output: dict, expected: str) -> dict:
@@ -153,8 +153,6 @@ def run_experiment(
         else:
             results["summary"]["fail"] += 1
 
-        # Rate limiting
-        time.sleep(0.5)
 
     results["summary"]["pass_rate"] = results["summary"]["pass"] / len(samples) if samples else 0
 
@@ -719,8 +717,6 @@ def run_m03_experiment(
         else:
             results["summary"]["fail"] += 1
 
-        time.sleep(0.5)
-
     results["summary"]["pass_rate"] = results["summary"]["pass"] / len(samples) if samples else 0
 
     return results
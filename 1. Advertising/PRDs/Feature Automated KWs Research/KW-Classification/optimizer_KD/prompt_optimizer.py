@@ -23,6 +23,8 @@ Usage:
 import json
 import os
 import re
+import sys
+import time
 import difflib
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
@@ -32,6 +34,11 @@ from dataclasses import dataclass, field
 import openai
 from dotenv import load_dotenv
 
+# Shared prompt templates live in <project_root>/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+from prompt_template import BRACE_PLACEHOLDER_PATTERN, compile_template
+from llm import trace_call
+
 # Load environment
 load_dotenv()
 
@@ -106,6 +113,17 @@ class PromptOptimizer:
         self.datasets_dir = self.project_root / "datasets"
         self.results_dir = self.project_root / "experiment_results"
 
+    def _chat(self, step: str, **kwargs):
+        """Chat completion through the OpenAI client, traced as `optimizer:<step>` (scripts/llm/traces.py)."""
+        start = time.time()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception as e:
+            trace_call(f"optimizer:{step}", kwargs, None, time.time() - start, e)
+            raise
+        trace_call(f"optimizer:{step}", kwargs, response, time.time() - start)
+        return response
+
     def log(self, message: str):
         """Print message if verbose mode enabled."""
         if self.verbose:
@@ -135,12 +153,8 @@ class PromptOptimizer:
 
     def format_prompt(self, prompt_template: str, input_data: Dict[str, Any]) -> str:
         """Format prompt template with input variables."""
-        result = prompt_template
-        for key, value in input_data.items():
-            # Handle both {{key}} and {key} placeholders
-            result = result.replace(f"{{{{{key}}}}}", str(value))
-            result = result.replace(f"{{{key}}}", str(value))
-        return result
+        # Handle both {{key}} and {key} placeholders
+        return compile_template(prompt_template, BRACE_PLACEHOLDER_PATTERN).render(input_data)
 
     def run_classification(
         self,
@@ -151,7 +165,8 @@ class PromptOptimizer:
         formatted_prompt = self.format_prompt(prompt_text, input_data)
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
+                "classify",
                 model=self.model,
                 messages=[{"role": "user", "content": formatted_prompt}],
                 response_format={"type": "json_object"},
@@ -231,7 +246,8 @@ Extract 5-8 key criteria. For EACH criterion include 2-4 evaluation dimensions f
 Be specific and observable in each level descriptor."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
+                "extract_criteria",
                 model="gpt-4o",
                 messages=[{"role": "user", "content": extraction_prompt}],
                 response_format={"type": "json_object"},
@@ -347,7 +363,8 @@ Return JSON:
         judge_prompt = judge_prompt.replace("{{output_confidence}}", str(output.get("confidence", "")))
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
+                "judge",
                 model=self.judge_model,
                 messages=[{"role": "user", "content": judge_prompt}],
                 response_format={"type": "json_object"},
@@ -464,7 +481,8 @@ Return JSON:
 ]}}"""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
+                "suggest",
                 model="gpt-4o",
                 messages=[{"role": "user", "content": suggestions_prompt}],
                 response_format={"type": "json_object"},
@@ -512,7 +530,8 @@ Return JSON:
 Return the COMPLETE improved prompt. ONLY return the prompt text, no explanation."""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
+                "optimize",
                 model=self.optimizer_model,
                 messages=[{"role": "user", "content": reasoning_prompt}]
             )
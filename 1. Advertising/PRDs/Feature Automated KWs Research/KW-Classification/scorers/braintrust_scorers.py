@@ -166,11 +166,15 @@ All are treated as equivalent null values for comparison.
 """
 
 import math
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 import braintrust
 import pydantic
 
+# Imported from this directory so `braintrust push` bundles it (it only uploads modules found under the cwd)
+from fuzzy_brand_index import FuzzyBrandIndex
+
 
 # Initialize project
 # Project ID: 17b25eb4-95bf-499b-9ee3-1b6118546ecc
@@ -1221,6 +1225,12 @@ def normalize_entity(entity: str) -> str:
     return entity.lower().strip().replace("-", " ").replace("_", " ")
 
 
+@lru_cache(maxsize=4096)
+def entity_index(entity: str) -> FuzzyBrandIndex:
+    """Typo-tolerant index over a single entity."""
+    return FuzzyBrandIndex([entity])
+
+
 def entities_match(entity1: str, entity2: str) -> bool:
     """Check if two entities match (fuzzy)."""
     e1 = normalize_entity(entity1)
@@ -1233,8 +1243,8 @@ def entities_match(entity1: str, entity2: str) -> bool:
     if e1 == e2:
         return True
 
-    # One contains the other
-    if e1 in e2 or e2 in e1:
+    # One contains the other as whole words, allowing typos ("Revlon" in "revlin pro")
+    if entity_index(e1).contains(e2) or entity_index(e2).contains(e1):
         return True
 
     # Check word overlap
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Typo-Tolerant Brand Index (SymSpell-style deletion dictionary)
+
+Shoppers misspell brands ("revlin", "jikashu"), which is why M01a generates
+variation lists. This index answers "does this keyword contain a variant of
+brand X within edit distance k" without scanning every variant:
+
+  - Every variant (normalized, space-free) is stored under all strings
+    reachable by deleting up to k of its characters.
+  - A query term generates its own deletes; shared deletes give the
+    candidate variants, which are verified with a bounded
+    Damerau-Levenshtein (optimal string alignment) distance.
+  - Keywords are checked over every run of whole tokens, so "air pods"
+    finds "airpods" and "jbl flip 6" finds "jbl", but "oxo" is never
+    found inside "boxo".
+
+The allowed distance grows with the length of the shorter of term and
+variant (short brands must match exactly, see `max_edits`), which keeps
+generic words from matching short brand names and a single token from
+matching most of a multi-word brand ("supplies" vs. "BH Supplies"). Build
+one index per ASIN from M01 / M01a / M03 outputs; lookups are memoized, a
+new term costs a few dict probes.
+
+Standard library only, and kept in scorers/ next to braintrust_scorers.py:
+`braintrust push` bundles only the modules it finds under the directory it
+runs from, so the deployed scorers can import it. scripts/brand_matching.py
+imports it from here.
+
+Usage:
+    index = FuzzyBrandIndex({"JBL": ["JBL", "Vibe Beam"], "Bose": ["Bose", "QuietComfort"]})
+    index.find("jbl vibe beem earbuds")
+    # [BrandMatch(brand='JBL', variant='Vibe Beam', text='vibe beem', distance=1)]
+    index.contains("quiet comfort earbuds", brand="Bose")   # True
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+DEFAULT_MAX_DISTANCE = 2
+
+
+def normalize_brand_text(text) -> str:
+    """Accent-free lowercase text with single spaces between alphanumeric runs."""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(NON_ALPHANUMERIC.sub(" ", text.lower()).split())
+
+
+def max_edits(length: int) -> int:
+    """Edits allowed when the shorter of term and variant has `length` characters (space-free)."""
+    if length < 5:
+        return 0
+    if length < 9:
+        return 1
+    return 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it exceeds `limit`."""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else limit + 1
+
+
+def deletes(term: str, edits: int) -> Set[str]:
+    """`term` and every string reachable by deleting up to `edits` characters."""
+    results = {term}
+    frontier = {term}
+    for _ in range(edits):
+        frontier = {
+            candidate[:position] + candidate[position + 1:]
+            for candidate in frontier if len(candidate) > 1
+            for position in range(len(candidate))
+        }
+        results |= frontier
+    return results
+
+
+class BrandMatch(NamedTuple):
+    brand: str  # Brand the variant belongs to
+    variant: str  # Variant as given
+    text: str  # Matched keyword tokens
+    distance: int
+
+
+class FuzzyBrandIndex:
+    """Deletion-dictionary index over the brand variants of one product context."""
+
+    def __init__(
+        self,
+        brands: Union[Mapping[str, Iterable[str]], Iterable[str]],
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ):
+        self.max_distance = max_distance
+        self.patterns: List[str] = []  # Normalized, space-free
+        self.variants: List[str] = []
+        self.brands: List[str] = []
+        self._deletes: Dict[str, List[int]] = {}
+        self._lookups: Dict[str, List[Tuple[int, int]]] = {}
+        self._max_tokens = 0
+        self._lengths: Set[int] = set()  # Pattern lengths, to skip terms nothing can match
+        self._max_length = 0
+
+        items = brands.items() if isinstance(brands, Mapping) else ((name, [name]) for name in brands)
+        seen = set()
+        for brand, variants in items:
+            for variant in variants:
+                normalized = normalize_brand_text(variant)
+                pattern = normalized.replace(" ", "")
+                if not pattern or (brand, pattern) in seen:
+                    continue
+                seen.add((brand, pattern))
+                self._add(str(brand), str(variant), pattern, len(normalized.split()))
+
+    def _add(self, brand: str, variant: str, pattern: str, tokens: int) -> None:
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        self.variants.append(variant)
+        self.brands.append(brand)
+        for key in deletes(pattern, self._edits(len(pattern))):
+            self._deletes.setdefault(key, []).append(index)
+        # One extra token lets "air pods" (2 tokens) match the variant "airpods" (1)
+        self._max_tokens = max(self._max_tokens, tokens + 1)
+        self._lengths.add(len(pattern))
+        self._max_length = max(self._max_length, len(pattern))
+
+    def _edits(self, length: int) -> int:
+        return min(self.max_distance, max_edits(length))
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def lookup(self, term: str) -> List[Tuple[int, int]]:
+        """(variant index, distance) of variants within their allowed distance of `term`."""
+        return self._lookup(normalize_brand_text(term).replace(" ", ""))
+
+    def _lookup(self, term: str) -> List[Tuple[int, int]]:
+        cached = self._lookups.get(term)
+        if cached is not None:
+            return cached
+        edits = self._edits(len(term))
+        if not any(len(term) + offset in self._lengths for offset in range(-edits, edits + 1)):
+            self._lookups[term] = []
+            return []
+
+        # Both sides hold deletes up to their own allowance >= the shared limit
+        candidates = set()
+        for key in deletes(term, edits) if term else ():
+            candidates.update(self._deletes.get(key, ()))
+
+        found = []
+        for index in candidates:
+            pattern = self.patterns[index]
+            limit = self._edits(min(len(term), len(pattern)))
+            distance = edit_distance(term, pattern, limit)
+            if distance <= limit:
+                found.append((index, distance))
+        found.sort(key=lambda item: (item[1], item[0]))
+        self._lookups[term] = found
+        return found
+
+    def find(self, keyword: str, brand: Optional[str] = None) -> List[BrandMatch]:
+        """Variants found in runs of whole keyword tokens, closest first."""
+        tokens = normalize_brand_text(keyword).split()
+        slack = self.max_distance
+        best: Dict[int, BrandMatch] = {}
+        for start in range(len(tokens)):
+            text = ""
+            for end in range(start, min(len(tokens), start + self._max_tokens)):
+                text += tokens[end]
+                if len(text) > self._max_length + slack:
+                    break
+                for index, distance in self._lookup(text):
+                    if brand is not None and self.brands[index] != brand:
+                        continue
+                    if index not in best or distance < best[index].distance:
+                        best[index] = BrandMatch(
+                            self.brands[index], self.variants[index], " ".join(tokens[start:end + 1]), distance
+                        )
+        return sorted(best.values(), key=lambda match: (match.distance, match.brand, match.variant))
+
+    def contains(self, keyword: str, brand: Optional[str] = None, max_distance: Optional[int] = None) -> bool:
+        """True if the keyword contains a variant (of `brand`) within the allowed distance."""
+        limit = self.max_distance if max_distance is None else max_distance
+        return any(match.distance <= limit for match in self.find(keyword, brand))
@@ -16,6 +16,7 @@ Analyzes:
 
 import json
 import argparse
+import sys
 from collections import Counter, defaultdict
 from dataclasses import dataclass
 from datetime import datetime
@@ -27,6 +28,9 @@ try:
 except ImportError:
     from cohens_kappa import calculate_cohens_kappa, KappaResult
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from jsonl_index import JsonlIndex
+
 
 # Path mappings
 PATH_PAIRS = {
@@ -68,43 +72,31 @@ class ComparisonResult:
     disagreement_cases: list[dict]
 
 
-def load_results(results_file: str) -> dict:
-    """Load batch results, keyed by custom_id."""
-    results = {}
-    with open(results_file) as f:
-        for line in f:
-            record = json.loads(line)
-            custom_id = record.get("custom_id", "")
-
-            response = record.get("response", {})
-            body = response.get("body", {})
-            choices = body.get("choices", [])
-
-            if choices:
-                content = choices[0].get("message", {}).get("content", "")
-                try:
-                    parsed = json.loads(content)
-                    results[custom_id] = parsed
-                except json.JSONDecodeError:
-                    results[custom_id] = {"raw": content}
+def parse_output(record: dict) -> dict:
+    """Model output of a batch result line."""
+    response = record.get("response", {})
+    body = response.get("body", {})
+    choices = body.get("choices", [])
 
-    return results
+    content = choices[0].get("message", {}).get("content", "")
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return {"raw": content}
 
 
-def load_dataset(dataset_file: str) -> dict:
-    """Load dataset with ground truth labels."""
-    dataset = {}
-    with open(dataset_file) as f:
-        for line in f:
-            record = json.loads(line)
-            # Extract keyword from custom_id for matching
-            custom_id = record.get("custom_id", "")
-            keyword = record.get("keyword", "")
-            dataset[custom_id] = record
-            # Also index by keyword for cross-path matching
-            if keyword:
-                dataset[f"keyword:{keyword.lower()}"] = record
-    return dataset
+def load_results(results_file: str) -> JsonlIndex:
+    """Index batch results with a model response by custom_id; outputs are parsed on lookup."""
+    return JsonlIndex(
+        results_file,
+        where=lambda record: bool(record.get("response", {}).get("body", {}).get("choices")),
+        value=parse_output,
+    )
+
+
+def load_dataset(dataset_file: str) -> JsonlIndex:
+    """Index dataset records with ground truth labels by custom_id; records are read on lookup."""
+    return JsonlIndex(dataset_file)
 
 
 def normalize_label(label) -> str:
@@ -147,21 +139,11 @@ def compare_paths(
     keyword_to_a = {}
     keyword_to_b = {}
 
-    for custom_id, output in results_a.items():
-        keyword = extract_keyword_from_id(custom_id)
-        keyword_to_a[keyword] = {
-            "custom_id": custom_id,
-            "output": output,
-            "dataset": dataset_a.get(custom_id, {})
-        }
-
-    for custom_id, output in results_b.items():
-        keyword = extract_keyword_from_id(custom_id)
-        keyword_to_b[keyword] = {
-            "custom_id": custom_id,
-            "output": output,
-            "dataset": dataset_b.get(custom_id, {})
-        }
+    for custom_id in results_a:
+        keyword_to_a[extract_keyword_from_id(custom_id)] = custom_id
+
+    for custom_id in results_b:
+        keyword_to_b[extract_keyword_from_id(custom_id)] = custom_id
 
     # Find common keywords
     common_keywords = set(keyword_to_a.keys()) & set(keyword_to_b.keys())
@@ -178,16 +160,16 @@ def compare_paths(
     labels_b = []
 
     for keyword in common_keywords:
-        data_a = keyword_to_a[keyword]
-        data_b = keyword_to_b[keyword]
+        id_a = keyword_to_a[keyword]
+        id_b = keyword_to_b[keyword]
 
         # Get ground truth
-        gt_a = data_a["dataset"].get(label_field_a)
-        gt_b = data_b["dataset"].get(label_field_b)
+        gt_a = dataset_a.get(id_a, {}).get(label_field_a)
+        gt_b = dataset_b.get(id_b, {}).get(label_field_b)
 
         # Get predictions
-        pred_a = data_a["output"].get(label_field_a)
-        pred_b = data_b["output"].get(label_field_b)
+        pred_a = results_a[id_a].get(label_field_a)
+        pred_b = results_b[id_b].get(label_field_b)
 
         # Normalize for comparison
         gt_norm = normalize_label(gt_a)  # Should be same for both
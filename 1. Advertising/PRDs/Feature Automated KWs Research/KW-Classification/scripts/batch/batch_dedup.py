@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Batch Request Deduplication
+
+Datasets repeat (context, keyword) pairs, so a module can render the same
+request body for several records. generate_batch_requests.py writes each
+unique body once (RequestDeduper, scripts/llm/dedup.py): the first record
+with a body is its leader, later ones are followers, left out of the batch
+file and listed in `{module}_dedup.json` next to it:
+
+    {"module": "m02", "requests": 916, "unique": 893, "duplicates": 23,
+     "dedup_ratio": 0.0251, "followers": {"m02_00012": ["m02_00417"], ...}}
+
+Bodies embed the module prompt, so duplicates only occur within a module.
+
+After a download, fan_out() copies every leader line of a results (or
+errors) file to its followers' custom_ids, marked `"dedup_of": <leader>`,
+so evaluation and retries see one line per record. It is idempotent: the
+copies are rebuilt from the leader lines on every call, which also keeps
+them in step when retry_batch.py replaces a leader's line.
+
+Usage:
+    fan_out_file(batch_dir, "m02", batch_dir / "results" / "m02_results.jsonl")
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List
+
+from batch_sharding import module_of
+
+
+def dedup_file(batch_dir: Path, module: str) -> Path:
+    return Path(batch_dir) / f"{module}_dedup.json"
+
+
+def save_dedup(batch_dir: Path, module: str, deduper) -> dict:
+    """Write the module's follower map (only when it has duplicates); returns the summary."""
+    summary = deduper.summary()
+    path = dedup_file(batch_dir, module)
+    if deduper.duplicates:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"module": module, **summary, "followers": deduper.followers}, f, indent=2)
+    else:
+        path.unlink(missing_ok=True)
+    return summary
+
+
+def load_followers(batch_dir: Path, stem: str) -> Dict[str, List[str]]:
+    """Leader custom_id -> follower custom_ids of a module (or one of its shards); {} without duplicates."""
+    path = dedup_file(batch_dir, module_of(stem))
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("followers", {})
+
+
+def fan_out(path: Path, followers: Dict[str, List[str]]) -> int:
+    """Rewrite `path` with a copy of each leader line per follower; returns the copies written."""
+    path = Path(path)
+    if not followers or not path.exists():
+        return 0
+    partial = path.with_name(path.name + ".part")
+    copies = 0
+    with open(path, "r", encoding="utf-8") as f, open(partial, "w", encoding="utf-8") as out:
+        for raw in f:
+            if not raw.strip():
+                continue
+            line = json.loads(raw)
+            if "dedup_of" in line:
+                continue  # Rebuilt from its leader below
+            out.write(raw if raw.endswith("\n") else raw + "\n")
+            leader = line.get("custom_id")
+            for follower in followers.get(leader, ()):
+                out.write(json.dumps({**line, "custom_id": follower, "dedup_of": leader}, ensure_ascii=False) + "\n")
+                copies += 1
+    partial.replace(path)
+    return copies
+
+
+def fan_out_file(batch_dir: Path, stem: str, path: Path) -> int:
+    """fan_out() a results file and its errors file with the module's follower map."""
+    followers = load_followers(batch_dir, stem)
+    path = Path(path)
+    return fan_out(path, followers) + fan_out(path.with_suffix(".errors.jsonl"), followers)
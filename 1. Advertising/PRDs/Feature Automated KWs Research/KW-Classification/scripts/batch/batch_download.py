@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Streaming Batch Result Downloads
+
+Batch output files can be hundreds of MB. stream_file() writes a file's
+content to disk in CHUNK_SIZE chunks as it arrives (never the whole body in
+memory), under `<name>.part` until complete, so an interrupted download
+never looks finished. run_parallel() runs several downloads at once
+(DOWNLOAD_WORKERS, or the BATCH_DOWNLOAD_WORKERS env var); workers report
+progress with print_line() so lines do not interleave.
+
+Downloaded files are read back with scripts/jsonl_index.py (iter_jsonl,
+JsonlIndex) rather than loaded whole.
+
+Usage:
+    stream_file(client, batch.output_file_id, results_dir / "m12b_results.jsonl")
+    reports = run_parallel(download_one, batches)
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+CHUNK_SIZE = 1024 * 1024  # Bytes per write
+DOWNLOAD_WORKERS = 4  # Concurrent downloads
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_print_lock = threading.Lock()
+
+
+def download_workers() -> int:
+    return int(os.getenv("BATCH_DOWNLOAD_WORKERS", DOWNLOAD_WORKERS))
+
+
+def stream_file(client, file_id: str, path: Path, chunk_size: int = CHUNK_SIZE) -> int:
+    """Stream an OpenAI file's content to `path`; returns the bytes written."""
+    path = Path(path)
+    partial = path.with_name(path.name + ".part")
+    written = 0
+    with client.files.with_streaming_response.content(file_id) as response, open(partial, "wb") as f:
+        for chunk in response.iter_bytes(chunk_size):
+            f.write(chunk)
+            written += len(chunk)
+    partial.replace(path)
+    return written
+
+
+def run_parallel(fn: Callable[[T], R], items: Iterable[T], workers: Optional[int] = None) -> List[R]:
+    """fn(item) for every item, `workers` at a time; results in input order."""
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers or download_workers(), len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+def print_line(message: str) -> None:
+    """Print one progress line from a worker thread."""
+    with _print_lock:
+        print(message, flush=True)
@@ -0,0 +1,1011 @@
+#!/usr/bin/env python3
+"""
+Batch API Job Manager
+
+Runs the manual batch workflow (generate -> upload -> check status ->
+download -> evaluate) as one restartable state machine. Every module of a
+run is a job in a SQLite job table (batch_requests/jobs.sqlite, with run
+directories next to it), and each step records its result in the table
+before the next one starts, so a killed process picks up exactly where it
+stopped.
+
+A module's requests are split into shards that fit the Batch API file
+limits and the model's enqueued-token quota (batch_sharding.py); each shard
+is its own batch:
+
+    job:    pending -> running (shards in flight) -> downloaded -> evaluated
+    shard:  generated -> uploaded -> submitted -> downloaded
+            generated (or uploaded/submitted, migrated) -> downloaded   (realtime route)
+    either can end in `failed`
+
+- A shard is submitted only while its model's enqueued tokens (all runs in
+  the job table) leave room for it, so later shards go out as earlier ones
+  complete; a batch the provider still rejects for quota is resubmitted
+- In-flight batches are polled with exponential backoff (--poll up to --max-poll)
+- A batch is downloaded as soon as it completes, streamed to disk, with up
+  to --workers shards (of any module) advanced at once; once all shards of
+  a module are in, their results are merged and evaluated right away.
+  Expired/cancelled batches keep the results they have
+- With --deadline and/or --budget each shard is routed to the Batch API or
+  to realtime calls (batch_router.py): batch while its turnaround still
+  leaves time for a realtime fallback and the budget covers it; a batch
+  still open when only the realtime duration is left before the deadline
+  is cancelled, and once the cancel settles the requests it did not finish
+  run realtime (its results are kept; the shard cost covers both). The
+  run's lease is renewed while realtime calls are in progress
+- Records repeating another record's request body are not submitted; the
+  shard results are copied to them on download (batch_dedup.py)
+- Batches are tagged with `job` metadata, so a crash between creating a batch
+  and recording its id adopts that batch instead of paying for it twice
+- Transient API errors are retried with the same backoff; a job or shard
+  fails after MAX_ATTEMPTS consecutive errors
+- The run directory keeps the layout of the manual scripts (*_batch.jsonl,
+  manifest.json, upload_manifest.json, results/, evaluation_report.json), so
+  check_batch_status.py, download_results.py and evaluate_results.py still
+  work on it
+
+Usage:
+    python scripts/batch/batch_jobs.py run m12b m14 m15 m16
+    python scripts/batch/batch_jobs.py run --run-id nightly_20260301 --no-wait   # one pass (cron)
+    python scripts/batch/batch_jobs.py run m12b m16 --deadline 8h --budget 25      # batch/realtime router
+    python scripts/batch/batch_jobs.py resume                  # latest unfinished run
+    python scripts/batch/batch_jobs.py resume nightly_20260301
+    python scripts/batch/batch_jobs.py status [RUN_ID]
+    python scripts/batch/batch_jobs.py list
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).parent))
+import generate_batch_requests as gbr
+from batch_dedup import fan_out_file
+from batch_download import download_workers, print_line, run_parallel, stream_file
+from batch_router import (
+    BATCH, BATCH_ETA, REALTIME, REALTIME_PARALLEL, Router, parse_deadline, parse_duration, run_realtime, results_cost,
+)
+from batch_sharding import ShardLimits, fits_quota, is_quota_rejection
+from evaluate_results import evaluate_module
+from jsonl_index import iter_jsonl
+
+load_dotenv()
+
+JOBS_DB = gbr.BATCH_OUTPUT_DIR / "jobs.sqlite"
+
+DEFAULT_POLL = 60.0       # First status check after submitting (seconds)
+DEFAULT_MAX_POLL = 900.0  # Backoff cap between status checks
+BACKOFF = 1.5             # Poll interval multiplier per unfinished check
+JITTER = 0.1              # +/- fraction added to every wait
+MAX_ATTEMPTS = 5          # Consecutive step errors before a job fails
+
+DONE_STATES = ("evaluated", "failed")
+SHARD_DONE_STATES = ("downloaded", "failed")
+REMOTE_DONE = ("completed", "failed", "expired", "cancelled")
+QUOTA_WAIT = "waiting for enqueued-token quota"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_dir TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    owner TEXT,
+    lease_until REAL,
+    deadline REAL,
+    budget REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    module TEXT NOT NULL,
+    state TEXT NOT NULL,
+    records INTEGER,
+    shards INTEGER,
+    results_file TEXT,
+    results_count INTEGER,
+    errors_count INTEGER,
+    accuracy REAL,
+    grade TEXT,
+    evaluation TEXT,
+    next_poll_at REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, job)
+);
+CREATE TABLE IF NOT EXISTS shards (
+    run_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    request_file TEXT NOT NULL,
+    model TEXT,
+    records INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    file_id TEXT,
+    batch_id TEXT,
+    batch_status TEXT,
+    completed INTEGER,
+    failed INTEGER,
+    output_file TEXT,
+    error_file TEXT,
+    route TEXT,
+    cost REAL,
+    poll_interval REAL,
+    next_poll_at REAL NOT NULL DEFAULT 0,
+    polls INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, job, shard)
+);
+CREATE INDEX IF NOT EXISTS idx_shards_enqueued ON shards(model, state);
+"""
+
+# Columns added after the first release: (table, column, type), added to older job tables on open
+ADDED_COLUMNS = [
+    ("runs", "deadline", "REAL"),
+    ("runs", "budget", "REAL"),
+    ("shards", "route", "TEXT"),
+    ("shards", "cost", "REAL"),
+]
+
+
+# ============================================================================
+# Job table
+# ============================================================================
+
+class JobStore:
+    """SQLite job table: runs, one job per module, one shard per batch file."""
+
+    def __init__(self, path: Path = JOBS_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        for table, column, kind in ADDED_COLUMNS:
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+
+    def create_run(self, run_id: str, run_dir: Path, modules: List[str]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, run_dir, created_at) VALUES (?, ?, ?)", (run_id, str(run_dir), now)
+            )
+            self._conn.executemany(
+                "INSERT INTO jobs (run_id, job, module, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, module, module, "pending", now, now) for module in modules],
+            )
+
+    def add_shards(self, job: dict, batch_files: List[dict], **fields) -> dict:
+        """Insert the job's shard rows and update the job in one transaction."""
+        now = time.time()
+        fields["updated_at"] = now
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO shards (run_id, job, shard, state, request_file, model, records, tokens, "
+                "created_at, updated_at) VALUES (?, ?, ?, 'generated', ?, ?, ?, ?, ?, ?)",
+                [(job["run_id"], job["job"], index, shard["file"], shard["model"], shard["records"],
+                  shard["tokens"], now, now) for index, shard in enumerate(batch_files, 1)],
+            )
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE run_id = ? AND job = ?",
+                (*fields.values(), job["run_id"], job["job"]),
+            )
+        return {**job, **fields}
+
+    def run(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def runs(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM runs ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_unfinished(self) -> Optional[dict]:
+        unfinished = [run for run in self.runs() if not run["finished_at"]]
+        return unfinished[-1] if unfinished else None
+
+    def jobs(self, run_id: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs WHERE run_id = ? ORDER BY job", (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def shards(self, run_id: str, job: Optional[str] = None) -> List[dict]:
+        query, params = "SELECT * FROM shards WHERE run_id = ?", [run_id]
+        if job:
+            query, params = query + " AND job = ?", params + [job]
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY job, shard", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def enqueued_tokens(self, model: str) -> int:
+        """Estimated tokens of `model` in batches still in flight, across all runs."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(tokens), 0) FROM shards WHERE model = ? AND state = 'submitted'", (model,)
+            ).fetchone()
+        return row[0]
+
+    def update(self, row: dict, **fields) -> dict:
+        """Persist `fields` on a job or shard row and return the updated row."""
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        if "shard" in row:
+            table, where, keys = "shards", "run_id = ? AND job = ? AND shard = ?", (row["run_id"], row["job"],
+                                                                                  row["shard"])
+        else:
+            table, where, keys = "jobs", "run_id = ? AND job = ?", (row["run_id"], row["job"])
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE {table} SET {columns} WHERE {where}", (*fields.values(), *keys))
+        return {**row, **fields}
+
+    def set_limits(self, run_id: str, deadline: Optional[float], budget: Optional[float]) -> None:
+        """Set the run's deadline (epoch seconds) and/or budget (USD); None keeps the current value."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET deadline = COALESCE(?, deadline), budget = COALESCE(?, budget) WHERE run_id = ?",
+                (deadline, budget, run_id),
+            )
+
+    def run_cost(self, run_id: str) -> float:
+        """Actual cost of the run's finished shards plus the estimates of those in flight."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(cost), 0) FROM shards WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return row[0]
+
+    def finish_run(self, run_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def acquire(self, run_id: str, owner: str, ttl: float) -> bool:
+        """Take (or extend) the run's lease; False if another live process holds it."""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE runs SET owner = ?, lease_until = ? "
+                "WHERE run_id = ? AND (owner IS NULL OR owner = ? OR lease_until < ?)",
+                (owner, now + ttl, run_id, owner, now),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, run_id: str, owner: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET owner = NULL, lease_until = NULL WHERE run_id = ? AND owner = ?", (run_id, owner)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def module_config(module_id: str) -> dict:
+    """
+    MODULES entry for `module_id` with its files resolved.
+
+    A file missing at its configured path falls back to the first
+    `single/{module_id}_*` file of the same kind (datasets/single,
+    prompts/modules/single, prompts/json_schemas/single).
+    """
+    config = dict(gbr.MODULES[module_id])
+    for key, directory, suffix in (
+        ("dataset", gbr.DATASETS_DIR, ".jsonl"),
+        ("prompt", gbr.PROMPTS_DIR, ".md"),
+        ("schema", gbr.SCHEMAS_DIR, ".json"),
+    ):
+        if not (directory / config[key]).exists():
+            matches = sorted((directory / "single").glob(f"{module_id}_*{suffix}"))
+            if matches:
+                config[key] = str(matches[0].relative_to(directory))
+    return config
+
+
+def jittered(seconds: float) -> float:
+    return seconds * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def count_lines(path: Path) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def label(row: dict) -> str:
+    """Job name, or the shard's batch file stem (m12b, m12b_s002)."""
+    if "shard" in row:
+        return Path(row["request_file"]).name[:-len("_batch.jsonl")]
+    return row["job"]
+
+
+def job_tag(shard: dict) -> str:
+    """Batch metadata value identifying the shard across restarts."""
+    return f"{shard['run_id']}/{shard['job']}/{shard['shard']}"
+
+
+def concat_files(paths: List[Path], target: Path) -> None:
+    partial = target.with_name(target.name + ".part")
+    with open(partial, "wb") as out:
+        for path in paths:
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, out)
+    partial.replace(target)
+
+
+# ============================================================================
+# Manager
+# ============================================================================
+
+class BatchJobManager:
+    """Advances every job of a run through the batch workflow until all are done."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        client,
+        poll: float = DEFAULT_POLL,
+        max_poll: float = DEFAULT_MAX_POLL,
+        limits: Optional[ShardLimits] = None,
+        workers: Optional[int] = None,
+        batch_eta: float = BATCH_ETA,
+        realtime_parallel: int = REALTIME_PARALLEL,
+    ):
+        self.store = store
+        self.client = client
+        self.poll = poll
+        self.max_poll = max_poll
+        self.limits = limits
+        self.workers = workers or download_workers()
+        self.router = Router(batch_eta=batch_eta, parallel=realtime_parallel)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._submit_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    def create(self, modules: List[str], run_id: Optional[str] = None) -> str:
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        run_dir = self.store.path.parent / run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        self.store.create_run(run_id, run_dir, modules)
+        return run_id
+
+    def drive(self, run_id: str, wait: bool = True) -> List[dict]:
+        """
+        Advance the run's jobs; with `wait`, sleep between polls until every
+        job is evaluated or failed. Returns the jobs as left in the table.
+        """
+        run = self.store.run(run_id)
+        if not self.store.acquire(run_id, self.owner, self.max_poll * 2):
+            raise RuntimeError(f"Run {run_id} is being driven by {run['owner']}")
+        run_dir = Path(run["run_dir"])
+        self.router.deadline, self.router.budget = run["deadline"], run["budget"]
+        job_steps = {"pending": self.generate, "running": self.run_shards, "downloaded": self.evaluate}
+        try:
+            while True:
+                jobs = [self.advance(job, job_steps, run_dir) for job in self.store.jobs(run_id)]
+                if self.advance_shards(run_id, jobs, run_dir):
+                    continue  # Merge and evaluate the modules whose last shard just came in
+                shards = self.store.shards(run_id)
+                self.write_reports(run_dir, jobs, shards)
+                pending = [job for job in jobs if job["state"] not in DONE_STATES]
+                if not pending:
+                    self.store.finish_run(run_id)
+                    return jobs
+                if not wait:
+                    return jobs
+                delay = max(1.0, min(next_poll_at(job, shards) for job in pending) - time.time())
+                self.store.acquire(run_id, self.owner, delay + self.max_poll)
+                time.sleep(delay)
+        finally:
+            self.store.release(run_id, self.owner)
+
+    def advance(self, row: dict, steps: Dict[str, Callable], run_dir: Path) -> dict:
+        """Run a job's or shard's steps until it has to wait (or is done)."""
+        while row["state"] in steps and row["next_poll_at"] <= time.time():
+            state = row["state"]
+            step = steps[state]
+            try:
+                row = step(row, run_dir)
+            except Exception as e:
+                attempts = row["attempts"] + 1
+                error = f"{step.__name__}: {e}"
+                if attempts >= MAX_ATTEMPTS:
+                    row = self.store.update(row, state="failed", attempts=attempts, error=error)
+                else:
+                    row = self.store.update(
+                        row, attempts=attempts, error=error,
+                        next_poll_at=time.time() + jittered(min(self.poll * BACKOFF ** attempts, self.max_poll)),
+                    )
+                self.log(row, f"{error} (attempt {attempts}/{MAX_ATTEMPTS})")
+                break
+            if row["state"] == state:
+                break
+        return row
+
+    # ------------------------------------------------------------------
+    # Job steps (each persists its outcome before returning)
+    # ------------------------------------------------------------------
+
+    def generate(self, job: dict, run_dir: Path) -> dict:
+        result = gbr.generate_module_batch(job["module"], module_config(job["module"]), run_dir, self.limits)
+        if result["status"] != "success" or not result["shards"]:
+            job = self.store.update(job, state="failed", error=result.get("error") or "no records")
+            self.log(job, job["error"])
+            return job
+        shards = result["shards"]
+        job = self.store.add_shards(
+            job, shards, state="running", records=result["records"], shards=len(shards), attempts=0, error=None,
+        )
+        duplicates = result["records"] - result["unique_requests"]
+        self.log(job, f"generated {job['records']} requests" + (f" in {len(shards)} shards" if len(shards) > 1 else "")
+                      + (f", {duplicates} duplicates folded" if duplicates else ""))
+        return job
+
+    def advance_shards(self, run_id: str, jobs: List[dict], run_dir: Path) -> bool:
+        """
+        Advance the due shards of running jobs, `workers` at a time (uploads,
+        status checks and downloads overlap). True if any shard finished.
+        """
+        shard_steps = {"generated": self.start, "uploaded": self.submit, "submitted": self.check}
+        running = {job["job"] for job in jobs if job["state"] == "running"}
+        now = time.time()
+        due = [
+            shard for shard in self.store.shards(run_id)
+            if shard["job"] in running and shard["state"] not in SHARD_DONE_STATES and shard["next_poll_at"] <= now
+        ]
+        shards = run_parallel(lambda shard: self.advance(shard, shard_steps, run_dir), due, self.workers)
+        return any(shard["state"] in SHARD_DONE_STATES for shard in shards)
+
+    def run_shards(self, job: dict, run_dir: Path) -> dict:
+        """Merge the job's shard results once all are done (advance_shards() moves the shards)."""
+        shards = self.store.shards(job["run_id"], job["job"])
+        if any(shard["state"] not in SHARD_DONE_STATES for shard in shards):
+            return job
+
+        downloaded = [shard for shard in shards if shard["state"] == "downloaded"]
+        if not downloaded:
+            job = self.store.update(job, state="failed", error="; ".join(shard["error"] or "" for shard in shards))
+            self.log(job, f"all shards failed: {job['error']}")
+            return job
+
+        results_dir = run_dir / "results"
+        output_path = results_dir / f"{job['module']}_results.jsonl"
+        error_path = output_path.with_suffix(".errors.jsonl")
+        if len(shards) > 1:
+            concat_files([Path(shard["output_file"]) for shard in downloaded], output_path)
+            error_files = [Path(shard["error_file"]) for shard in downloaded if shard["error_file"]]
+            if error_files:
+                concat_files(error_files, error_path)
+        failed = [label(shard) for shard in shards if shard["state"] == "failed"]
+        job = self.store.update(
+            job, state="downloaded", results_file=str(output_path), next_poll_at=0,
+            results_count=count_lines(output_path),
+            errors_count=count_lines(error_path) if error_path.exists() else 0,
+            error=f"failed shards: {', '.join(failed)}" if failed else None,
+        )
+        if len(shards) > 1:
+            self.log(job, f"merged {len(downloaded)}/{len(shards)} shards: {job['results_count']} results, "
+                          f"{job['errors_count']} errors")
+        return job
+
+    def evaluate(self, job: dict, run_dir: Path) -> dict:
+        dataset = iter_jsonl(gbr.DATASETS_DIR / module_config(job["module"])["dataset"])
+        evaluation = evaluate_module(job["module"], Path(job["results_file"]), dataset)
+        job = self.store.update(
+            job, state="evaluated", evaluation=json.dumps(evaluation),
+            accuracy=evaluation.get("accuracy"), grade=evaluation.get("grade"),
+            error=evaluation.get("error") or job["error"], attempts=0,
+        )
+        if "error" in evaluation:
+            self.log(job, f"evaluation skipped: {evaluation['error']}")
+        else:
+            self.log(job, f"evaluated {evaluation['correct']}/{evaluation['total']} = "
+                          f"{evaluation['accuracy']:.1f}% ({evaluation['grade']})")
+        return job
+
+    # ------------------------------------------------------------------
+    # Shard steps
+    # ------------------------------------------------------------------
+
+    def start(self, shard: dict, run_dir: Path) -> dict:
+        """Route a new shard (batch or realtime, see batch_router.py) and take its first step."""
+        if not shard["route"]:
+            route, reason = self.router.choose(shard, self.store.run_cost(shard["run_id"]))
+            if route is None:
+                shard = self.store.update(shard, state="failed", cost=0.0, error=reason)
+                self.log(shard, reason)
+                return shard
+            shard = self.store.update(shard, route=route, cost=self.router.cost(shard, route))
+            if self.router.deadline is not None or self.router.budget is not None:
+                self.log(shard, f"routed to {route}: {reason} (est. ${shard['cost']:.2f})")
+        if shard["route"] == REALTIME:
+            return self.realtime(shard, run_dir)
+        return self.upload(shard, run_dir)
+
+    def upload(self, shard: dict, run_dir: Path) -> dict:
+        with open(shard["request_file"], "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        shard = self.store.update(shard, state="uploaded", file_id=uploaded.id, attempts=0, error=None)
+        self.log(shard, f"uploaded file_id={uploaded.id}")
+        return shard
+
+    def submit(self, shard: dict, run_dir: Path) -> dict:
+        # One submit at a time: the quota check must see the batches submitted by other workers
+        with self._submit_lock:
+            return self._submit(shard, run_dir)
+
+    def _submit(self, shard: dict, run_dir: Path) -> dict:
+        batch = self.find_batch(shard)
+        if batch:
+            self.log(shard, f"adopting existing batch {batch.id}")
+        else:
+            enqueued = self.store.enqueued_tokens(shard["model"])
+            if not fits_quota(enqueued, shard["tokens"], shard["model"]):
+                migrate, reason = self.router.should_migrate(shard, self.store.run_cost(shard["run_id"]))
+                if migrate:
+                    return self.migrate(shard, run_dir, reason)
+                if shard["error"] != QUOTA_WAIT:
+                    self.log(shard, f"{QUOTA_WAIT} ({shard['tokens']:,} tokens, {enqueued:,} enqueued)")
+                return self.store.update(shard, error=QUOTA_WAIT, next_poll_at=self.next_check(shard, self.poll))
+            batch = self.client.batches.create(
+                input_file_id=shard["file_id"],
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+                metadata={
+                    "job": job_tag(shard),
+                    "source_file": Path(shard["request_file"]).name,
+                    "created_at": datetime.now().isoformat(),
+                },
+            )
+            self.log(shard, f"submitted batch_id={batch.id} ({shard['tokens']:,} tokens)")
+        return self.store.update(
+            shard, state="submitted", batch_id=batch.id, batch_status=batch.status,
+            poll_interval=self.poll, next_poll_at=time.time() + jittered(self.poll), attempts=0, error=None,
+        )
+
+    def find_batch(self, shard: dict):
+        """Live batch already created for this shard (by metadata tag) by an earlier, interrupted submit."""
+        for batch in self.client.batches.list(limit=100).data:
+            if ((batch.metadata or {}).get("job") == job_tag(shard) and batch.input_file_id == shard["file_id"]
+                    and batch.status != "failed"):
+                return batch
+        return None
+
+    def check(self, shard: dict, run_dir: Path) -> dict:
+        if shard["route"] == REALTIME:
+            return self.realtime(shard, run_dir)  # Migrated: waiting for the cancel to settle, or a crash
+        batch = self.client.batches.retrieve(shard["batch_id"])
+        counts = batch.request_counts
+        fields = {
+            "batch_status": batch.status,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+            "polls": shard["polls"] + 1,
+            "attempts": 0,
+            "error": None,
+        }
+        if batch.status not in REMOTE_DONE:
+            migrate, reason = self.router.should_migrate(shard, self.store.run_cost(shard["run_id"]))
+            if migrate:
+                return self.migrate(self.store.update(shard, **fields), run_dir, reason)
+            if reason:
+                if shard["error"] != reason:
+                    self.log(shard, reason)
+                fields["error"] = reason
+            interval = min(shard["poll_interval"] * BACKOFF, self.max_poll)
+            return self.store.update(
+                shard, **fields, poll_interval=interval, next_poll_at=self.next_check(shard, shard["poll_interval"])
+            )
+
+        if is_quota_rejection(batch):
+            shard = self.store.update(
+                shard, **fields, state="uploaded", batch_id=None, error=QUOTA_WAIT,
+                next_poll_at=time.time() + jittered(self.poll),
+            )
+            self.log(shard, f"batch {batch.id} rejected for enqueued-token quota, resubmitting later")
+            return shard
+        if not batch.output_file_id and not batch.error_file_id:
+            errors = "; ".join(e.message or e.code or "" for e in batch.errors.data) if batch.errors else ""
+            shard = self.store.update(
+                shard, **fields, state="failed", cost=0.0, error=f"batch {batch.status} {errors}".strip()
+            )
+            self.log(shard, shard["error"])
+            return shard
+        return self.download(self.store.update(shard, **fields), batch, run_dir)
+
+    def download(self, shard: dict, batch, run_dir: Path) -> dict:
+        output_path = shard_results_file(shard, run_dir)
+        error_path = output_path.with_suffix(".errors.jsonl")
+
+        # Streamed to a temp name first: a half-written file must not look downloaded after a crash
+        for file_id, path in ((batch.output_file_id, output_path), (batch.error_file_id, error_path)):
+            if file_id:
+                stream_file(self.client, file_id, path)
+        if not output_path.exists():
+            output_path.touch()
+        results, errors = count_lines(output_path), count_lines(error_path) if batch.error_file_id else 0
+        copies = fan_out_file(run_dir, label(shard), output_path)
+
+        shard = self.store.update(
+            shard, state="downloaded", output_file=str(output_path),
+            error_file=str(error_path) if batch.error_file_id else None,
+            cost=results_cost(output_path, shard["model"], BATCH),
+        )
+        self.log(shard, f"batch {batch.status}, downloaded {results} results"
+                        + (f", {errors} errors" if batch.error_file_id else "")
+                        + (f", {copies} copied to duplicate records" if copies else ""))
+        return shard
+
+    def realtime(self, shard: dict, run_dir: Path) -> dict:
+        """
+        Run the shard's requests through the LLM engine into the same result
+        files as a download. A migrated shard first waits for its batch to be
+        cancelled, keeps the results the batch has and calls only the rest.
+        """
+        output_path = shard_results_file(shard, run_dir)
+        kept, batch_cost = None, 0.0
+        if shard["batch_id"]:
+            batch = self.client.batches.retrieve(shard["batch_id"])
+            if batch.status not in REMOTE_DONE:
+                if batch.status != "cancelling":
+                    self.client.batches.cancel(batch.id)
+                    self.log(shard, f"cancelling batch {batch.id}, waiting for it to settle")
+                return self.store.update(
+                    shard, batch_status="cancelling", next_poll_at=time.time() + jittered(self.poll), error=None,
+                )
+            if batch.output_file_id:
+                kept = output_path.with_name(output_path.name + ".batch")
+                stream_file(self.client, batch.output_file_id, kept)
+                batch_cost = results_cost(kept, shard["model"], BATCH)
+            self.log(shard, f"batch {batch.status} with {batch.request_counts.completed if batch.request_counts else 0}"
+                            f"/{shard['records']} done, running the rest realtime")
+        else:
+            self.log(shard, f"running {shard['records']} requests realtime (parallel={self.router.parallel})")
+        with self.renewing_lease(shard["run_id"]):
+            results, errors, realtime_cost = run_realtime(
+                Path(shard["request_file"]), output_path, self.router.parallel, kept,
+            )
+        if kept:
+            kept.unlink()
+        copies = fan_out_file(run_dir, label(shard), output_path)
+        error_path = output_path.with_suffix(".errors.jsonl")
+        shard = self.store.update(
+            shard, state="downloaded", route=REALTIME, batch_status="realtime", completed=results, failed=errors,
+            output_file=str(output_path), error_file=str(error_path) if errors else None,
+            cost=batch_cost + realtime_cost, attempts=0, error=None,
+        )
+        self.log(shard, f"realtime done: {results} results, {errors} errors, ${shard['cost']:.2f}"
+                        + (f" (${batch_cost:.2f} batch)" if kept else "")
+                        + (f", {copies} copied to duplicate records" if copies else ""))
+        return shard
+
+    def migrate(self, shard: dict, run_dir: Path, reason: str) -> dict:
+        """Move the shard to realtime; realtime() cancels its batch (if any) and runs what the batch did not finish."""
+        shard = self.store.update(shard, route=REALTIME, cost=self.router.cost(shard, REALTIME))
+        self.log(shard, f"{reason}: moving to realtime")
+        return self.realtime(shard, run_dir)
+
+    @contextmanager
+    def renewing_lease(self, run_id: str):
+        """Keep extending the run's lease while a long step (realtime calls) blocks the drive loop."""
+        ttl = self.max_poll * 2
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(ttl / 4):
+                self.store.acquire(run_id, self.owner, ttl)
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def next_check(self, shard: dict, interval: float) -> float:
+        """Next poll after `interval`, but no later than the shard's (future) migration point."""
+        now = time.time()
+        migrate_at = self.router.migrate_at(shard)
+        return min(now + jittered(interval), migrate_at) if migrate_at > now else now + jittered(interval)
+
+    # ------------------------------------------------------------------
+    # Reports (same files as the manual scripts)
+    # ------------------------------------------------------------------
+
+    def write_reports(self, run_dir: Path, jobs: List[dict], shards: List[dict]) -> None:
+        now = datetime.now().isoformat()
+        by_job = {}
+        for shard in shards:
+            by_job.setdefault(shard["job"], []).append(shard)
+
+        generated = [job for job in jobs if job["job"] in by_job]
+        write_json(run_dir / "manifest.json", {
+            "timestamp": run_dir.name,
+            "modules_processed": len(jobs),
+            "total_records": sum(job["records"] or 0 for job in generated),
+            "results": [
+                {"module": job["module"], "name": gbr.MODULES[job["module"]]["name"], "status": "success",
+                 "records": job["records"], "output_file": by_job[job["job"]][0]["request_file"],
+                 "shards": [{"file": s["request_file"], "records": s["records"], "tokens": s["tokens"]}
+                            for s in by_job[job["job"]]]}
+                for job in generated
+            ],
+        })
+
+        submitted = [shard for shard in shards if shard["batch_id"]]
+        if submitted:
+            write_json(run_dir / "upload_manifest.json", {
+                "timestamp": now,
+                "source_dir": str(run_dir),
+                "results": [
+                    {"file": Path(s["request_file"]).name, "file_id": s["file_id"], "batch_id": s["batch_id"],
+                     "status": s["batch_status"], "created_at": datetime.fromtimestamp(s["created_at"]).isoformat()}
+                    for s in submitted
+                ],
+            })
+
+        evaluations = [json.loads(job["evaluation"]) for job in jobs if job["evaluation"]]
+        if evaluations:
+            valid = [e for e in evaluations if "error" not in e]
+            total_correct = sum(e["correct"] for e in valid)
+            total_records = sum(e["total"] for e in valid)
+            grades = {}
+            for e in valid:
+                grades[e["grade"]] = grades.get(e["grade"], 0) + 1
+            write_json(run_dir / "evaluation_report.json", {
+                "timestamp": now,
+                "batch_dir": str(run_dir),
+                "evaluations": evaluations,
+                "summary": {
+                    "modules_evaluated": len(valid),
+                    "total_correct": total_correct,
+                    "total_records": total_records,
+                    "overall_accuracy": round(total_correct / total_records * 100, 2) if total_records else 0,
+                    "grade_distribution": grades,
+                },
+            })
+
+    @staticmethod
+    def log(row: dict, message: str) -> None:
+        print_line(f"[{datetime.now():%H:%M:%S}] {label(row):<10} {message}")
+
+
+def shard_results_file(shard: dict, run_dir: Path) -> Path:
+    """
+    A lone shard's results go straight to results/{module}_results.jsonl;
+    shards of a split module go to results/shards/ and are merged by run_shards().
+    """
+    results_dir = run_dir / "results"
+    if label(shard) != shard["job"]:
+        results_dir = results_dir / "shards"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    return results_dir / f"{label(shard)}_results.jsonl"
+
+
+def next_poll_at(job: dict, shards: List[dict]) -> float:
+    """When a job next has work: a running job's earliest open shard, otherwise its own time."""
+    if job["state"] == "running":
+        return min(
+            (s["next_poll_at"] for s in shards if s["job"] == job["job"] and s["state"] not in SHARD_DONE_STATES),
+            default=job["next_poll_at"],
+        )
+    return job["next_poll_at"]
+
+
+def write_json(path: Path, data: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def print_status(store: JobStore, run_id: str) -> None:
+    run = store.run(run_id)
+    shards = store.shards(run_id)
+    finished = "open"
+    if run["finished_at"]:
+        finished = f"finished {datetime.fromtimestamp(run['finished_at']):%Y-%m-%d %H:%M}"
+    print(f"Run {run_id} ({finished}) - {run['run_dir']}")
+    if run["deadline"] or run["budget"] is not None:
+        limits = [f"deadline {datetime.fromtimestamp(run['deadline']):%Y-%m-%d %H:%M}"] if run["deadline"] else []
+        limits += [f"budget ${run['budget']:.2f}"] if run["budget"] is not None else []
+        routes = [s["route"] for s in shards if s["route"]]
+        print(f"Router: {', '.join(limits)}; spent/committed ${store.run_cost(run_id):.2f}; "
+              f"{routes.count(BATCH)} batch / {routes.count(REALTIME)} realtime shard(s)")
+    print(f"{'Job':<12} {'State':<11} {'Batch':<13} {'Records':<9} {'Done/Fail':<11} {'Accuracy':<10} "
+          f"{'Next poll':<10} Error")
+    print("-" * 95)
+
+    def row(name, state, batch, records, done, accuracy, next_poll, error):
+        print(f"{name:<12} {state:<11} {batch:<13} {records:<9} {done:<11} {accuracy:<10} {next_poll:<10} {error}")
+
+    for job in store.jobs(run_id):
+        job_shards = [s for s in shards if s["job"] == job["job"]]
+        completed = sum(s["completed"] or 0 for s in job_shards)
+        failed = sum(s["failed"] or 0 for s in job_shards)
+        if len(job_shards) == 1:
+            batch = job_shards[0]["batch_status"] or job_shards[0]["state"]
+        elif job_shards:
+            batch = f"{sum(1 for s in job_shards if s['state'] == 'downloaded')}/{len(job_shards)} shards"
+        else:
+            batch = "-"
+        row(job["job"], job["state"], batch, job["records"] or "-",
+            f"{completed}/{failed}" if any(s["completed"] is not None for s in job_shards) else "-",
+            f"{job['accuracy']:.1f}% {job['grade']}" if job["accuracy"] is not None else "-",
+            f"{max(0, next_poll_at(job, shards) - time.time()):.0f}s" if job["state"] == "running" else "-",
+            job["error"] or "")
+        if len(job_shards) > 1:
+            for s in job_shards:
+                row(f"  s{s['shard']:03d}", s["state"], s["batch_status"] or "-", s["records"],
+                    f"{s['completed']}/{s['failed']}" if s["completed"] is not None else "-", "-",
+                    f"{max(0, s['next_poll_at'] - time.time()):.0f}s" if s["state"] not in SHARD_DONE_STATES
+                    else "-", s["error"] or "")
+
+
+def make_manager(store: JobStore, args) -> BatchJobManager:
+    from openai import OpenAI
+
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    limits = ShardLimits(max_requests=args.shard_requests) if getattr(args, "shard_requests", None) else None
+    return BatchJobManager(
+        store, client, poll=args.poll, max_poll=args.max_poll, limits=limits, workers=args.workers,
+        batch_eta=args.batch_eta, realtime_parallel=args.realtime_parallel,
+    )
+
+
+def set_limits(store: JobStore, run_id: str, args, parser) -> None:
+    """Store --deadline / --budget on the run (kept for later resumes)."""
+    if args.deadline is None and args.budget is None:
+        return
+    try:
+        deadline = parse_deadline(args.deadline) if args.deadline else None
+    except ValueError as e:
+        parser.error(str(e))
+    store.set_limits(run_id, deadline, args.budget)
+
+
+def drive(manager: BatchJobManager, run_id: str, wait: bool) -> None:
+    try:
+        manager.drive(run_id, wait=wait)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print()
+    print_status(manager.store, run_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resumable Batch API job manager (generate -> upload -> poll -> download -> evaluate)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/batch/batch_jobs.py run m12b m14 m15 m16
+  python scripts/batch/batch_jobs.py run --run-id nightly_20260301 --no-wait
+  python scripts/batch/batch_jobs.py run m12b m16 --deadline 8h --budget 25
+  python scripts/batch/batch_jobs.py resume
+  python scripts/batch/batch_jobs.py status
+
+Enqueued-token quota per model: BATCH_ENQUEUED_TOKEN_LIMITS in scripts/config.py
+(set BATCH_ENQUEUED_TOKENS to override it for every model). Prices for the
+router: MODEL_PRICING and BATCH_PRICE_FACTOR in scripts/config.py.
+        """
+    )
+    parser.add_argument("--db", type=Path, default=JOBS_DB, help="Job table (default: batch_requests/jobs.sqlite)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_drive_options(sub):
+        sub.add_argument("--poll", type=float, default=DEFAULT_POLL,
+                         help=f"Seconds before the first status check (default: {DEFAULT_POLL:.0f})")
+        sub.add_argument("--max-poll", type=float, default=DEFAULT_MAX_POLL,
+                         help=f"Backoff cap between status checks (default: {DEFAULT_MAX_POLL:.0f})")
+        sub.add_argument("--workers", type=int, default=download_workers(),
+                         help=f"Shards uploaded/checked/downloaded at once (default: {download_workers()}, "
+                              "or BATCH_DOWNLOAD_WORKERS)")
+        sub.add_argument("--no-wait", action="store_true", help="Advance what is due once and exit (for cron)")
+        sub.add_argument("--deadline",
+                         help="Finish by this time: a duration from now (8h, 90m) or an ISO time; routes shards "
+                              "between batch and realtime and migrates late batches (stored on the run)")
+        sub.add_argument("--budget", type=float, help="Max USD for the run; realtime only while it fits (stored)")
+        sub.add_argument("--batch-eta", type=parse_duration, default=BATCH_ETA,
+                         help="Expected batch turnaround used for routing (default: 6h; the API allows 24h)")
+        sub.add_argument("--realtime-parallel", type=int, default=REALTIME_PARALLEL,
+                         help=f"Concurrent calls for realtime shards (default: {REALTIME_PARALLEL})")
+
+    run_parser = subparsers.add_parser("run", help="Create a run and drive it to completion")
+    run_parser.add_argument("modules", nargs="*", help="Modules (default: all in generate_batch_requests.MODULES)")
+    run_parser.add_argument("--run-id", help="Run name and batch_requests/ subdirectory (default: timestamp); "
+                                             "an existing run is resumed")
+    run_parser.add_argument("--shard-requests", type=int,
+                            help="Max requests per batch file (default: the Batch API limit, BATCH_MAX_REQUESTS)")
+    add_drive_options(run_parser)
+
+    resume_parser = subparsers.add_parser("resume", help="Continue a run from its job table")
+    resume_parser.add_argument("run_id", nargs="?", help="Run to resume (default: latest unfinished)")
+    add_drive_options(resume_parser)
+
+    status_parser = subparsers.add_parser("status", help="Show a run's jobs and shards")
+    status_parser.add_argument("run_id", nargs="?", help="Run (default: latest)")
+
+    subparsers.add_parser("list", help="List runs")
+
+    args = parser.parse_args()
+    store = JobStore(args.db)
+
+    if args.command == "list":
+        for run in store.runs():
+            jobs = store.jobs(run["run_id"])
+            states = ", ".join(f"{state}={sum(1 for j in jobs if j['state'] == state)}"
+                               for state in dict.fromkeys(j["state"] for j in jobs))
+            print(f"{run['run_id']:<24} {'done' if run['finished_at'] else 'open':<5} {states}")
+        return
+
+    if args.command == "status":
+        runs = store.runs()
+        run_id = args.run_id or (runs[-1]["run_id"] if runs else None)
+        if not run_id or not store.run(run_id):
+            print(f"Error: no run {args.run_id or ''} in {args.db}".replace("  ", " "))
+            sys.exit(1)
+        print_status(store, run_id)
+        return
+
+    if args.command == "resume":
+        run = store.run(args.run_id) if args.run_id else store.latest_unfinished()
+        if not run:
+            print(f"Error: no run to resume in {args.db}")
+            sys.exit(1)
+        set_limits(store, run["run_id"], args, parser)
+        drive(make_manager(store, args), run["run_id"], not args.no_wait)
+        return
+
+    manager = make_manager(store, args)
+    if args.run_id and store.run(args.run_id):
+        print(f"Run {args.run_id} exists - resuming it")
+        run_id = args.run_id
+    else:
+        modules = args.modules or list(gbr.MODULES)
+        unknown = [m for m in modules if m not in gbr.MODULES]
+        if unknown:
+            parser.error(f"unknown module(s): {', '.join(unknown)}. Available: {', '.join(gbr.MODULES)}")
+        run_id = manager.create(modules, args.run_id)
+        print(f"Run {run_id}: {len(modules)} module(s), job table {args.db}")
+    set_limits(store, run_id, args, parser)
+    drive(manager, run_id, not args.no_wait)
+
+
+if __name__ == "__main__":
+    main()
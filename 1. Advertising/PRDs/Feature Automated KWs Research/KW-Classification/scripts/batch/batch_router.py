@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Deadline- and Cost-Aware Routing Between Batch and Realtime
+
+The Batch API costs BATCH_PRICE_FACTOR (half) of a realtime call but only
+promises results within 24 hours; realtime calls through the LLM engine
+(scripts/llm, the orchestrator's runtime) finish as fast as the rate limits
+allow. Given a run's deadline and budget, the Router picks a path per shard
+(batch_jobs.py run --deadline/--budget):
+
+- Batch when its expected turnaround (--batch-eta) still leaves time to
+  run the shard realtime before the deadline, so a late batch can be
+  rescued; realtime when the deadline is closer than that
+- Realtime only while the budget covers it (actual cost of finished
+  shards plus the estimates of shards in flight); otherwise batch, even if
+  it may miss the deadline. A shard no path can pay for is not started
+- A batch still in flight (or waiting for enqueued-token quota) when only
+  the realtime duration is left before the deadline is cancelled and its
+  shard migrated to realtime, if the budget allows: once the cancel has
+  settled, the results the batch already has are kept (at the batch price)
+  and only the other requests are called realtime
+
+Estimates: prompt tokens as in batch_sharding.py, COMPLETION_TOKENS per
+request, prices from the pricing registry (scripts/pricing.py), realtime
+duration from the model's RPM/TPM (config.MODEL_RATE_LIMITS) and
+concurrency; actual costs come from the usage in the downloaded result
+lines, with cached prompt tokens at the cached-input price. Without a deadline or
+budget every shard goes to the Batch API, as before.
+
+Usage:
+    router = Router(deadline=parse_deadline("6h"), budget=20.0)
+    route, reason = router.choose(shard, spent=store.run_cost(run_id))
+"""
+
+import json
+import math
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import DEFAULT_RATE_LIMITS, MODEL_RATE_LIMITS
+from jsonl_index import JsonlIndex, iter_jsonl
+from pricing import token_cost, usage_cost
+from retry_batch import is_success, retry_realtime
+
+BATCH_ETA = 6 * 3600.0       # Expected batch turnaround (the API allows up to 24h)
+REALTIME_PARALLEL = 20       # Concurrent realtime calls per shard
+REALTIME_CALL_SECONDS = 3.0  # Typical latency of one realtime call
+COMPLETION_TOKENS = 150      # Expected completion tokens per request (keyword_packing default)
+MIGRATE_MARGIN = 1.5         # Safety factor on the realtime duration estimate
+
+BATCH, REALTIME = "batch", "realtime"
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> float:
+    """'90m', '6h', '1.5d' or plain seconds -> seconds."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", text)
+    if not match:
+        raise ValueError(f"invalid duration {text!r} (e.g. 90m, 6h, 2d)")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+
+def parse_deadline(text: str, now: Optional[float] = None) -> float:
+    """Deadline as a duration from now ('6h') or a local ISO time ('2026-03-01T09:00') -> epoch seconds."""
+    try:
+        return (now or time.time()) + parse_duration(text)
+    except ValueError:
+        try:
+            return datetime.fromisoformat(text).timestamp()
+        except ValueError:
+            raise ValueError(f"invalid deadline {text!r} (a duration such as 6h, or an ISO time)") from None
+
+
+def results_cost(path: Path, model: Optional[str], route: str) -> float:
+    """Actual cost of a results file from its usage fields (deduplicated copies and lines without usage are free)."""
+    cost = 0.0
+    for line in iter_jsonl(path):
+        if "dedup_of" in line:
+            continue
+        body = (line.get("response") or {}).get("body") or {}
+        if body.get("usage"):
+            cost += usage_cost(body["usage"], body.get("model") or model, batch=route == BATCH)
+    return cost
+
+
+@dataclass
+class Router:
+    """Route decisions for the shards of one run."""
+    deadline: Optional[float] = None  # Epoch seconds
+    budget: Optional[float] = None    # USD for the whole run
+    batch_eta: float = BATCH_ETA
+    parallel: int = REALTIME_PARALLEL
+
+    def cost(self, shard: dict, route: str) -> float:
+        """Estimated cost of the shard on `route` (an unpriced model is estimated at DEFAULT_MODEL's price)."""
+        return token_cost(shard["model"], shard["tokens"], shard["records"] * COMPLETION_TOKENS,
+                          batch=route == BATCH, estimate=True)
+
+    def realtime_seconds(self, shard: dict) -> float:
+        """Estimated time to run the shard realtime (rate limits or concurrency, whichever binds)."""
+        rpm, tpm = MODEL_RATE_LIMITS.get(shard["model"], DEFAULT_RATE_LIMITS)
+        tokens = shard["tokens"] + shard["records"] * COMPLETION_TOKENS
+        rate_limited = max(shard["records"] / rpm, tokens / tpm) * 60
+        return max(rate_limited, math.ceil(shard["records"] / self.parallel) * REALTIME_CALL_SECONDS)
+
+    def left(self, spent: float) -> float:
+        return math.inf if self.budget is None else self.budget - spent
+
+    def choose(self, shard: dict, spent: float, now: Optional[float] = None) -> Tuple[Optional[str], str]:
+        """
+        (route, reason) for a shard not started yet; route is None when the
+        remaining budget covers neither path. `spent` is the run's cost so far.
+        """
+        now = now or time.time()
+        left = self.left(spent)
+        batch_cost, realtime_cost = self.cost(shard, BATCH), self.cost(shard, REALTIME)
+        if self.deadline is None:
+            route, reason = BATCH, "no deadline"
+        elif now + self.batch_eta + self.realtime_seconds(shard) * MIGRATE_MARGIN <= self.deadline:
+            route, reason = BATCH, "batch ETA fits the deadline"
+        elif realtime_cost <= left:
+            route, reason = REALTIME, "deadline too close for batch"
+        else:
+            route, reason = BATCH, f"realtime (${realtime_cost:.2f}) over budget, batch may miss the deadline"
+        if route == BATCH and batch_cost > left:
+            return None, f"over budget (${batch_cost:.3f} needed, ${max(left, 0):.3f} left)"
+        return route, reason
+
+    def migrate_at(self, shard: dict) -> float:
+        """Latest time a batch shard can still be finished realtime before the deadline."""
+        if self.deadline is None:
+            return math.inf
+        return self.deadline - self.realtime_seconds(shard) * MIGRATE_MARGIN
+
+    def should_migrate(self, shard: dict, spent: float, now: Optional[float] = None) -> Tuple[bool, str]:
+        """
+        Whether an unfinished batch shard should move to realtime now.
+        `spent` includes the shard's own batch estimate, which is released.
+        """
+        now = now or time.time()
+        if now < self.migrate_at(shard):
+            return False, ""
+        realtime_cost = self.cost(shard, REALTIME)
+        left = self.left(spent - self.cost(shard, BATCH))
+        if realtime_cost > left:
+            return False, f"deadline at risk, realtime (${realtime_cost:.2f}) over budget (${max(left, 0):.2f} left)"
+        return True, "deadline approaching"
+
+
+def run_realtime(
+    request_file: Path, output_path: Path, parallel: int = REALTIME_PARALLEL, kept: Optional[Path] = None,
+) -> Tuple[int, int, float]:
+    """
+    Run a batch request file through the LLM engine; batch-format result
+    lines go to `output_path`, failures to its `.errors.jsonl`. `kept` is
+    the output of a cancelled batch of the same requests: its successful
+    lines are carried over and only the other requests are called.
+    Returns (results, errors, cost of the realtime calls).
+    """
+    requests = JsonlIndex(request_file)
+    done = {line["custom_id"] for line in iter_jsonl(kept) if is_success(line)} if kept else set()
+    lines_path = output_path.with_name(output_path.name + ".realtime")
+    retry_realtime(requests, [custom_id for custom_id in requests if custom_id not in done], lines_path, parallel)
+    cost = results_cost(lines_path, None, REALTIME)
+    error_path = output_path.with_suffix(".errors.jsonl")
+    counts = {output_path: 0, error_path: 0}
+    partials = {path: path.with_name(path.name + ".part") for path in counts}
+    files = {path: open(partial, "w", encoding="utf-8") for path, partial in partials.items()}
+    try:
+        if kept:
+            for line in iter_jsonl(kept):
+                if is_success(line):
+                    files[output_path].write(json.dumps(line, ensure_ascii=False) + "\n")
+                    counts[output_path] += 1
+        for line in iter_jsonl(lines_path):
+            path = output_path if is_success(line) else error_path
+            files[path].write(json.dumps(line, ensure_ascii=False) + "\n")
+            counts[path] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    for path, partial in partials.items():
+        if counts[path] or path == output_path:
+            partial.replace(path)
+        else:
+            partial.unlink()
+            path.unlink(missing_ok=True)
+    lines_path.unlink()
+    requests.close()
+    return counts[output_path], counts[error_path], cost
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Batch File Sharding and Enqueued-Token Quota
+
+The Batch API rejects an input file over BATCH_MAX_REQUESTS requests or
+BATCH_MAX_FILE_MB, and fails a batch (`token_limit_exceeded`) when the
+prompt tokens enqueued for its model across all in-flight batches would go
+over the organization's quota (BATCH_ENQUEUED_TOKEN_LIMITS in config.py,
+BATCH_ENQUEUED_TOKENS overrides it for every model).
+
+- ShardWriter splits a module's requests into `*_batch.jsonl` files within
+  those limits, each at most one quota's worth of tokens, so every shard
+  can be submitted on its own
+- fits_quota() decides whether a shard can be submitted next to what is
+  already enqueued; the rest wait for earlier shards to complete, and a
+  batch the provider still rejects for quota (is_quota_rejection) is
+  resubmitted later (batch_jobs.py, upload_synthetic_batch.py)
+
+Token counts are the rate limiter's chars/4 estimate; QUOTA_HEADROOM keeps
+a margin for the difference to the provider's tokenizer.
+
+Usage:
+    with ShardWriter(output_dir, "m12b") as writer:
+        for request in requests:
+            writer.write(request)
+    for shard in writer.shards:
+        print(shard["file"], shard["records"], shard["tokens"])
+"""
+
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import (
+    BATCH_MAX_REQUESTS, BATCH_MAX_FILE_MB, BATCH_ENQUEUED_TOKEN_LIMITS, DEFAULT_BATCH_ENQUEUED_TOKENS,
+)
+from llm.rate_limiter import estimate_prompt_tokens
+
+QUOTA_HEADROOM = 0.9  # Share of the enqueued-token quota actually scheduled
+
+
+def enqueued_token_quota(model: str) -> int:
+    """Prompt tokens that may be enqueued for `model` at once (after headroom)."""
+    limit = os.getenv("BATCH_ENQUEUED_TOKENS")
+    limit = int(limit) if limit else BATCH_ENQUEUED_TOKEN_LIMITS.get(model, DEFAULT_BATCH_ENQUEUED_TOKENS)
+    return int(limit * QUOTA_HEADROOM)
+
+
+def fits_quota(enqueued: int, tokens: int, model: str) -> bool:
+    """
+    Whether a shard of `tokens` can be submitted with `enqueued` tokens
+    already in flight. A shard always fits an empty queue, so one that is
+    over the quota on its own still runs instead of waiting forever.
+    """
+    return enqueued == 0 or enqueued + tokens <= enqueued_token_quota(model)
+
+
+def request_tokens(request: dict) -> int:
+    """Estimated enqueued (prompt) tokens of one batch request line."""
+    return estimate_prompt_tokens(request.get("body", {}).get("messages", []))
+
+
+def file_tokens(path: Path) -> Tuple[Optional[str], int]:
+    """(model, estimated enqueued tokens) of an existing batch file."""
+    model, tokens = None, 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                request = json.loads(line)
+                model = model or request.get("body", {}).get("model")
+                tokens += request_tokens(request)
+    return model, tokens
+
+
+def module_of(stem: str) -> str:
+    """Module of a (shard) file stem: m12b_s002 -> m12b"""
+    return re.sub(r"_s\d{3}$", "", stem)
+
+
+def is_quota_rejection(batch) -> bool:
+    """Batch failed because the model's enqueued-token quota was full (resubmit later)."""
+    errors = batch.errors.data if batch.status == "failed" and batch.errors else []
+    return any(error.code == "token_limit_exceeded" for error in errors)
+
+
+@dataclass
+class ShardLimits:
+    """Per-file caps; `max_tokens` defaults to the request model's quota."""
+    max_requests: int = BATCH_MAX_REQUESTS
+    max_bytes: int = BATCH_MAX_FILE_MB * 1024 * 1024
+    max_tokens: Optional[int] = None
+
+
+class ShardWriter:
+    """
+    Writes batch requests to `{stem}_batch.jsonl`, rolling over to
+    `{stem}_s001_batch.jsonl`, `{stem}_s002_batch.jsonl`, ... when a limit
+    would be exceeded. A single shard keeps the unsharded name.
+    """
+
+    def __init__(self, output_dir: Path, stem: str, limits: Optional[ShardLimits] = None):
+        self.output_dir = Path(output_dir)
+        self.stem = stem
+        self.limits = limits or ShardLimits()
+        self.shards: List[dict] = []
+        self._file = None
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _path(self, index: int) -> Path:
+        return self.output_dir / f"{self.stem}_s{index:03d}_batch.jsonl"
+
+    def write(self, request: dict) -> None:
+        line = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+        tokens = request_tokens(request)
+        model = request.get("body", {}).get("model")
+        if self.limits.max_tokens is None:
+            self.limits.max_tokens = enqueued_token_quota(model)
+
+        shard = self.shards[-1] if self.shards else None
+        if shard is None or shard["records"] and (
+            shard["records"] + 1 > self.limits.max_requests
+            or shard["bytes"] + len(line) > self.limits.max_bytes
+            or shard["tokens"] + tokens > self.limits.max_tokens
+        ):
+            if self._file:
+                self._file.close()
+            path = self._path(len(self.shards) + 1)
+            self._file = open(path, "wb")
+            shard = {"file": str(path), "model": model, "records": 0, "bytes": 0, "tokens": 0}
+            self.shards.append(shard)
+
+        self._file.write(line)
+        shard["records"] += 1
+        shard["bytes"] += len(line)
+        shard["tokens"] += tokens
+
+    def close(self) -> List[dict]:
+        """Close the last file; a lone shard is renamed to `{stem}_batch.jsonl`."""
+        if self._file:
+            self._file.close()
+            self._file = None
+        if len(self.shards) == 1 and Path(self.shards[0]["file"]) == self._path(1):
+            path = self.output_dir / f"{self.stem}_batch.jsonl"
+            self._path(1).replace(path)
+            self.shards[0]["file"] = str(path)
+        return self.shards
@@ -2,6 +2,13 @@
 """
 Calculate token usage and costs for OpenAI batch requests.
 
+Usage is read from the result files already downloaded to <batch_dir>/results/
+(download_synthetic_results.py); only batches without a local file are
+looked up through the API, and their output is saved there for next time.
+Each result line is priced at its own model's batch price, cached prompt
+tokens at the cached-input rate (scripts/pricing.py). Models missing from
+the registry are listed as unpriced and count $0 toward the totals.
+
 Usage:
     python scripts/batch/calculate_batch_costs.py <batch_dir>
     python scripts/batch/calculate_batch_costs.py --all
@@ -13,64 +20,54 @@ import os
 from pathlib import Path
 from datetime import datetime
 
-from openai import OpenAI
 from dotenv import load_dotenv
 
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 load_dotenv(PROJECT_ROOT / ".env")
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from config import DEFAULT_MODEL
+from jsonl_index import iter_jsonl
+from pricing import model_price, normalize_model, pricing_table, usage_cost
+from batch_download import stream_file
+
+_client = None
+
 
-# Pricing per 1M tokens (Batch API = 50% off regular price)
-# gpt-4o-mini batch pricing as of Jan 2025
-PRICING = {
-    "gpt-4o-mini": {
-        "input": 0.075,   # $0.075 per 1M input tokens
-        "output": 0.30,   # $0.30 per 1M output tokens
-    },
-    "gpt-4o": {
-        "input": 1.25,    # $1.25 per 1M input tokens
-        "output": 5.00,   # $5.00 per 1M output tokens
-    },
-}
+def get_client():
+    """OpenAI client, created only when a batch has to be looked up."""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
 
-def get_batch_token_usage(batch_id: str, output_file_id: str) -> dict:
-    """Download batch results and calculate total token usage."""
+def get_batch_token_usage(results_path: Path) -> dict:
+    """Token usage and batch cost of a downloaded results file."""
     try:
-        content = client.files.content(output_file_id)
-
-        total_prompt = 0
-        total_completion = 0
-        total_requests = 0
-
-        for line in content.text.strip().split("\n"):
-            if not line.strip():
-                continue
-            result = json.loads(line)
-            usage = result.get("response", {}).get("body", {}).get("usage", {})
-            total_prompt += usage.get("prompt_tokens", 0)
-            total_completion += usage.get("completion_tokens", 0)
-            total_requests += 1
-
-        return {
-            "requests": total_requests,
-            "prompt_tokens": total_prompt,
-            "completion_tokens": total_completion,
-            "total_tokens": total_prompt + total_completion,
-        }
+        totals = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        models = set()
+        for line in iter_jsonl(results_path):
+            if "dedup_of" in line:
+                continue  # Copy of another record's result, not billed
+            body = (line.get("response") or {}).get("body") or {}
+            usage = body.get("usage") or {}
+            model = body.get("model") or DEFAULT_MODEL
+            models.add(normalize_model(model) or model)
+            totals["requests"] += 1
+            totals["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            totals["cached_tokens"] += (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+            totals["completion_tokens"] += usage.get("completion_tokens", 0)
+            totals["cost_usd"] += usage_cost(usage, model, batch=True)
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        totals["models"] = sorted(models)
+        totals["unpriced_models"] = [model for model in totals["models"] if model_price(model) is None]
+        return totals
     except Exception as e:
         return {"error": str(e)}
 
 
-def calculate_cost(prompt_tokens: int, completion_tokens: int, model: str = "gpt-4o-mini") -> float:
-    """Calculate cost in USD."""
-    pricing = PRICING.get(model, PRICING["gpt-4o-mini"])
-    input_cost = (prompt_tokens / 1_000_000) * pricing["input"]
-    output_cost = (completion_tokens / 1_000_000) * pricing["output"]
-    return input_cost + output_cost
-
-
 def process_batch_directory(batch_dir: Path) -> dict:
     """Process all batches in a directory."""
     upload_log_path = batch_dir / "upload_log.json"
@@ -85,7 +82,8 @@ def process_batch_directory(batch_dir: Path) -> dict:
     results = {
         "directory": str(batch_dir),
         "processed_at": datetime.now().isoformat(),
-        "model": "gpt-4o-mini",
+        "models": [],
+        "unpriced_models": [],
         "batches": [],
         "totals": {
             "completed": 0,
@@ -93,11 +91,13 @@ def process_batch_directory(batch_dir: Path) -> dict:
             "failed": 0,
             "requests": 0,
             "prompt_tokens": 0,
+            "cached_tokens": 0,
             "completion_tokens": 0,
             "total_tokens": 0,
             "cost_usd": 0.0,
         }
     }
+    results_dir = batch_dir / "results"
 
     print(f"Processing {len(batches)} batches...")
     print()
@@ -105,36 +105,45 @@ def process_batch_directory(batch_dir: Path) -> dict:
     for b in batches:
         batch_id = b.get("batch_id")
         filename = b.get("file")
+        results_path = results_dir / filename.replace("_batch.jsonl", "_results.jsonl")
 
         try:
-            batch = client.batches.retrieve(batch_id)
-            status = batch.status
+            if results_path.exists():
+                status, requests = "completed", None
+            else:
+                batch = get_client().batches.retrieve(batch_id)
+                status = batch.status
+                requests = batch.request_counts.total if batch.request_counts else 0
+                if status == "completed" and batch.output_file_id:
+                    results_dir.mkdir(exist_ok=True)
+                    stream_file(get_client(), batch.output_file_id, results_path)
 
             batch_result = {
                 "file": filename,
                 "batch_id": batch_id,
                 "status": status,
-                "requests": batch.request_counts.total if batch.request_counts else 0,
+                "requests": requests,
             }
 
             if status == "completed":
                 results["totals"]["completed"] += 1
 
-                if batch.output_file_id:
-                    usage = get_batch_token_usage(batch_id, batch.output_file_id)
+                if results_path.exists():
+                    usage = get_batch_token_usage(results_path)
 
                     if "error" not in usage:
                         batch_result.update(usage)
-                        cost = calculate_cost(usage["prompt_tokens"], usage["completion_tokens"])
-                        batch_result["cost_usd"] = cost
-
-                        results["totals"]["requests"] += usage["requests"]
-                        results["totals"]["prompt_tokens"] += usage["prompt_tokens"]
-                        results["totals"]["completion_tokens"] += usage["completion_tokens"]
-                        results["totals"]["total_tokens"] += usage["total_tokens"]
-                        results["totals"]["cost_usd"] += cost
-
-                        print(f"✓ {filename}: {usage['total_tokens']:,} tokens, ${cost:.4f}")
+                        for key in ("requests", "prompt_tokens", "cached_tokens", "completion_tokens",
+                                    "total_tokens", "cost_usd"):
+                            results["totals"][key] += usage[key]
+                        results["models"] = sorted(set(results["models"]) | set(usage["models"]))
+                        results["unpriced_models"] = sorted(
+                            set(results["unpriced_models"]) | set(usage["unpriced_models"])
+                        )
+
+                        unpriced = ", ".join(usage["unpriced_models"])
+                        unpriced = f" (unpriced: {unpriced})" if unpriced else ""
+                        print(f"✓ {filename}: {usage['total_tokens']:,} tokens, ${usage['cost_usd']:.4f}{unpriced}")
                     else:
                         print(f"⚠ {filename}: {usage['error']}")
             elif status == "in_progress":
@@ -171,6 +180,7 @@ def main():
     all_results = []
     grand_totals = {
         "prompt_tokens": 0,
+        "cached_tokens": 0,
         "completion_tokens": 0,
         "total_tokens": 0,
         "cost_usd": 0.0,
@@ -188,6 +198,7 @@ def main():
         if results:
             all_results.append(results)
             grand_totals["prompt_tokens"] += results["totals"]["prompt_tokens"]
+            grand_totals["cached_tokens"] += results["totals"]["cached_tokens"]
             grand_totals["completion_tokens"] += results["totals"]["completion_tokens"]
             grand_totals["total_tokens"] += results["totals"]["total_tokens"]
             grand_totals["cost_usd"] += results["totals"]["cost_usd"]
@@ -206,14 +217,24 @@ def main():
     print("=" * 70)
     print(f"Batches completed:    {grand_totals['completed']}")
     print(f"Batches in progress:  {grand_totals['in_progress']}")
-    print(f"Prompt tokens:        {grand_totals['prompt_tokens']:,}")
+    print(f"Prompt tokens:        {grand_totals['prompt_tokens']:,} ({grand_totals['cached_tokens']:,} cached)")
     print(f"Completion tokens:    {grand_totals['completion_tokens']:,}")
     print(f"Total tokens:         {grand_totals['total_tokens']:,}")
     print(f"Estimated cost:       ${grand_totals['cost_usd']:.4f}")
+    unpriced = sorted({model for results in all_results for model in results["unpriced_models"]})
+    if unpriced:
+        print(f"Unpriced models:      {', '.join(unpriced)} (not in the registry, not included in the cost)")
     print()
-    print("Pricing (gpt-4o-mini batch):")
-    print("  Input:  $0.075 / 1M tokens")
-    print("  Output: $0.30 / 1M tokens")
+    table = pricing_table()
+    models = sorted({model for results in all_results for model in results["models"]})
+    print("Batch pricing per 1M tokens (scripts/pricing.py):")
+    for model in models:
+        if model_price(model) is None:
+            print(f"  {model}: unpriced")
+            continue
+        price, factor = table[model], table[model]["batch_factor"]
+        print(f"  {model}: input ${price['input'] * factor:.4g}, cached ${price['cached_input'] * factor:.4g}, "
+              f"output ${price['output'] * factor:.4g}")
 
 
 if __name__ == "__main__":
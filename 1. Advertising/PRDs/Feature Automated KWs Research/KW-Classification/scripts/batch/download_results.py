@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 """
-Download results from completed OpenAI batch jobs.
+Download results from finished OpenAI batch jobs.
+
+Completed batches and those that ended early (expired, cancelled) are
+downloaded alike: an expired or cancelled batch keeps the results it had
+finished, and retry_batch.py re-runs the rest. Output files are streamed to disk in chunks, several batches at once
+(BATCH_DOWNLOAD_WORKERS, default 4); see batch_download.py. Results of
+deduplicated requests are then copied to the records that repeated them
+(batch_dedup.py).
 
 Usage:
     python scripts/batch/download_results.py <batch_dir>
@@ -15,38 +22,43 @@ from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from batch_download import download_workers, print_line, run_parallel, stream_file
+from batch_dedup import fan_out_file
+
 # Load environment variables
 load_dotenv()
 
 # Initialize OpenAI client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+REMOTE_DONE = ("completed", "failed", "expired", "cancelled")
+
 
 def download_batch_results(batch_id: str, output_path: Path) -> dict:
-    """Download results for a completed batch."""
+    """Download the output and error files of a finished batch (completed, expired or cancelled)."""
 
     # Get batch info
     batch = client.batches.retrieve(batch_id)
 
-    if batch.status != "completed":
+    if batch.status not in REMOTE_DONE:
         return {
             "status": "not_ready",
             "batch_status": batch.status,
-            "message": f"Batch is {batch.status}, not completed"
+            "message": f"Batch is {batch.status}, not finished"
         }
 
-    if not batch.output_file_id:
+    if not batch.output_file_id and not batch.error_file_id:
         return {
             "status": "no_output",
-            "message": "Batch completed but no output file"
+            "batch_status": batch.status,
+            "message": f"Batch {batch.status} without output file"
         }
 
-    # Download output file
-    file_content = client.files.content(batch.output_file_id)
-
-    # Save to file
-    with open(output_path, "wb") as f:
-        f.write(file_content.read())
+    # Stream output file to disk (an expired/cancelled batch may only have an error file)
+    if batch.output_file_id:
+        stream_file(client, batch.output_file_id, output_path)
+    else:
+        output_path.write_text("")
 
     # Count results
     results_count = 0
@@ -59,9 +71,7 @@ def download_batch_results(batch_id: str, output_path: Path) -> dict:
     errors_count = 0
     if batch.error_file_id:
         error_path = output_path.with_suffix(".errors.jsonl")
-        error_content = client.files.content(batch.error_file_id)
-        with open(error_path, "wb") as f:
-            f.write(error_content.read())
+        stream_file(client, batch.error_file_id, error_path)
 
         with open(error_path, "r", encoding="utf-8") as f:
             for line in f:
@@ -70,6 +80,7 @@ def download_batch_results(batch_id: str, output_path: Path) -> dict:
 
     return {
         "status": "downloaded",
+        "batch_status": batch.status,
         "output_file": str(output_path),
         "results_count": results_count,
         "errors_count": errors_count,
@@ -116,38 +127,43 @@ def main():
     print(f"Directory: {batch_dir}")
     print(f"Results dir: {results_dir}")
     print(f"Batches: {len(batches)}")
+    print(f"Parallel downloads: {download_workers()}")
     print()
 
-    # Download each batch
-    download_results = []
-
-    for batch_info in batches:
+    def download(batch_info: dict) -> dict:
         module = batch_info["file"].replace("_batch.jsonl", "")
         batch_id = batch_info["batch_id"]
-
-        print(f"Processing {module}...", end=" ")
-
         output_path = results_dir / f"{module}_results.jsonl"
 
         try:
             result = download_batch_results(batch_id, output_path)
             result["module"] = module
             result["batch_id"] = batch_id
-            download_results.append(result)
-
             if result["status"] == "downloaded":
-                print(f"✓ {result['results_count']} results")
-            else:
-                print(f"⏳ {result['message']}")
-
+                result["dedup_copies"] = fan_out_file(batch_dir, module, output_path)
         except Exception as e:
-            print(f"✗ Error: {e}")
-            download_results.append({
+            result = {
                 "module": module,
                 "batch_id": batch_id,
                 "status": "error",
                 "error": str(e)
-            })
+            }
+
+        if result["status"] == "downloaded":
+            copies = result["dedup_copies"]
+            print_line(f"{module}: ✓ {result['results_count']} results"
+                       + (f" (+{copies} copied to duplicate records)" if copies else "")
+                       + (f" (batch {result['batch_status']})" if result["batch_status"] != "completed" else ""))
+        elif result["status"] == "error":
+            print_line(f"{module}: ✗ Error: {result['error']}")
+        elif result["status"] == "no_output":
+            print_line(f"{module}: ✗ {result['message']}")
+        else:
+            print_line(f"{module}: ⏳ {result['message']}")
+        return result
+
+    # Download batches in parallel (report keeps manifest order)
+    download_results = run_parallel(download, batches)
 
     # Summary
     print()
@@ -157,7 +173,9 @@ def main():
 
     downloaded = [r for r in download_results if r["status"] == "downloaded"]
     not_ready = [r for r in download_results if r["status"] == "not_ready"]
+    no_output = [r for r in download_results if r["status"] == "no_output"]
     errors = [r for r in download_results if r["status"] == "error"]
+    ended_early = [r for r in downloaded + no_output if r["batch_status"] != "completed"]
 
     total_results = sum(r.get("results_count", 0) for r in downloaded)
     total_errors = sum(r.get("errors_count", 0) for r in downloaded)
@@ -168,6 +186,12 @@ def main():
     if total_errors > 0:
         print(f"Total errors: {total_errors}")
 
+    if ended_early:
+        print()
+        print("Ended before completing (results kept, the rest is missing):")
+        for r in ended_early:
+            print(f"  {r['module']}: {r['batch_status']}, {r.get('results_count', 0)} results")
+
     if not_ready:
         print()
         print("Not ready (still processing):")
@@ -188,6 +212,7 @@ def main():
         "summary": {
             "downloaded": len(downloaded),
             "not_ready": len(not_ready),
+            "ended_early": len(ended_early),
             "errors": len(errors),
             "total_results": total_results,
             "total_errors": total_errors
@@ -200,13 +225,20 @@ def main():
 
     print(f"\nDownload report saved: {report_file}")
 
-    if downloaded:
+    incomplete = ended_early or total_errors > 0 or total_results < sum(
+        r["request_counts"]["total"] for r in downloaded
+    )
+    if downloaded or no_output:
         print()
         print("=" * 70)
         print("NEXT STEPS")
         print("=" * 70)
-        print("Evaluate results against expected outputs:")
-        print(f"  python scripts/batch/evaluate_results.py {batch_dir}")
+        if downloaded:
+            print("Evaluate results against expected outputs:")
+            print(f"  python scripts/batch/evaluate_results.py {batch_dir}")
+        if incomplete:
+            print("Retry failed and missing requests (merged back in place):")
+            print(f"  python scripts/batch/retry_batch.py {batch_dir}")
 
 
 if __name__ == "__main__":
@@ -6,6 +6,10 @@ Creates:
 1. Labeled synthetic datasets in datasets/synthetic_labeled/
 2. Experiment results in experiment_results/ with proper format
 
+Output files are streamed to <batch_dir>/results/ several at a time
+(batch_download.py) and joined to the datasets through a custom_id index
+(jsonl_index.py), so no file is held in memory whole.
+
 Usage:
     python scripts/batch/download_synthetic_results.py <batch_dir>
 """
@@ -27,6 +31,10 @@ load_dotenv(PROJECT_ROOT / ".env")
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from jsonl_index import JsonlIndex
+from batch_download import print_line, run_parallel, stream_file
+
 SYNTHETIC_DIR = PROJECT_ROOT / "datasets" / "synthetic"
 LABELED_DIR = PROJECT_ROOT / "datasets" / "synthetic_labeled"
 EXPERIMENT_DIR = PROJECT_ROOT / "experiment_results"
@@ -92,16 +100,11 @@ MODULE_CONFIGS = {
 }
 
 
-def download_batch_results(batch_id: str, output_file_id: str) -> list[dict]:
-    """Download and parse batch results."""
-    content = client.files.content(output_file_id)
-    results = []
-
-    for line in content.text.strip().split("\n"):
-        if line.strip():
-            results.append(json.loads(line))
-
-    return results
+def download_batch_results(output_file_id: str, output_path: Path) -> int:
+    """Stream batch results to `output_path`; returns the number of results."""
+    stream_file(client, output_file_id, output_path)
+    with open(output_path, "rb") as f:
+        return sum(1 for line in f if line.strip())
 
 
 def parse_model_output(response: dict) -> dict | None:
@@ -140,7 +143,7 @@ def load_schema(module_id: str) -> dict:
 
 def process_module_batches(
     module_id: str,
-    batch_results: dict[str, list[dict]],  # sd_num -> results
+    batch_results: dict[str, list[Path]],  # sd_num -> result files (shards)
     output_dir: Path,
 ) -> dict:
     """Process all batch results for a module and create experiment files."""
@@ -156,7 +159,7 @@ def process_module_batches(
     total_records = 0
     created_files = []
 
-    for sd_num, results in batch_results.items():
+    for sd_num, result_files in batch_results.items():
         # Find original dataset
         pattern = f"{module_id}_sd{sd_num}_*.jsonl"
         dataset_files = list(SYNTHETIC_DIR.glob(pattern))
@@ -165,27 +168,14 @@ def process_module_batches(
 
         dataset_file = dataset_files[0]
 
-        # Load original records
-        original_records = {}
-        for line in dataset_file.read_text().strip().split("\n"):
-            if line.strip():
-                record = json.loads(line)
-                original_records[record.get("id", "")] = record
-
-        # Index results by record_id
-        results_by_id = {}
-        for result in results:
-            custom_id = result.get("custom_id", "")
-            # Parse: m01a_sd01_B0BQPGJ9LQ -> B0BQPGJ9LQ
-            parts = custom_id.split("_")
-            if len(parts) >= 3:
-                record_id = "_".join(parts[2:])
-                results_by_id[record_id] = result
+        # Index original records and results (custom_id: m01a_sd01_B0BQPGJ9LQ for record B0BQPGJ9LQ)
+        original_records = JsonlIndex(dataset_file, key="id")
+        results = JsonlIndex(result_files)
 
         # Create CSV rows
         csv_rows = []
         for record_id, record in original_records.items():
-            result = results_by_id.get(record_id)
+            result = results.get(f"{module_id}_sd{sd_num}_{record_id}")
             model_output = parse_model_output(result) if result else None
 
             if model_output:
@@ -246,7 +236,7 @@ def process_module_batches(
         labeled_file = LABELED_DIR / dataset_file.name
         with open(labeled_file, "w", encoding="utf-8") as f:
             for record_id, record in original_records.items():
-                result = results_by_id.get(record_id)
+                result = results.get(f"{module_id}_sd{sd_num}_{record_id}")
                 model_output = parse_model_output(result) if result else None
                 if model_output:
                     record["expected"] = model_output
@@ -286,8 +276,11 @@ def main():
     print(f"Experiments: {EXPERIMENT_DIR}")
     print()
 
-    # Group batches by module
-    module_results: dict[str, dict[str, list]] = {}  # module -> {sd_num -> results}
+    results_dir = batch_dir / "results"
+    results_dir.mkdir(exist_ok=True)
+
+    # Completed batches to download
+    downloads = []
 
     for status in statuses:
         if status.get("status") != "completed":
@@ -305,25 +298,32 @@ def main():
             continue
 
         filename = batch_info["file"]
-        match = re.match(r"(m\d+[ab]?)_sd(\d+)_batch\.jsonl", filename)
+        match = re.match(r"(m\d+[ab]?)_sd(\d+)(?:_s\d+)?_batch\.jsonl", filename)
         if not match:
             continue
 
-        module_id = match.group(1)
-        sd_num = match.group(2)
-
-        print(f"Downloading {module_id}_sd{sd_num}...", end=" ")
+        downloads.append({
+            "module_id": match.group(1),
+            "sd_num": match.group(2),
+            "output_file_id": output_file_id,
+            "output_path": results_dir / filename.replace("_batch.jsonl", "_results.jsonl"),
+        })
 
+    def download(item: dict) -> bool:
+        name = item["output_path"].name[:-len("_results.jsonl")]
         try:
-            results = download_batch_results(batch_id, output_file_id)
-            print(f"✓ {len(results)} results")
-
-            if module_id not in module_results:
-                module_results[module_id] = {}
-            module_results[module_id][sd_num] = results
-
+            count = download_batch_results(item["output_file_id"], item["output_path"])
+            print_line(f"{name}: ✓ {count} results")
+            return True
         except Exception as e:
-            print(f"✗ Error: {e}")
+            print_line(f"{name}: ✗ Error: {e}")
+            return False
+
+    # Group result files by module; shards of one synthetic dataset are merged
+    module_results: dict[str, dict[str, list]] = {}  # module -> {sd_num -> result files}
+    for item, ok in zip(downloads, run_parallel(download, downloads)):
+        if ok:
+            module_results.setdefault(item["module_id"], {}).setdefault(item["sd_num"], []).append(item["output_path"])
 
     # Process each module
     print()
@@ -9,10 +9,15 @@ Usage:
 """
 
 import json
+import re
 import sys
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
+from typing import Iterable, Iterator
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from jsonl_index import JsonlIndex, iter_jsonl
 
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -87,28 +92,14 @@ DATASET_FILES = {
 }
 
 
-def load_dataset(filepath: Path) -> list[dict]:
-    """Load JSONL dataset."""
-    records = []
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                records.append(json.loads(line))
-    return records
+def load_dataset(filepath: Path) -> Iterator[dict]:
+    """Stream JSONL dataset records."""
+    return iter_jsonl(filepath)
 
 
-def load_batch_results(filepath: Path) -> dict:
-    """Load batch results into a dict keyed by custom_id."""
-    results = {}
-    with open(filepath, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                record = json.loads(line)
-                custom_id = record.get("custom_id", "")
-                results[custom_id] = record
-    return results
+def load_batch_results(filepath: Path | list[Path]) -> JsonlIndex:
+    """Index batch results (one file, or the files of a sharded module) by custom_id; records are read on lookup."""
+    return JsonlIndex(filepath)
 
 
 def extract_model_output(batch_result: dict) -> dict | None:
@@ -259,7 +250,7 @@ def compare_list_of_dicts(expected: list, actual: list, key_field: str = None) -
     }
 
 
-def evaluate_module(module_id: str, results_file: Path, dataset: list[dict]) -> dict:
+def evaluate_module(module_id: str, results_file: Path | list[Path], dataset: Iterable[dict]) -> dict:
     """Evaluate results for a single module."""
 
     config = MODULE_CONFIGS.get(module_id)
@@ -381,8 +372,12 @@ def main():
         print("Run download_results.py first.")
         sys.exit(1)
 
-    # Find result files
+    # Find result files; shards of one module (m12b_s001_results.jsonl, ...) are evaluated together
     result_files = sorted(results_dir.glob("*_results.jsonl"))
+    module_files = defaultdict(list)
+    for result_file in result_files:
+        module_id = re.sub(r"(_s\d{3})?_results$", "", result_file.stem)
+        module_files[module_id].append(result_file)
 
     if not result_files:
         print(f"Error: No *_results.jsonl files found in {results_dir}")
@@ -392,7 +387,7 @@ def main():
     print("BATCH RESULTS EVALUATION")
     print("=" * 80)
     print(f"Results directory: {results_dir}")
-    print(f"Modules to evaluate: {len(result_files)}")
+    print(f"Modules to evaluate: {len(module_files)}")
     print()
 
     # Evaluate each module
@@ -401,8 +396,7 @@ def main():
     print(f"{'Module':<10} {'Correct':<10} {'Total':<10} {'Accuracy':<12} {'Grade'}")
     print("-" * 80)
 
-    for result_file in result_files:
-        module_id = result_file.stem.replace("_results", "")
+    for module_id, files in module_files.items():
 
         # Load dataset
         dataset_file = DATASET_FILES.get(module_id)
@@ -416,7 +410,7 @@ def main():
             continue
 
         dataset = load_dataset(dataset_path)
-        evaluation = evaluate_module(module_id, result_file, dataset)
+        evaluation = evaluate_module(module_id, files, dataset)
         evaluations.append(evaluation)
 
         if "error" in evaluation:
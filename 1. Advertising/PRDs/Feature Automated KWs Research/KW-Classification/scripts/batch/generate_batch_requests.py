@@ -3,7 +3,12 @@
 Generate OpenAI Batch API request files for all modules.
 
 Creates one JSONL file per module with all records from the dataset.
-Each line is a batch request in OpenAI's format.
+Each line is a batch request in OpenAI's format. Modules over the Batch API
+file limits or the model's enqueued-token quota are split into shards
+({module}_s001_batch.jsonl, ...; see batch_sharding.py). Records whose
+request body repeats an earlier record's are not sent again: the file holds
+each unique body once, and {module}_dedup.json maps it to the duplicates'
+custom_ids, which receive a copy of its result on download (batch_dedup.py).
 
 Usage:
     python scripts/batch/generate_batch_requests.py [module1 module2 ...]
@@ -21,6 +26,14 @@ import os
 from pathlib import Path
 from datetime import datetime
 
+# Add scripts folder to path for prompt_template import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+from prompt_template import compile_template
+from batch_sharding import ShardLimits, ShardWriter
+from batch_dedup import save_dedup
+from llm.dedup import RequestDeduper
+
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 DATASETS_DIR = PROJECT_ROOT / "datasets"
@@ -252,30 +265,24 @@ def load_schema(filepath: Path) -> dict:
 
 def fill_prompt_template(template: str, record: dict) -> str:
     """Replace placeholders in template with record values."""
-    result = template
-
-    # Find all placeholders like {{key}}
-    import re
-    placeholders = re.findall(r'\{\{(\w+)\}\}', template)
+    compiled = compile_template(template)
+    input_data = record.get("input", {})
 
-    for key in placeholders:
-        placeholder = f"{{{{{key}}}}}"
-        value = record.get(key) or record.get("input", {}).get(key)
+    values = {}
+    for key in compiled.placeholders:
+        value = record.get(key) or input_data.get(key)
 
         if value is None:
             value = "null"  # Explicit null for LLM clarity
-        elif isinstance(value, list):
-            # Always use JSON array format for consistency with examples
-            value = json.dumps(value)
-        elif isinstance(value, dict):
-            # Compact JSON to match example format
+        elif isinstance(value, (list, dict)):
+            # Compact JSON (arrays and objects) to match example format
             value = json.dumps(value)
         else:
-            value = str(value) if value is not None else ""
+            value = str(value)
 
-        result = result.replace(placeholder, value)
+        values[key] = value
 
-    return result
+    return compiled.render(values)
 
 
 def create_batch_request(
@@ -357,8 +364,17 @@ def create_batch_request(
     }
 
 
-def generate_module_batch(module_id: str, config: dict, output_dir: Path) -> dict:
-    """Generate batch request file for a single module."""
+def generate_module_batch(
+    module_id: str, config: dict, output_dir: Path, limits: ShardLimits = None, dedup: bool = True
+) -> dict:
+    """
+    Generate batch request file(s) for a single module.
+
+    `output_file` is the first file; `shards` lists every file with its
+    records, bytes and estimated tokens (one entry unless the module had to
+    be split to fit `limits`). With `dedup`, repeated bodies are written
+    once and `dedup` reports requests/unique/duplicates/dedup_ratio.
+    """
 
     # Load files
     dataset_path = DATASETS_DIR / config["dataset"]
@@ -392,9 +408,8 @@ def generate_module_batch(module_id: str, config: dict, output_dir: Path) -> dic
     is_structured = template_structure["is_structured"]
 
     # Generate batch requests
-    output_file = output_dir / f"{module_id}_batch.jsonl"
-
-    with open(output_file, "w", encoding="utf-8") as f:
+    deduper = RequestDeduper()
+    with ShardWriter(output_dir, module_id, limits) as writer:
         for idx, record in enumerate(records):
             # Create custom_id: module_recordIndex
             custom_id = f"{module_id}_{idx:05d}"
@@ -426,15 +441,22 @@ def generate_module_batch(module_id: str, config: dict, output_dir: Path) -> dic
                     schema=schema
                 )
 
-            # Write as JSONL
-            f.write(json.dumps(batch_request, ensure_ascii=False) + "\n")
+            # Write as JSONL (a repeated body reuses the first one's result)
+            if dedup and deduper.add(custom_id, batch_request["body"]) is not None:
+                continue
+            writer.write(batch_request)
 
+    shards = writer.shards
+    dedup_summary = save_dedup(output_dir, module_id, deduper) if dedup else None
     return {
         "module": module_id,
         "name": config["name"],
         "status": "success",
         "records": len(records),
-        "output_file": str(output_file),
+        "unique_requests": dedup_summary["unique"] if dedup_summary else len(records),
+        "dedup": dedup_summary,
+        "output_file": shards[0]["file"] if shards else str(output_dir / f"{module_id}_batch.jsonl"),
+        "shards": shards,
         "format": "structured" if is_structured else "legacy"
     }
 
@@ -469,6 +491,7 @@ def main():
     # Process each module
     results = []
     total_records = 0
+    total_unique = 0
 
     for module_id in modules_to_process:
         config = MODULES[module_id]
@@ -478,8 +501,12 @@ def main():
         results.append(result)
 
         if result["status"] == "success":
-            print(f"✓ {result['records']} records")
+            shards = len(result["shards"])
+            duplicates = result["records"] - result["unique_requests"]
+            print(f"✓ {result['records']} records" + (f" in {shards} shards" if shards > 1 else "")
+                  + (f", {duplicates} duplicates folded" if duplicates else ""))
             total_records += result["records"]
+            total_unique += result["unique_requests"]
         else:
             print(f"✗ {result['error']}")
 
@@ -494,6 +521,8 @@ def main():
 
     print(f"Successful: {len(successful)}/{len(results)} modules")
     print(f"Total records: {total_records}")
+    if total_records:
+        print(f"Unique requests: {total_unique} (dedup ratio {1 - total_unique / total_records:.1%})")
     print(f"Output directory: {output_dir}")
 
     if failed:
@@ -507,6 +536,7 @@ def main():
         "timestamp": timestamp,
         "modules_processed": len(modules_to_process),
         "total_records": total_records,
+        "unique_requests": total_unique,
         "results": results
     }
 
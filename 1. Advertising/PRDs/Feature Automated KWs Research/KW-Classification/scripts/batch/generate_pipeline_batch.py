@@ -30,6 +30,9 @@ import re
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from jsonl_index import JsonlIndex
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 SYNTHETIC_DIR = PROJECT_ROOT / "datasets" / "synthetic"
 LABELED_DIR = PROJECT_ROOT / "datasets" / "synthetic_labeled"
@@ -93,38 +96,23 @@ def load_schema(module_id: str) -> dict:
     return {}
 
 
-def load_synthetic_data(sd_num: str) -> dict[str, dict]:
-    """Load original synthetic data by ASIN."""
-    records = {}
-
+def load_synthetic_data(sd_num: str) -> JsonlIndex:
+    """Original synthetic data by ASIN (first record per ASIN), read on lookup."""
     # Find any synthetic file for this sd_num
-    for pattern in [f"m06_sd{sd_num}_*.jsonl", f"m07_sd{sd_num}_*.jsonl"]:
-        for f in SYNTHETIC_DIR.glob(pattern):
-            for line in f.read_text().strip().split("\n"):
-                if line.strip():
-                    record = json.loads(line)
-                    asin = record.get("id", "")
-                    if asin and asin not in records:
-                        records[asin] = record
-
-    return records
-
-
-def load_labeled_results(module_id: str, sd_num: str) -> dict[str, dict]:
-    """Load labeled results (model outputs) for a module."""
-    results = {}
-
-    pattern = f"{module_id}_sd{sd_num}_*.jsonl"
-    for f in LABELED_DIR.glob(pattern):
-        for line in f.read_text().strip().split("\n"):
-            if line.strip():
-                record = json.loads(line)
-                asin = record.get("id", "")
-                # The 'expected' field contains the model output
-                if asin and record.get("expected"):
-                    results[asin] = record["expected"]
-
-    return results
+    files = [
+        f for pattern in [f"m06_sd{sd_num}_*.jsonl", f"m07_sd{sd_num}_*.jsonl"]
+        for f in SYNTHETIC_DIR.glob(pattern)
+    ]
+    return JsonlIndex(files, key="id", keep="first")
+
+
+def load_labeled_results(module_id: str, sd_num: str) -> JsonlIndex:
+    """Labeled results (model outputs) for a module by ASIN, read on lookup."""
+    # The 'expected' field contains the model output
+    return JsonlIndex(
+        LABELED_DIR.glob(f"{module_id}_sd{sd_num}_*.jsonl"), key="id",
+        where=lambda record: bool(record.get("expected")), value=lambda record: record["expected"],
+    )
 
 
 def build_m08_input(asin: str, original: dict, m06_output: dict, m07_output: dict) -> dict:
@@ -2,6 +2,10 @@
 """
 Generate OpenAI Batch API requests for synthetic datasets using optimized prompts.
 
+One file per module and synthetic dataset ({module}_sd01_batch.jsonl, ...);
+a dataset over the Batch API file limits or the model's enqueued-token quota
+is split into shards ({module}_sd01_s001_batch.jsonl, ...; see batch_sharding.py).
+
 Usage:
     python scripts/batch/generate_synthetic_batch.py m01 m01a m01b m06 m07
     python scripts/batch/generate_synthetic_batch.py --all
@@ -13,6 +17,9 @@ import re
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).parent))
+from batch_sharding import ShardWriter
+
 # Project paths
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 SYNTHETIC_DIR = PROJECT_ROOT / "datasets" / "synthetic"
@@ -246,9 +253,7 @@ def generate_module_batches(module_id: str, config: dict, output_dir: Path) -> d
         sd_match = re.search(r'_sd(\d+)_', dataset_name)
         sd_num = sd_match.group(1) if sd_match else "00"
 
-        output_file = output_dir / f"{module_id}_sd{sd_num}_batch.jsonl"
-
-        with open(output_file, "w", encoding="utf-8") as f:
+        with ShardWriter(output_dir, f"{module_id}_sd{sd_num}") as writer:
             for idx, record in enumerate(records):
                 record_id = record.get("id", f"{idx:05d}")
                 custom_id = f"{module_id}_sd{sd_num}_{record_id}"
@@ -262,10 +267,10 @@ def generate_module_batches(module_id: str, config: dict, output_dir: Path) -> d
                     schema=schema,
                 )
 
-                f.write(json.dumps(batch_request, ensure_ascii=False) + "\n")
+                writer.write(batch_request)
 
         total_records += len(records)
-        batch_files.append(str(output_file))
+        batch_files.extend(shard["file"] for shard in writer.shards)
 
     return {
         "module": module_id,
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Retry Failed and Missing Batch Requests
+
+download_results.py writes failed requests to
+results/<name>_results.errors.jsonl, and an expired, cancelled or partially
+completed batch simply has no line for some requests. This script diffs,
+per module, the custom_ids of the request files (*_batch.jsonl) against the
+successful result lines (status 200, no error) and re-runs only the rest:
+
+- Up to --realtime-max requests (default 100): right away through the
+  shared LLM engine (scripts/llm, the orchestrator's runtime: rate limits,
+  retries, response cache)
+- More: a compact retry batch (retries/<module>_retry<N>_batch.jsonl, split
+  to the API limits by batch_sharding.py), polled until it finishes;
+  with --no-wait it is only submitted and the next invocation picks it up
+
+Successful retries are merged back in place: the request's line in its
+results file is replaced (or added) and its errors-file line dropped;
+requests that fail again keep an errors-file line with the new error.
+Records deduplicated at generation (batch_dedup.py) follow their leader:
+only the leader is retried, and its new line is copied to them.
+Retry batches are tracked in retries/retry_manifest.json, so a module with
+a retry still in flight is not retried again. Re-run evaluate_results.py
+afterwards.
+
+Works on manual batch dirs and on batch_jobs.py run dirs (same layout).
+
+Usage:
+    python scripts/batch/retry_batch.py batch_requests/20260127_1200 --dry-run
+    python scripts/batch/retry_batch.py batch_requests/20260127_1200
+    python scripts/batch/retry_batch.py batch_requests/20260127_1200 m12b --mode batch --no-wait
+    python scripts/batch/retry_batch.py batch_requests/20260127_1200 --realtime-max 500 --parallel 20
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+from batch_dedup import fan_out_file
+from batch_download import stream_file
+from batch_sharding import ShardWriter, is_quota_rejection, module_of
+from jsonl_index import JsonlIndex, iter_jsonl
+
+load_dotenv()
+
+REALTIME_MAX = 100   # Retries of a module run realtime up to this many requests
+DEFAULT_POLL = 60.0  # Seconds between retry batch status checks
+REMOTE_DONE = ("completed", "failed", "expired", "cancelled")
+
+
+# ============================================================================
+# Diff
+# ============================================================================
+
+def is_success(line: dict) -> bool:
+    """Batch output line with a usable response."""
+    return not line.get("error") and (line.get("response") or {}).get("status_code") == 200
+
+
+def request_files(batch_dir: Path) -> Dict[str, List[Path]]:
+    """Request files of the batch dir by module (shards together)."""
+    modules = defaultdict(list)
+    for path in sorted(batch_dir.glob("*_batch.jsonl")):
+        modules[module_of(path.name[:-len("_batch.jsonl")])].append(path)
+    return dict(modules)
+
+
+def results_file(batch_dir: Path, request_file: Path) -> Path:
+    """Results file a request file's responses go to: its own, or its module's merged file (batch_jobs.py)."""
+    stem = request_file.name[:-len("_batch.jsonl")]
+    own = batch_dir / "results" / f"{stem}_results.jsonl"
+    return own if own.exists() else batch_dir / "results" / f"{module_of(stem)}_results.jsonl"
+
+
+def plan_module(batch_dir: Path, files: List[Path]) -> dict:
+    """custom_ids of the module's requests without a successful result, split into failed and missing."""
+    requests = JsonlIndex(files)
+    ok, seen = set(), set()
+    for target in {results_file(batch_dir, path) for path in files}:
+        for path in (target, target.with_suffix(".errors.jsonl")):
+            if path.exists():
+                for line in iter_jsonl(path):
+                    seen.add(line.get("custom_id"))
+                    if is_success(line):
+                        ok.add(line.get("custom_id"))
+    retry = [custom_id for custom_id in requests if custom_id not in ok]
+    return {
+        "requests": requests,
+        "total": len(requests),
+        "ok": len(requests) - len(retry),
+        "failed": sum(1 for custom_id in retry if custom_id in seen),
+        "missing": sum(1 for custom_id in retry if custom_id not in seen),
+        "retry": retry,
+    }
+
+
+# ============================================================================
+# Merge
+# ============================================================================
+
+def rewrite_jsonl(path: Path, replace: Dict[str, dict], drop: Iterable[str] = ()) -> int:
+    """
+    Rewrite `path` with the lines of `replace` in place of the existing lines
+    with the same custom_id (new ones appended) and `drop` ids removed.
+    Returns the number of lines left; an empty file is removed.
+    """
+    replace, drop = dict(replace), set(drop)
+    partial = path.with_name(path.name + ".part")
+    lines = 0
+    with open(partial, "w", encoding="utf-8") as out:
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for raw in f:
+                    if not raw.strip():
+                        continue
+                    custom_id = json.loads(raw).get("custom_id")
+                    if custom_id in drop:
+                        continue
+                    if custom_id in replace:
+                        raw = json.dumps(replace.pop(custom_id), ensure_ascii=False) + "\n"
+                    out.write(raw)
+                    lines += 1
+        for line in replace.values():
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            lines += 1
+    if lines:
+        partial.replace(path)
+    else:
+        partial.unlink()
+        path.unlink(missing_ok=True)
+    return lines
+
+
+def merge_retry(batch_dir: Path, requests: JsonlIndex, retry_results: List[Path]) -> dict:
+    """Merge retry result (and error) files into the results and errors files their requests belong to."""
+    by_target = defaultdict(lambda: ({}, {}))
+    for line in (line for path in retry_results for line in iter_jsonl(path)):
+        custom_id = line.get("custom_id")
+        if custom_id not in requests:
+            continue
+        succeeded, failed = by_target[results_file(batch_dir, requests.path(custom_id))]
+        (succeeded if is_success(line) else failed)[custom_id] = line
+
+    merged = still_failing = 0
+    for target, (succeeded, failed) in by_target.items():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if succeeded:
+            rewrite_jsonl(target, succeeded)
+        rewrite_jsonl(target.with_suffix(".errors.jsonl"), failed, drop=succeeded)
+        fan_out_file(batch_dir, target.name[:-len("_results.jsonl")], target)
+        merged += len(succeeded)
+        still_failing += len(failed)
+    return {"merged": merged, "failed": still_failing}
+
+
+# ============================================================================
+# Retry runs
+# ============================================================================
+
+def next_attempt(retries_dir: Path, module: str) -> int:
+    attempts = [
+        int(match.group(1)) for path in retries_dir.glob(f"{module}_retry*")
+        if (match := re.match(rf"{re.escape(module)}_retry(\d+)", path.name))
+    ]
+    return max(attempts, default=0) + 1
+
+
+def realtime_line(custom_id: str, result) -> dict:
+    """
+    LLMResult in the Batch API output line format. Response cache hits and
+    in-flight duplicates carry zero usage: they were not billed.
+    """
+    if not result.ok:
+        return {
+            "id": f"realtime-{custom_id}", "custom_id": custom_id, "response": None,
+            "error": {"code": result.error_type, "message": result.error},
+        }
+    billed = not (result.cached or result.deduplicated)
+    return {
+        "id": f"realtime-{custom_id}",
+        "custom_id": custom_id,
+        "response": {
+            "status_code": 200,
+            "request_id": None,
+            "body": {
+                "object": "chat.completion",
+                "model": result.model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": result.content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": result.prompt_tokens if billed else 0,
+                    "completion_tokens": result.completion_tokens if billed else 0,
+                    "total_tokens": result.total_tokens if billed else 0,
+                    "prompt_tokens_details": {"cached_tokens": result.cached_tokens if billed else 0},
+                },
+            },
+        },
+        "error": None,
+    }
+
+
+def retry_realtime(requests: JsonlIndex, custom_ids: List[str], output_path: Path, parallel: int) -> None:
+    """Run the requests through the LLM engine; write batch-format result lines to `output_path`."""
+    from llm import LLMRequest, get_engine
+
+    def to_request(custom_id: str) -> LLMRequest:
+        body = requests[custom_id]["body"]
+        return LLMRequest(
+            messages=body["messages"],
+            model=body["model"],
+            temperature=body.get("temperature"),
+            response_format=body.get("response_format"),
+            max_tokens=body.get("max_tokens") or body.get("max_completion_tokens"),
+            metadata={"custom_id": custom_id, "module": custom_id.rsplit("_", 1)[0]},
+        )
+
+    partial = output_path.with_name(output_path.name + ".part")
+    with open(partial, "w", encoding="utf-8") as f:
+        for _, result in get_engine().iter_results((to_request(c) for c in custom_ids), concurrency=parallel):
+            f.write(json.dumps(realtime_line(result.metadata["custom_id"], result), ensure_ascii=False) + "\n")
+    partial.replace(output_path)
+
+
+def submit_retry(client, requests: JsonlIndex, custom_ids: List[str], retries_dir: Path, stem: str) -> List[dict]:
+    """Write the requests to retry batch file(s), upload and create a batch per file."""
+    with ShardWriter(retries_dir, stem) as writer:
+        for custom_id in custom_ids:
+            writer.write(requests[custom_id])
+    entries = []
+    for shard in writer.shards:
+        path = Path(shard["file"])
+        with open(path, "rb") as f:
+            file_id = client.files.create(file=f, purpose="batch").id
+        entry = {"file": path.name, "file_id": file_id, "requests": shard["records"]}
+        entries.append(create_batch(client, entry))
+    return entries
+
+
+def create_batch(client, entry: dict) -> dict:
+    batch = client.batches.create(
+        input_file_id=entry["file_id"],
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"source_file": entry["file"], "retry": "true", "created_at": datetime.now().isoformat()},
+    )
+    return dict(entry, batch_id=batch.id, status=batch.status, created_at=datetime.now().isoformat())
+
+
+def check_retry(client, entry: dict, retries_dir: Path) -> dict:
+    """Poll a retry batch; once finished, download what it returned (quota rejections are resubmitted)."""
+    batch = client.batches.retrieve(entry["batch_id"])
+    entry = dict(entry, status=batch.status)
+    if batch.status not in REMOTE_DONE:
+        return entry
+    if is_quota_rejection(batch):
+        print(f"  {entry['file']}: rejected for enqueued-token quota, resubmitting")
+        return create_batch(client, entry)
+
+    output_path = retries_dir / entry["file"].replace("_batch.jsonl", "_results.jsonl")
+    error_path = output_path.with_suffix(".errors.jsonl")
+    outputs = []
+    for file_id, path in ((batch.output_file_id, output_path), (batch.error_file_id, error_path)):
+        if file_id:
+            stream_file(client, file_id, path)
+            outputs.append(path.name)
+    return dict(entry, outputs=outputs)
+
+
+# ============================================================================
+# Manifest
+# ============================================================================
+
+def load_manifest(path: Path) -> dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"retries": []}
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    partial = path.with_name(path.name + ".part")
+    partial.write_text(json.dumps(manifest, indent=2))
+    partial.replace(path)
+
+
+def drive_pending(client, batch_dir: Path, modules: Dict[str, List[Path]], manifest: dict, manifest_path: Path,
+                  wait: bool, poll: float) -> None:
+    """Poll the unmerged retry batches; merge each as soon as it is downloaded."""
+    retries_dir = manifest_path.parent
+    while True:
+        pending = [entry for entry in manifest["retries"] if entry["mode"] == "batch" and not entry.get("merged_at")]
+        for entry in pending:
+            updated = check_retry(client, entry, retries_dir)
+            if "outputs" in updated:
+                requests = JsonlIndex(modules[entry["module"]])
+                counts = merge_retry(batch_dir, requests, [retries_dir / name for name in updated["outputs"]])
+                updated.update(counts, merged_at=datetime.now().isoformat())
+                print(f"  {entry['file']}: batch {updated['status']}, merged {counts['merged']}, "
+                      f"{counts['failed']} still failing")
+            entry.clear()
+            entry.update(updated)
+            save_manifest(manifest_path, manifest)
+        pending = [entry for entry in manifest["retries"] if entry["mode"] == "batch" and not entry.get("merged_at")]
+        if not pending:
+            return
+        if not wait:
+            print(f"  {len(pending)} retry batch(es) in progress - rerun to merge")
+            return
+        print(f"  {len(pending)} retry batch(es) in progress, next check in {poll:.0f}s")
+        time.sleep(poll)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Retry the failed and missing requests of a batch dir and merge the results back in place",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/batch/retry_batch.py batch_requests/20260127_1200 --dry-run
+  python scripts/batch/retry_batch.py batch_requests/20260127_1200
+  python scripts/batch/retry_batch.py batch_requests/20260127_1200 m12b --mode batch --no-wait
+        """
+    )
+    parser.add_argument("batch_dir", type=Path, help="Batch dir (manual flow) or batch_jobs.py run dir")
+    parser.add_argument("modules", nargs="*", help="Modules to retry (default: all request files)")
+    parser.add_argument("--mode", choices=["auto", "realtime", "batch"], default="auto",
+                        help="auto: realtime up to --realtime-max requests per module, batch above (default)")
+    parser.add_argument("--realtime-max", type=int, default=REALTIME_MAX,
+                        help=f"Largest per-module retry run realtime in auto mode (default: {REALTIME_MAX})")
+    parser.add_argument("--parallel", "-p", type=int, default=10, help="Concurrent realtime calls (default: 10)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL,
+                        help=f"Seconds between retry batch checks (default: {DEFAULT_POLL:.0f})")
+    parser.add_argument("--no-wait", action="store_true", help="Submit retry batches and exit; rerun to merge")
+    parser.add_argument("--dry-run", action="store_true", help="Only show what would be retried")
+    args = parser.parse_args()
+
+    batch_dir = args.batch_dir
+    modules = request_files(batch_dir)
+    if not modules:
+        print(f"Error: no *_batch.jsonl files in {batch_dir}")
+        sys.exit(1)
+    unknown = [m for m in args.modules if m not in modules]
+    if unknown:
+        parser.error(f"no request files for: {', '.join(unknown)}")
+    selected = args.modules or list(modules)
+
+    retries_dir = batch_dir / "retries"
+    manifest_path = retries_dir / "retry_manifest.json"
+    manifest = load_manifest(manifest_path)
+
+    client = None
+
+    def get_client():
+        nonlocal client
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return client
+
+    print("=" * 70)
+    print("RETRY FAILED AND MISSING BATCH REQUESTS")
+    print("=" * 70)
+    print(f"Directory: {batch_dir}")
+    print()
+
+    in_flight = {entry["module"] for entry in manifest["retries"] if entry["mode"] == "batch"
+                 and not entry.get("merged_at")}
+    if in_flight and not args.dry_run:
+        print("Earlier retry batches:")
+        drive_pending(get_client(), batch_dir, modules, manifest, manifest_path, not args.no_wait, args.poll)
+        in_flight = {entry["module"] for entry in manifest["retries"] if entry["mode"] == "batch"
+                     and not entry.get("merged_at")}
+        print()
+
+    print(f"{'Module':<10} {'Requests':<10} {'OK':<10} {'Failed':<10} {'Missing':<10} Action")
+    print("-" * 70)
+    plans = {}
+    for module in selected:
+        if module in in_flight:
+            print(f"{module:<10} retry batch in progress - skipped")
+            continue
+        plan = plan_module(batch_dir, modules[module])
+        count = len(plan["retry"])
+        if not count:
+            action = "-"
+        elif args.mode == "realtime" or args.mode == "auto" and count <= args.realtime_max:
+            action = "realtime"
+        else:
+            action = "batch"
+        print(f"{module:<10} {plan['total']:<10} {plan['ok']:<10} {plan['failed']:<10} {plan['missing']:<10} {action}")
+        if count:
+            plans[module] = dict(plan, action=action)
+
+    if args.dry_run or not plans:
+        if not plans:
+            print("\nNothing to retry.")
+        return
+
+    print()
+    retries_dir.mkdir(exist_ok=True)
+    for module, plan in plans.items():
+        stem = f"{module}_retry{next_attempt(retries_dir, module)}"
+        custom_ids = plan["retry"]
+        entry = {"module": module, "mode": plan["action"], "requests": len(custom_ids),
+                 "created_at": datetime.now().isoformat()}
+
+        if plan["action"] == "realtime":
+            output_path = retries_dir / f"{stem}_results.jsonl"
+            print(f"{module}: retrying {len(custom_ids)} requests realtime...", flush=True)
+            retry_realtime(plan["requests"], custom_ids, output_path, args.parallel)
+            counts = merge_retry(batch_dir, plan["requests"], [output_path])
+            manifest["retries"].append(dict(entry, file=output_path.name, **counts,
+                                            merged_at=datetime.now().isoformat()))
+            print(f"  merged {counts['merged']}, {counts['failed']} still failing")
+        else:
+            for submitted in submit_retry(get_client(), plan["requests"], custom_ids, retries_dir, stem):
+                manifest["retries"].append(dict(entry, mode="batch", **submitted))
+                print(f"{module}: submitted {submitted['file']} ({submitted['requests']} requests) "
+                      f"batch_id={submitted['batch_id']}")
+        save_manifest(manifest_path, manifest)
+
+    if any(plan["action"] == "batch" for plan in plans.values()):
+        print()
+        drive_pending(get_client(), batch_dir, modules, manifest, manifest_path, not args.no_wait, args.poll)
+
+    print()
+    print(f"Retry manifest: {manifest_path}")
+    print("Re-evaluate with:")
+    print(f"  python scripts/batch/evaluate_results.py {batch_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,11 @@
 """
 Upload synthetic batch files to OpenAI Batch API.
 
+Batches are created only while the model's enqueued-token quota has room
+(batch_sharding.py); the remaining files wait, and are submitted as earlier
+batches complete. A batch the provider rejects for quota is resubmitted.
+upload_log.json is rewritten after every submission.
+
 Usage:
     python scripts/batch/upload_synthetic_batch.py <batch_dir>
     python scripts/batch/upload_synthetic_batch.py batch_requests/synthetic/20260127_1200
@@ -17,12 +22,18 @@ from datetime import datetime
 from openai import OpenAI
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).parent))
+from batch_sharding import file_tokens, fits_quota, is_quota_rejection
+
 # Load environment
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 load_dotenv(PROJECT_ROOT / ".env")
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+QUOTA_POLL_SECONDS = 60  # Wait between status checks while files wait for quota
+IN_FLIGHT = ("validating", "in_progress", "finalizing")
+
 
 def upload_batch_file(filepath: Path) -> dict:
     """Upload a batch file and create batch job."""
@@ -75,30 +86,59 @@ def main():
     print(f"Files: {len(batch_files)}")
     print()
 
-    results = []
-
-    for filepath in batch_files:
-        try:
-            result = upload_batch_file(filepath)
-            results.append(result)
-            # Small delay to avoid rate limits
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"  Error: {e}")
-            results.append({
-                "file": filepath.name,
-                "status": "error",
-                "error": str(e),
-            })
-
-    # Save upload results
+    results = {}  # file name -> upload result
     upload_log = batch_dir / "upload_log.json"
-    upload_log.write_text(json.dumps({
-        "uploaded_at": datetime.now().isoformat(),
-        "total_files": len(batch_files),
-        "successful": len([r for r in results if r.get("batch_id")]),
-        "batches": results,
-    }, indent=2))
+
+    def save_log():
+        upload_log.write_text(json.dumps({
+            "uploaded_at": datetime.now().isoformat(),
+            "total_files": len(batch_files),
+            "successful": len([r for r in results.values() if r.get("batch_id")]),
+            "batches": list(results.values()),
+        }, indent=2))
+
+    pending = [(filepath, *file_tokens(filepath)) for filepath in batch_files]
+    in_flight = {}  # batch_id -> (filepath, model, tokens)
+
+    while pending:
+        for item in list(pending):
+            filepath, model, tokens = item
+            enqueued = sum(t for _, m, t in in_flight.values() if m == model)
+            if not fits_quota(enqueued, tokens, model):
+                continue
+            pending.remove(item)
+            try:
+                result = upload_batch_file(filepath)
+                in_flight[result["batch_id"]] = item
+                # Small delay to avoid rate limits
+                time.sleep(0.5)
+            except Exception as e:
+                print(f"  Error: {e}")
+                result = {
+                    "file": filepath.name,
+                    "status": "error",
+                    "error": str(e),
+                }
+            results[filepath.name] = result
+            save_log()
+
+        if not pending:
+            break
+
+        # Wait for quota: drop finished batches, requeue quota rejections
+        print(f"  {len(pending)} file(s) waiting for enqueued-token quota...")
+        time.sleep(QUOTA_POLL_SECONDS)
+        for batch_id, item in list(in_flight.items()):
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in IN_FLIGHT:
+                continue
+            del in_flight[batch_id]
+            if is_quota_rejection(batch):
+                print(f"  {item[0].name}: rejected for quota, resubmitting later")
+                pending.append(item)
+
+    save_log()
+    results = list(results.values())
 
     print()
     print("=" * 70)
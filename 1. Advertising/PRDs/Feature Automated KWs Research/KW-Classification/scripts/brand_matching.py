@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Deterministic Brand-Matching Fast Path (M02 / M04 / M05)
+
+Brand-scope decisions that follow from string matching alone are made
+locally; only ambiguous keywords are sent to the LLM.
+
+Matching: keyword and entities are normalized (accents stripped, lowercase,
+non-alphanumerics -> space). An entity matches when its space-free form
+equals a run of whole keyword tokens: "jbl" matches "jbl flip 6",
+"air pods" matches "airpods" and "airpods" matches "air pods", but "oxo"
+does not match "boxo". All entities of a product context are compiled into
+one Aho-Corasick automaton that scans the keyword once; automata are cached
+per entity list, since every keyword of an ASIN shares it.
+
+Rules (precision against the gold datasets: `report` command):
+    M02/M02b  own brand matched                   -> branding_scope_1 = "OB"
+    M04/M04b  competitor matched, own not matched -> branding_scope_2 = "CB"
+    M05/M05b  own or competitor brand matched     -> branding_scope_3 = null
+
+Everything else is ambiguous and goes to the LLM: no match (typos, brands
+missing from the lists, generic keywords) and, for M04, keywords matching
+the own brand.
+
+With `fuzzy`, keywords without an exact match are looked up in a
+typo-tolerant index (scorers/fuzzy_brand_index.py), so misspellings such
+as "revlin" or "jikashu" are decided locally too.
+
+Usage:
+    fast_path = BrandFastPath.for_module("m04")   # None for other modules
+    output = fast_path.decide(record)             # output dict, or None -> LLM
+
+    python scripts/brand_matching.py report
+    python scripts/brand_matching.py report --fuzzy --module m04 --show 20
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scorers"))  # fuzzy_brand_index.py, shared with the scorers
+from config import DATASETS_DIR, get_module
+from fuzzy_brand_index import BrandMatch, FuzzyBrandIndex, normalize_brand_text
+
+MIN_ENTITY_LENGTH = 2  # Shorter entities ("J", "&") are too ambiguous to match
+FUZZY_CONFIDENCE = 0.9  # Confidence reported for typo-tolerant (non-exact) matches
+
+
+def split_terms(value) -> List[str]:
+    """Entity list from a list or a comma-separated string (Path B variations)."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [term.strip() for term in value.split(",") if term.strip()]
+    return [str(term) for term in value if term]
+
+
+class BrandAutomaton:
+    """Aho-Corasick automaton over space-free normalized entities."""
+
+    def __init__(self, entities: Iterable[str]):
+        self.patterns: List[str] = []
+        self.labels: List[str] = []  # Original entity text, for reasoning
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        seen = set()
+        for entity in entities:
+            pattern = normalize_brand_text(entity).replace(" ", "")
+            if len(pattern) < MIN_ENTITY_LENGTH or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._add(pattern, len(self.patterns))
+            self.patterns.append(pattern)
+            self.labels.append(str(entity))
+        self._link()
+
+    def _add(self, pattern: str, index: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(index)
+
+    def _link(self) -> None:
+        """Breadth-first failure links; outputs inherit their failure state's."""
+        queue = list(self._goto[0].values())  # Depth-1 states fail to the root
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find(self, keyword: str) -> List[str]:
+        """Entities matching whole-token runs of the keyword (original text, in order)."""
+        tokens = normalize_brand_text(keyword).split()
+        text = "".join(tokens)
+        # Offsets in the space-free text where a token starts or ends
+        boundaries = {0}
+        offset = 0
+        for token in tokens:
+            offset += len(token)
+            boundaries.add(offset)
+
+        matches = []
+        state = 0
+        for position, char in enumerate(text, start=1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._out[state]:
+                if position in boundaries and position - len(self.patterns[index]) in boundaries:
+                    matches.append(self.labels[index])
+        return list(dict.fromkeys(matches))
+
+
+@lru_cache(maxsize=1024)
+def automaton_for(entities: Tuple[str, ...]) -> BrandAutomaton:
+    return BrandAutomaton(entities)
+
+
+@lru_cache(maxsize=1024)
+def fuzzy_index_for(label: str, entities: Tuple[str, ...]) -> FuzzyBrandIndex:
+    return FuzzyBrandIndex({label: entities})
+
+
+# ============================================================================
+# Module Rules
+# ============================================================================
+
+def _brand_terms(brand: dict) -> List[str]:
+    """Path B brand object: variations + related terms."""
+    return split_terms(brand.get("variations")) + split_terms(brand.get("related_terms"))
+
+
+def own_brand_entities(data: dict) -> List[str]:
+    """Own brand entities from Path A (M01 entities) or Path B (M01a/M01b) input."""
+    own_brand = data.get("own_brand") or {}
+    return (
+        split_terms(data.get("brand_entities"))
+        + split_terms(own_brand.get("entities"))
+        + split_terms(data.get("variations_own"))
+        + split_terms(data.get("related_terms_own"))
+        + _brand_terms(own_brand)
+    )
+
+
+def competitor_entities(data: dict) -> List[str]:
+    """Competitor entities from Path A or Path B input."""
+    return split_terms(data.get("competitor_entities")) + [
+        term for brand in data.get("competitors") or [] for term in _brand_terms(brand)
+    ]
+
+
+@dataclass(frozen=True)
+class BrandRule:
+    """How a module's entity matches map to a local decision."""
+    field: str  # Output field (branding_scope_N)
+    value: Optional[str]  # Value decided by a match
+    scope: str  # "own", "competitor" or "any"
+
+
+OWN_BRAND_RULE = BrandRule("branding_scope_1", "OB", "own")
+COMPETITOR_RULE = BrandRule("branding_scope_2", "CB", "competitor")
+NON_BRANDED_RULE = BrandRule("branding_scope_3", None, "any")
+
+MODULE_RULES: Dict[str, BrandRule] = {
+    "m02": OWN_BRAND_RULE,
+    "m02b": OWN_BRAND_RULE,
+    "m04": COMPETITOR_RULE,
+    "m04b": COMPETITOR_RULE,
+    "m05": NON_BRANDED_RULE,
+    "m05b": NON_BRANDED_RULE,
+}
+
+
+class BrandFastPath:
+    """Local brand-scope decisions for one module."""
+
+    def __init__(self, module_id: str, rule: BrandRule, fuzzy: bool = False):
+        self.module_id = module_id
+        self.rule = rule
+        self.fuzzy = fuzzy  # Fall back to the typo-tolerant index when nothing matches exactly
+
+    @classmethod
+    def for_module(cls, module_id: str, fuzzy: bool = False) -> Optional["BrandFastPath"]:
+        rule = MODULE_RULES.get(module_id)
+        return cls(module_id, rule, fuzzy) if rule else None
+
+    def _find(self, entities: List[str], keyword: str, label: str) -> List[BrandMatch]:
+        entities = tuple(entities)
+        exact = automaton_for(entities).find(keyword)
+        if exact or not self.fuzzy:
+            return [BrandMatch(label, entity, entity, 0) for entity in exact]
+        return fuzzy_index_for(label, entities).find(keyword)
+
+    def matches(self, record: dict) -> Tuple[List[BrandMatch], List[BrandMatch]]:
+        """(own brand matches, competitor matches) for a record's keyword."""
+        data = record.get("input", {})
+        keyword = data.get("keyword", "")
+        own = self._find(own_brand_entities(data), keyword, "own brand")
+        if self.rule.scope == "own":
+            return own, []
+        return own, self._find(competitor_entities(data), keyword, "competitor")
+
+    def decisive_match(self, record: dict) -> Optional[BrandMatch]:
+        """The match a local decision rests on, or None if the keyword is ambiguous."""
+        own, competitor = self.matches(record)
+        scope = self.rule.scope
+        if scope == "own" and own:
+            return own[0]
+        if scope == "competitor" and competitor and not own:
+            return competitor[0]
+        if scope == "any" and (own or competitor):
+            return min(own + competitor, key=lambda match: match.distance)
+        return None
+
+    def decide(self, record: dict) -> Optional[dict]:
+        """Module output for an unambiguous keyword, else None (send to the LLM)."""
+        match = self.decisive_match(record)
+        if match is None:
+            return None
+
+        keyword = record.get("input", {}).get("keyword", "")
+        if match.distance:
+            reasoning = (f"Fuzzy match: {match.brand} entity '{match.variant}' ~ '{match.text}' "
+                         f"(edit distance {match.distance}) in keyword '{keyword}'.")
+        else:
+            reasoning = f"Deterministic match: {match.brand} entity '{match.variant}' found in keyword '{keyword}'."
+        return {
+            self.rule.field: self.rule.value,
+            "confidence": FUZZY_CONFIDENCE if match.distance else 1.0,
+            "reasoning": reasoning,
+        }
+
+
+# ============================================================================
+# Accuracy Report
+# ============================================================================
+
+def find_gold_dataset(module_id: str) -> Optional[Path]:
+    """datasets/single/{module_id}_v*_{slug}.jsonl (m02 does not match m02b)."""
+    slug = get_module(module_id)["slug"]
+    matches = sorted(DATASETS_DIR.glob(f"{module_id}_v*_{slug}.jsonl"))
+    return matches[0] if matches else None
+
+
+def iter_gold(dataset_path: Path) -> Iterator[dict]:
+    with open(dataset_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def evaluate_module(module_id: str, dataset_path: Path, fuzzy: bool = False) -> dict:
+    """Coverage and precision of the fast path on a gold dataset."""
+    fast_path = BrandFastPath.for_module(module_id, fuzzy)
+    field = fast_path.rule.field
+    total = decided = correct = fuzzy_decided = 0
+    errors = []
+    for record in iter_gold(dataset_path):
+        total += 1
+        output = fast_path.decide(record)
+        if output is None:
+            continue
+        decided += 1
+        fuzzy_decided += 1 if output["confidence"] < 1.0 else 0
+        expected = record.get("expected", {}).get(field)
+        if output[field] == expected:
+            correct += 1
+        else:
+            errors.append({
+                "id": record.get("id"),
+                "keyword": record.get("input", {}).get("keyword"),
+                "expected": expected,
+                "decided": output[field],
+                "reasoning": output["reasoning"],
+            })
+    return {
+        "module": module_id,
+        "dataset": dataset_path.name,
+        "records": total,
+        "decided_locally": decided,
+        "fuzzy": fuzzy_decided,
+        "sent_to_llm": total - decided,
+        "coverage": decided / total if total else 0.0,
+        "correct": correct,
+        "precision": correct / decided if decided else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Deterministic brand-matching fast path for M02/M04/M05",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    report_parser = subparsers.add_parser("report", help="Accuracy of local decisions on the gold datasets")
+    report_parser.add_argument("--module", "-m", help="Comma-separated module IDs (default: all supported)")
+    report_parser.add_argument("--fuzzy", action="store_true",
+                               help="Include typo-tolerant matches (orchestrator --brand-fast-path fuzzy)")
+    report_parser.add_argument("--dataset", help="Gold JSONL to use instead of datasets/single (one module)")
+    report_parser.add_argument("--show", type=int, default=10, help="Mismatches to print per module (default: 10)")
+    report_parser.add_argument("--output", "-o", help="Also write the report as JSON")
+
+    args = parser.parse_args()
+    if args.command != "report":
+        parser.print_help()
+        return
+
+    module_ids = args.module.split(",") if args.module else list(MODULE_RULES)
+    unknown = [module_id for module_id in module_ids if module_id not in MODULE_RULES]
+    if unknown:
+        parser.error(f"No fast path for: {', '.join(unknown)} (supported: {', '.join(MODULE_RULES)})")
+    if args.dataset and len(module_ids) != 1:
+        parser.error("--dataset needs exactly one --module")
+
+    reports = []
+    print(f"Brand fast path ({'fuzzy' if args.fuzzy else 'exact'}) vs. gold datasets")
+    print("=" * 79)
+    print(f"{'Module':<8} {'Records':>8} {'Local':>7} {'Fuzzy':>6} {'Coverage':>9} {'Correct':>8} "
+          f"{'Precision':>10}  Dataset")
+    print("-" * 79)
+    for module_id in module_ids:
+        dataset_path = Path(args.dataset) if args.dataset else find_gold_dataset(module_id)
+        if not dataset_path or not dataset_path.exists():
+            print(f"{module_id:<8} dataset not found")
+            continue
+        report = evaluate_module(module_id, dataset_path, args.fuzzy)
+        reports.append(report)
+        print(f"{module_id:<8} {report['records']:>8} {report['decided_locally']:>7} {report['fuzzy']:>6} "
+              f"{report['coverage']:>9.1%} {report['correct']:>8} {report['precision']:>10.1%}  {report['dataset']}")
+
+    for report in reports:
+        if report["errors"] and args.show:
+            print(f"\n{report['module']} mismatches ({len(report['errors'])}):")
+            for error in report["errors"][:args.show]:
+                print(f"  {error['keyword']!r}: expected {error['expected']}, decided {error['decided']} "
+                      f"- {error['reasoning']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(reports, indent=2), encoding="utf-8")
+        print(f"\nReport: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
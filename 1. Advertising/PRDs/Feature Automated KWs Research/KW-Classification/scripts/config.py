@@ -37,7 +37,8 @@ SCHEMAS_DIR = PROJECT_ROOT / "prompts" / "json_schemas"
 DATASETS_DIR = PROJECT_ROOT / "datasets" / "single"
 SCORERS_DIR = PROJECT_ROOT / "scorers"
 SCRIPTS_DIR = PROJECT_ROOT / "scripts"
-EXPERIMENT_RESULTS_DIR = PROJECT_ROOT / "experiment_results"
+# EXPERIMENT_RESULTS_DIR can be overridden (benchmarks write to a scratch dir)
+EXPERIMENT_RESULTS_DIR = Path(os.getenv("EXPERIMENT_RESULTS_DIR", PROJECT_ROOT / "experiment_results"))
 
 # 16 Modules for v1.1 + sub-modules (M01a, M01b, etc.)
 MODULES = {
@@ -201,6 +202,76 @@ DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_TEMPERATURE = 0.0
 DEFAULT_MAX_TOKENS = 4096
 
+# LLM response cache (temperature-0 calls, see scripts/llm/cache.py)
+# Set LLM_CACHE=0 to disable
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = PROJECT_ROOT / ".cache" / "llm_responses.sqlite"
+LLM_CACHE_MAX_MB = 1024
+LLM_CACHE_MAX_AGE_DAYS = 30
+
+# Per-call trace store (scripts/llm/traces.py): one append-only JSONL file
+# per day; set LLM_TRACES=0 to disable
+LLM_TRACES_ENABLED = os.getenv("LLM_TRACES", "1") != "0"
+LLM_TRACE_DIR = PROJECT_ROOT / ".cache" / "traces"
+
+# Starting (RPM, TPM) per model for the rate limiter (scripts/llm/rate_limiter.py).
+# The limiter adapts to the account's real limits from x-ratelimit-* headers.
+MODEL_RATE_LIMITS = {
+    "gpt-4o-mini": (5000, 2_000_000),
+    "gpt-4o": (5000, 800_000),
+    "gpt-4.1-mini": (5000, 2_000_000),
+    "gpt-4.1": (5000, 800_000),
+    "gpt-5": (5000, 800_000),
+    "gpt-5-mini": (5000, 2_000_000),
+}
+DEFAULT_RATE_LIMITS = (500, 200_000)
+
+# Standard (realtime) price in USD per 1M (input, cached input, output)
+# tokens; cached input is the part of the prompt served from the provider's
+# prompt cache. Batch APIs bill BATCH_PRICE_FACTOR of it. All cost accounting
+# goes through scripts/pricing.py
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-5": (1.25, 0.125, 10.00),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+    "claude-sonnet-4": (3.00, 0.30, 15.00),
+}
+DEFAULT_PRICING = MODEL_PRICING[DEFAULT_MODEL]
+BATCH_PRICE_FACTOR = 0.5
+
+# (context window, max completion tokens) per model, for token-budget packing
+# of multi-keyword calls (scripts/keyword_packing.py)
+MODEL_TOKEN_LIMITS = {
+    "gpt-4o-mini": (128_000, 16_384),
+    "gpt-4o": (128_000, 16_384),
+    "gpt-4.1-mini": (1_047_576, 32_768),
+    "gpt-4.1": (1_047_576, 32_768),
+    "gpt-5": (400_000, 128_000),
+    "gpt-5-mini": (400_000, 128_000),
+}
+DEFAULT_TOKEN_LIMITS = (128_000, 16_384)
+
+# OpenAI Batch API limits (scripts/batch/batch_sharding.py): per-file caps,
+# and prompt tokens that may be enqueued per model across all in-flight
+# batches (organization quota, tier dependent; BATCH_ENQUEUED_TOKENS
+# overrides it for every model)
+BATCH_MAX_REQUESTS = 50_000
+BATCH_MAX_FILE_MB = 200
+BATCH_ENQUEUED_TOKEN_LIMITS = {
+    "gpt-4o-mini": 2_000_000,
+    "gpt-4o": 900_000,
+    "gpt-4.1-mini": 2_000_000,
+    "gpt-4.1": 900_000,
+    "gpt-5": 1_500_000,
+    "gpt-5-mini": 3_000_000,
+}
+DEFAULT_BATCH_ENQUEUED_TOKENS = 200_000
+
 
 def load_api_key():
     """Load Braintrust API key."""
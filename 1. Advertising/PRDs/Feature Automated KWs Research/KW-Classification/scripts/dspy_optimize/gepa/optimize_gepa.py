@@ -28,6 +28,7 @@ from pathlib import Path
 from datetime import datetime
 
 import gepa
+import litellm
 from dotenv import load_dotenv
 
 # Add parent directory for shared module_config
@@ -36,6 +37,10 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 from module_config import get_config, list_textgen_modules, PROJECT_ROOT
 from evaluator import get_evaluator, MODULE_EVALUATORS
 
+# Shared LLM runtime (per-call trace store) lives in <project_root>/scripts
+sys.path.insert(1, str(PROJECT_ROOT / "scripts"))
+from llm.traces import litellm_tracer
+
 # Project paths
 ARTIFACTS_DIR = PROJECT_ROOT / "artifacts" / "dspy_gepa"
 
@@ -183,6 +188,11 @@ def run_optimization(
 
     print(f"Output dir: {run_dir}")
 
+    # Trace the task, reflection and judge calls (all made through litellm)
+    tracer = litellm_tracer(f"gepa:{module_id}")
+    litellm.success_callback.append(tracer)
+    litellm.failure_callback.append(tracer)
+
     # Run GEPA optimization
     print(f"\nStarting GEPA optimization...")
     print(f"  (This uses evolutionary search with LLM reflection)\n")
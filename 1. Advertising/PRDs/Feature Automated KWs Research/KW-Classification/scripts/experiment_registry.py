@@ -8,13 +8,14 @@ Maintains a central registry of all experiment runs with metadata.
 
 import json
 import hashlib
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict
 from dataclasses import dataclass, asdict, field
 
-# Registry file location
-REGISTRY_DIR = Path(__file__).parent.parent / "experiment_results"
+# Registry file location (follows the EXPERIMENT_RESULTS_DIR override in config.py)
+REGISTRY_DIR = Path(os.getenv("EXPERIMENT_RESULTS_DIR", Path(__file__).parent.parent / "experiment_results"))
 REGISTRY_FILE = REGISTRY_DIR / ".registry.json"
 
 
@@ -25,6 +26,7 @@ class ExperimentRecord:
     module_id: str
     csv_path: str
     created_at: str
+    jsonl_path: Optional[str] = None
 
     # Braintrust mapping
     braintrust_id: Optional[str] = None
@@ -38,10 +40,11 @@ class ExperimentRecord:
 
     # Metrics
     samples: int = 0
+    requested_samples: Optional[int] = None  # None = full dataset
     accuracy: float = 0.0
     metrics: Dict = field(default_factory=dict)
 
-    # Status: local_only, uploaded, synced, failed
+    # Status: running, local_only, uploaded, synced, failed
     status: str = "local_only"
 
     # Additional metadata
@@ -114,6 +117,38 @@ class ExperimentRegistry:
                 return exp
         return None
 
+    def find_resumable(
+        self,
+        module_id: str,
+        prompt_hash: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        requested_samples: Optional[int] = None,
+    ) -> Optional[Dict]:
+        """
+        Find the latest run with matching settings if it can be resumed.
+
+        A run is resumable when it never finished (status "running") or
+        finished with errored rows, and its output file still exists.
+        Only the most recent matching run is considered.
+        """
+        for exp in self.list_experiments(module_id=module_id, limit=len(self.data["experiments"])):
+            if prompt_hash and exp.get("prompt_hash") != prompt_hash:
+                continue
+            if model and exp.get("model") != model:
+                continue
+            if prompt_version and exp.get("prompt_version") != prompt_version:
+                continue
+            if exp.get("requested_samples") != requested_samples:
+                continue
+
+            incomplete = exp.get("status") == "running" or exp.get("metrics", {}).get("errors", 0) > 0
+            output_path = exp.get("csv_path") or exp.get("jsonl_path")
+            if incomplete and output_path and Path(output_path).exists():
+                return exp
+            return None
+        return None
+
     def list_experiments(
         self,
         module_id: Optional[str] = None,
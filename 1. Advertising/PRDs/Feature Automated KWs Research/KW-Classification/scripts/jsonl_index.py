@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Streaming JSONL Reader and Key -> Byte-Offset Index
+
+Batch output files and datasets are joined on one key (`custom_id` for
+batch results, `id` for dataset records). Instead of parsing whole files
+into dicts, JsonlIndex scans them once and keeps only key -> (file, byte
+offset); a record is read and parsed when it is looked up, so a join holds
+one record per side in memory, whatever the file size.
+
+- iter_jsonl() streams records line by line (blank lines skipped)
+- The key is read from the start of the line (top-level fields written
+  before any nested object, as batch output and dataset lines are), so the
+  scan does not parse the large response bodies; other lines are parsed
+- Several files (the shards of a module) form one index
+- Duplicate keys: the last line wins (a re-downloaded result replaces the
+  older one), or the first with keep="first"
+- `where` keeps only records it accepts (those are parsed during the scan);
+  `value` maps a looked-up record to what the index returns (one field)
+
+Usage:
+    results = JsonlIndex(results_dir.glob("m12b*_results.jsonl"))
+    for idx, record in enumerate(iter_jsonl(dataset_path)):
+        result = results.get(f"m12b_{idx:05d}")
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+PathLike = Union[str, Path]
+
+
+def iter_jsonl(path: PathLike) -> Iterator[dict]:
+    """Records of a JSONL file, read one line at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class JsonlIndex:
+    """Read-only mapping key -> record over one or more JSONL files."""
+
+    def __init__(
+        self,
+        paths: Union[PathLike, Iterable[PathLike]],
+        key: str = "custom_id",
+        keep: str = "last",
+        where: Optional[Callable[[dict], bool]] = None,
+        value: Optional[Callable[[dict], Any]] = None,
+    ):
+        self._files: Dict[int, object] = {}
+        if keep not in ("first", "last"):
+            raise ValueError(f"keep must be 'first' or 'last', not {keep!r}")
+        self.paths: List[Path] = [Path(paths)] if isinstance(paths, (str, Path)) else [Path(p) for p in paths]
+        self.key = key
+        self.value = value
+        self._key_pattern = re.compile(rb'[{,]\s*"' + re.escape(key.encode()) + rb'"\s*:\s*"((?:[^"\\]|\\.)*)"')
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        for file_idx, path in enumerate(self.paths):
+            self._scan(file_idx, path, keep, where)
+
+    def _line_key(self, line: bytes) -> Optional[str]:
+        """Key of a JSONL line, without parsing it when the key precedes any nested value."""
+        nested = min((pos for pos in (line.find(b"{", 1), line.find(b"[")) if pos != -1), default=len(line))
+        match = self._key_pattern.search(line, 0, nested)
+        if match:
+            return json.loads(b'"' + match.group(1) + b'"')
+        value = json.loads(line).get(self.key)
+        return None if value is None else str(value)
+
+    def _scan(self, file_idx: int, path: Path, keep: str, where) -> None:
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                start, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                if where is not None:
+                    record = json.loads(line)
+                    if not where(record):
+                        continue
+                    key = record.get(self.key)
+                    key = None if key is None else str(key)
+                else:
+                    key = self._line_key(line)
+                if key and (keep == "last" or key not in self._offsets):
+                    self._offsets[key] = (file_idx, start)
+
+    def _read(self, file_idx: int, offset: int):
+        f = self._files.get(file_idx)
+        if f is None:
+            f = self._files[file_idx] = open(self.paths[file_idx], "rb")
+        f.seek(offset)
+        record = json.loads(f.readline())
+        return self.value(record) if self.value else record
+
+    def __getitem__(self, key: str):
+        return self._read(*self._offsets[key])
+
+    def get(self, key: str, default=None):
+        location = self._offsets.get(key)
+        return default if location is None else self._read(*location)
+
+    def path(self, key: str) -> Path:
+        """File holding `key`'s record (which shard a request came from)."""
+        return self.paths[self._offsets[key][0]]
+
+    def __contains__(self, key) -> bool:
+        return key in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def keys(self):
+        return self._offsets.keys()
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """(key, record) pairs in index order, each record read on demand."""
+        for key, location in self._offsets.items():
+            yield key, self._read(*location)
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self) -> "JsonlIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Multi-Keyword Request Packing
+
+Single-record datasets repeat the same product context (title, bullets,
+attribute table, brand entities, ...) on every row; only `keyword` changes.
+Records that share a context are packed into the multi-keyword form used by
+prompts/modules/batch/*_batch.md and datasets/batched/*_b50.jsonl:
+
+    input:  {<shared context>, "keywords": [kw1, kw2, ...]}
+    output: {"results": [{"keyword": kw1, ...}, {"keyword": kw2, ...}]}
+
+Each distinct keyword is sent once per pack; records repeating a keyword
+in the same context share its result. `results[]` is unpacked back into
+one output per record, so result rows,
+metrics, CSV/JSONL files and --resume work exactly as for per-record calls.
+Token usage and cost of a packed call are split evenly over its records.
+
+A record whose keyword is missing from `results[]` gets an error output (and
+is re-run by --resume); an error/unparseable packed response is copied to
+every record of the pack.
+
+With a TokenBudget, packs are sized per context instead of a fixed count:
+a pack grows while its estimated prompt tokens plus expected completion
+tokens (per-keyword completion measured from past runs, with a safety
+margin) fit the model's context window and the max_tokens cap, and each
+pack carries the `max_tokens` to request. Large contexts get smaller packs
+(no truncated JSON), small contexts fill up to `size`.
+
+Usage:
+    packer = KeywordPacker.for_module("m13", size=50)   # None if not packable
+    packer.budget = TokenBudget.for_model("gpt-4o-mini", completion_per_keyword=40)
+    for pack in packer.pack(with_record_ids(records)):
+        messages = render_messages(packer.template, pack.as_record())
+        request = LLMRequest(messages=messages, max_tokens=pack.max_tokens, ...)
+        ...
+        for (record_id, record), output in zip(pack.members, unpack_output(pack, output)):
+            ...
+"""
+
+import hashlib
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config import DEFAULT_TOKEN_LIMITS, MODEL_TOKEN_LIMITS, PROJECT_ROOT
+from prompt_template import JsonCache, compile_template
+from llm.rate_limiter import CHARS_PER_TOKEN, estimate_prompt_tokens
+
+BATCH_PROMPTS_DIR = PROJECT_ROOT / "prompts" / "modules" / "batch"
+BATCH_SCHEMAS_DIR = PROJECT_ROOT / "prompts" / "json_schemas" / "batch"
+
+DEFAULT_PACK_SIZE = 50  # Same as datasets/batched/*_b50.jsonl
+
+KEYWORD_FIELD = "keyword"
+KEYWORDS_FIELD = "keywords"
+
+# Per-call metrics split evenly over the records of a pack
+SPLIT_METRICS = ("prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens", "estimated_cost")
+
+# Token budget
+DEFAULT_COMPLETION_PER_KEYWORD = 150  # When no past run of the module/model exists
+COMPLETION_PERCENTILE = 0.9  # Past per-record completion tokens -> per-keyword estimate
+BUDGET_MARGIN = 1.2  # Headroom on the completion estimate
+RESPONSE_OVERHEAD_TOKENS = 16  # {"results": [...]} wrapper
+KEYWORD_LINE_CHARS = 16  # Quotes, indentation and `"keyword": ` around each keyword
+
+PRETTY_JSON = JsonCache(indent=2)
+
+
+def find_batch_prompt_file(module_id: str) -> Optional[Path]:
+    """prompts/modules/batch/{module_id}_*_batch.md (m04 does not match m04b)."""
+    matches = sorted(BATCH_PROMPTS_DIR.glob(f"{module_id}_*_batch.md"))
+    return matches[0] if matches else None
+
+
+def find_batch_schema_file(module_id: str) -> Optional[Path]:
+    """prompts/json_schemas/batch/{module_id}_*_batch_schema.json"""
+    matches = sorted(BATCH_SCHEMAS_DIR.glob(f"{module_id}_*_batch_schema.json"))
+    return matches[0] if matches else None
+
+
+def context_of(record: dict) -> dict:
+    """Record input without its keyword (the part shared by a pack)."""
+    return {k: v for k, v in record.get("input", {}).items() if k != KEYWORD_FIELD}
+
+
+def context_key(record: dict) -> str:
+    """Stable hash of the non-keyword input."""
+    payload = json.dumps(context_of(record), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_keyword(keyword) -> str:
+    return str(keyword or "").strip().lower()
+
+
+def keyword_tokens(keyword) -> int:
+    """Estimated tokens one keyword adds to the prompt list (and echoes in results[])."""
+    return math.ceil((len(json.dumps(str(keyword or ""))) + KEYWORD_LINE_CHARS) / CHARS_PER_TOKEN)
+
+
+def completion_per_keyword(samples: Sequence[int], percentile: float = COMPLETION_PERCENTILE) -> Optional[int]:
+    """Per-keyword completion estimate from past per-record completion tokens."""
+    values = sorted(value for value in samples if value > 0)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * percentile))]
+
+
+@dataclass
+class TokenBudget:
+    """Context window and completion cap one packed call must fit in."""
+    context_window: int
+    max_output_tokens: int
+    completion_per_keyword: float
+    margin: float = BUDGET_MARGIN
+
+    @classmethod
+    def for_model(
+        cls, model: str, completion_per_keyword: float, max_tokens: Optional[int] = None
+    ) -> "TokenBudget":
+        """Budget from MODEL_TOKEN_LIMITS, capped at `max_tokens` completion tokens."""
+        context_window, max_output_tokens = MODEL_TOKEN_LIMITS.get(model, DEFAULT_TOKEN_LIMITS)
+        if max_tokens:
+            max_output_tokens = min(max_output_tokens, max_tokens)
+        return cls(context_window, max_output_tokens, completion_per_keyword)
+
+    def completion_tokens(self, keywords: int, echo_tokens: int) -> int:
+        """Completion tokens to reserve for `keywords` results."""
+        expected = RESPONSE_OVERHEAD_TOKENS + keywords * self.completion_per_keyword + echo_tokens
+        return math.ceil(expected * self.margin)
+
+    def fits(self, prompt_tokens: int, keywords: int, echo_tokens: int) -> bool:
+        completion = self.completion_tokens(keywords, echo_tokens)
+        return completion <= self.max_output_tokens and prompt_tokens + completion <= self.context_window
+
+
+@dataclass
+class Pack:
+    """Records sharing one product context, sent as a single request."""
+    context: dict
+    members: List[Tuple[str, dict]] = field(default_factory=list)  # (record_id, record)
+    keyword_tokens: Dict[str, int] = field(default_factory=dict)  # normalized keyword -> tokens
+    prompt_tokens: int = 0  # Estimated prompt tokens without keywords (budgeted packs)
+    max_tokens: Optional[int] = None  # Completion cap to request (budgeted packs)
+
+    def add(self, record_id: str, record: dict):
+        keyword = record["input"].get(KEYWORD_FIELD, "")
+        self.members.append((record_id, record))
+        self.keyword_tokens.setdefault(normalize_keyword(keyword), keyword_tokens(keyword))
+
+    @property
+    def keywords(self) -> List[str]:
+        """Distinct keywords in member order (duplicate rows share one result)."""
+        seen = {}
+        for _, record in self.members:
+            keyword = record["input"].get(KEYWORD_FIELD, "")
+            seen.setdefault(normalize_keyword(keyword), keyword)
+        return list(seen.values())
+
+    def as_record(self) -> dict:
+        """Multi-keyword record in the datasets/batched format."""
+        return {"input": {**self.context, KEYWORDS_FIELD: self.keywords}}
+
+
+class KeywordPacker:
+    """Groups records by context into packs of at most `size` records (and `budget`)."""
+
+    def __init__(
+        self,
+        template: str,
+        schema_path: Optional[Path] = None,
+        size: int = DEFAULT_PACK_SIZE,
+        prompt_path: Optional[Path] = None,
+        budget: Optional[TokenBudget] = None,
+        render: Optional[Callable[[dict], List[dict]]] = None,
+    ):
+        self.template = template
+        self.prompt_path = prompt_path
+        self.schema_path = schema_path
+        self.size = size
+        self.budget = budget
+        # Record -> chat messages, for prompt token estimates (default: inline template)
+        self.render = render or self._render_inline
+        # Context fields the batch prompt needs (everything but the keyword list)
+        self.required = tuple(
+            name for name in compile_template(template).placeholders if name != KEYWORDS_FIELD
+        )
+
+    @classmethod
+    def for_module(cls, module_id: str, size: int = DEFAULT_PACK_SIZE) -> Optional["KeywordPacker"]:
+        """Packer for a module with a batch prompt, else None."""
+        prompt_path = find_batch_prompt_file(module_id)
+        if not prompt_path:
+            return None
+        template = prompt_path.read_text(encoding="utf-8")
+        return cls(template, find_batch_schema_file(module_id), size, prompt_path)
+
+    def missing_fields(self, record: dict) -> List[str]:
+        """Batch prompt placeholders this record cannot fill (empty = packable)."""
+        input_data = record.get("input", {})
+        missing = [name for name in self.required if name not in input_data]
+        if KEYWORD_FIELD not in input_data:
+            missing.append(KEYWORD_FIELD)
+        return missing
+
+    def _render_inline(self, record: dict) -> List[dict]:
+        values = {
+            name: PRETTY_JSON.dumps(value) if isinstance(value, (dict, list)) else str(value)
+            for name, value in record["input"].items()
+        }
+        return [{"role": "user", "content": compile_template(self.template).render(values)}]
+
+    def _open(self, record: dict) -> Pack:
+        pack = Pack(context_of(record))
+        if self.budget:
+            pack.prompt_tokens = estimate_prompt_tokens(self.render(pack.as_record()))
+        return pack
+
+    def _fits(self, pack: Pack, record: dict) -> bool:
+        """Whether `record` can join `pack` within the token budget."""
+        keyword = record["input"].get(KEYWORD_FIELD, "")
+        if not self.budget or normalize_keyword(keyword) in pack.keyword_tokens:
+            return True
+        tokens = sum(pack.keyword_tokens.values()) + keyword_tokens(keyword)
+        return self.budget.fits(pack.prompt_tokens + tokens, len(pack.keyword_tokens) + 1, tokens)
+
+    def _close(self, pack: Pack) -> Pack:
+        if self.budget:
+            completion = self.budget.completion_tokens(len(pack.keyword_tokens), sum(pack.keyword_tokens.values()))
+            pack.max_tokens = min(completion, self.budget.max_output_tokens)
+        return pack
+
+    def pack(self, records: Iterable[Tuple[str, dict]]) -> Iterator[Pack]:
+        """
+        Yield packs as they fill up, then the partial ones.
+
+        Only one open pack per context is held, so memory stays bounded by
+        (distinct contexts x size) on streamed datasets. A record that does
+        not fit the budget of its context's open pack closes it; a single
+        keyword is always sent, even if its context alone exceeds the budget.
+        """
+        open_packs: Dict[str, Pack] = {}
+        for record_id, record in records:
+            key = context_key(record)
+            pack = open_packs.get(key)
+            if pack is not None and not self._fits(pack, record):
+                yield self._close(open_packs.pop(key))
+                pack = None
+            if pack is None:
+                pack = open_packs[key] = self._open(record)
+            pack.add(record_id, record)
+            if len(pack.members) >= self.size:
+                yield self._close(open_packs.pop(key))
+        for pack in open_packs.values():
+            yield self._close(pack)
+
+
+def split_metrics(metrics: dict, count: int) -> dict:
+    """Per-record share of a packed call's `_metrics`."""
+    share = dict(metrics)
+    for name in SPLIT_METRICS:
+        if name in share and share[name]:
+            share[name] = share[name] / count
+            if name != "estimated_cost":
+                share[name] = round(share[name])
+    return share
+
+
+def unpack_output(pack: Pack, output: dict) -> List[dict]:
+    """One output per pack member from a packed `{"results": [...]}` output."""
+    share = split_metrics(output.pop("_metrics", {}), len(pack.members))
+    results = output.get("results")
+
+    if "error" in output or output.get("parse_error") or not isinstance(results, list):
+        # Whole call failed: every record gets the error (re-run by --resume)
+        failed = dict(output)
+        if "error" not in failed and not failed.get("parse_error"):
+            failed.update(error="Packed response has no results[]", error_type="pack_error")
+        return [{**failed, "_metrics": dict(share)} for _ in pack.members]
+
+    by_keyword: Dict[str, dict] = {}
+    for item in results:
+        if isinstance(item, dict):
+            by_keyword.setdefault(normalize_keyword(item.get(KEYWORD_FIELD)), item)
+
+    outputs = []
+    for _, record in pack.members:
+        item = by_keyword.get(normalize_keyword(record["input"].get(KEYWORD_FIELD)))
+        if item is not None:
+            unpacked = {k: v for k, v in item.items() if k != KEYWORD_FIELD}
+        else:
+            unpacked = {"error": "Keyword missing from packed response", "error_type": "pack_missing"}
+        unpacked["_metrics"] = dict(share)
+        outputs.append(unpacked)
+    return outputs
@@ -0,0 +1,19 @@
+"""
+Shared LLM Runtime Package
+
+Modules:
+A) engine.py - Async execution engine (pooled client, bounded concurrency)
+B) cache.py - Persistent content-addressed response cache
+C) rate_limiter.py - Per-model RPM/TPM token-bucket rate limiter
+D) retry.py - Error classification and backoff policy
+E) dedup.py - Request body deduplication (leader/follower fan-out)
+F) mock_server.py - Offline OpenAI-compatible mock server (benchmarks)
+G) traces.py - Append-only per-call trace store and latency/cost report
+"""
+
+from .cache import ResponseCache
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy
+from .dedup import RequestDeduper
+from .traces import TraceStore, trace_call
+from .engine import LLMEngine, LLMRequest, LLMResult, get_engine
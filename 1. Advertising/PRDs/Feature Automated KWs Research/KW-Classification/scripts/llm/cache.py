@@ -0,0 +1,205 @@
+"""
+Content-addressed persistent LLM response cache.
+
+SQLite-backed cache in front of chat-completion calls. The key is a hash of
+everything that determines the response (model, messages, temperature,
+response_format/schema, max_tokens, and the endpoint when it is not the
+default OpenAI API), so re-running the same module or judge on identical
+inputs is served from disk, and a proxy, another provider or the mock
+server never answers from (or into) the OpenAI keyspace.
+
+Only deterministic requests (temperature 0) are cached by default.
+
+Eviction:
+- Age: entries older than `max_age_days` are dropped
+- Size: least-recently-used entries are dropped until under `max_mb`
+
+Usage:
+    cache = ResponseCache()
+    key = cache.make_key(request.to_kwargs(), endpoint=engine.endpoint)
+    hit = cache.get(key)
+    ...
+    cache.put(key, {"content": ..., "prompt_tokens": ...})
+    print(cache.stats())
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import LLM_CACHE_PATH, LLM_CACHE_MAX_MB, LLM_CACHE_MAX_AGE_DAYS
+
+# Run eviction every N writes
+EVICT_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+"""
+
+
+class ResponseCache:
+    """Disk-backed response cache with LRU/age eviction and hit/miss counters."""
+
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        max_mb: float = LLM_CACHE_MAX_MB,
+        max_age_days: float = LLM_CACHE_MAX_AGE_DAYS,
+    ):
+        self.path = Path(path)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 86400
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+
+        self.evict()
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(request_kwargs: dict, endpoint: Optional[str] = None) -> str:
+        """
+        Hash of model, messages, temperature, response_format and max_tokens,
+        plus the endpoint (base URL) unless it is None, i.e. the default
+        OpenAI API, whose keys stay the same as before endpoints were keyed.
+        """
+        payload = {
+            "model": request_kwargs.get("model"),
+            "messages": request_kwargs.get("messages"),
+            "temperature": request_kwargs.get("temperature"),
+            "response_format": request_kwargs.get("response_format"),
+            "max_tokens": request_kwargs.get("max_tokens"),
+        }
+        if endpoint is not None:
+            payload["endpoint"] = endpoint
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_cacheable(request_kwargs: dict) -> bool:
+        """Only temperature-0 calls are treated as deterministic."""
+        return request_kwargs.get("temperature") == 0
+
+    # ------------------------------------------------------------------
+    # Get / Put
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return cached response dict, or None on miss (expired entries miss)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict, model: str = "") -> None:
+        """Store a response dict."""
+        encoded = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, model, encoded, len(encoded), now, now),
+            )
+            self._conn.commit()
+            self.writes += 1
+            should_evict = self.writes % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    # ------------------------------------------------------------------
+    # Eviction / Maintenance
+    # ------------------------------------------------------------------
+
+    def evict(self) -> int:
+        """Drop expired entries, then LRU entries until under the size cap."""
+        removed = 0
+        with self._lock:
+            cutoff = time.time() - self.max_age_seconds
+            removed += self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (cutoff,)
+            ).rowcount
+
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                freed = 0
+                victims = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access ASC"
+                ):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                removed += len(victims)
+
+            self._conn.commit()
+            self.evicted += removed
+        return removed
+
+    def clear(self) -> int:
+        """Remove all entries."""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM responses").rowcount
+            self._conn.commit()
+        self._conn.execute("VACUUM")
+        return removed
+
+    def stats(self) -> dict:
+        """Counters for this process plus on-disk totals."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evicted": self.evicted,
+            "entries": entries,
+            "size_mb": size / (1024 * 1024),
+            "path": str(self.path),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,82 @@
+"""
+Request body deduplication.
+
+Datasets repeat (context, keyword) pairs, so one job can render the same
+request body several times. RequestDeduper hashes every body with the
+response cache key (model, messages, temperature, response_format,
+max_tokens) and keeps the first request id per hash as its leader; later
+ids with the same hash are followers that get a copy of the leader's result
+instead of a call of their own. Only deterministic (temperature-0) bodies
+are deduplicated, as in the response cache; sampled requests are always sent.
+
+- Realtime: LLMEngine.iter_results(..., dedup=RequestDeduper()) sends each
+  unique body once per call and yields its result for every duplicate
+  (LLMResult.deduplicated, no cost), also when the response cache is off.
+  Only the most recent finished leaders are kept in memory; older ones are
+  released, and a later duplicate of one is sent again as a new leader
+- Batch: generate_batch_requests.py writes only leaders and saves the
+  leader -> followers map next to the batch file; batch_dedup.py fans the
+  results out to the followers' custom_ids on download
+
+Usage:
+    dedup = RequestDeduper()
+    for idx, result in engine.iter_results(requests, dedup=dedup):
+        ...
+    print(dedup.summary())  # {"requests": 916, "unique": 893, "duplicates": 23, "dedup_ratio": 0.0251}
+"""
+
+from typing import Dict, Hashable, List, Optional
+
+from .cache import ResponseCache
+
+
+class RequestDeduper:
+    """Leader/follower bookkeeping for request bodies seen in one job."""
+
+    def __init__(self):
+        self.requests = 0
+        self.duplicates = 0
+        self._leaders: Dict[str, Hashable] = {}
+        self._keys: Dict[Hashable, str] = {}
+        self.followers: Dict[Hashable, List[Hashable]] = {}
+
+    def add(self, request_id: Hashable, body: dict) -> Optional[Hashable]:
+        """
+        Register a request; returns None if its body is new (the request is
+        sent), otherwise the id of the leader whose result it reuses.
+        """
+        self.requests += 1
+        if not ResponseCache.is_cacheable(body):
+            return None
+        key = ResponseCache.make_key(body)
+        leader = self._leaders.get(key)
+        if leader is None:
+            self._leaders[key] = request_id
+            self._keys[request_id] = key
+            return None
+        self.duplicates += 1
+        self.followers.setdefault(leader, []).append(request_id)
+        return leader
+
+    def release(self, leader: Hashable) -> None:
+        """Forget a leader's body: the next request with it becomes a new leader."""
+        key = self._keys.pop(leader, None)
+        if key is not None and self._leaders.get(key) == leader:
+            del self._leaders[key]
+
+    @property
+    def unique(self) -> int:
+        return self.requests - self.duplicates
+
+    @property
+    def ratio(self) -> float:
+        """Share of requests answered from another request's result."""
+        return self.duplicates / self.requests if self.requests else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "unique": self.unique,
+            "duplicates": self.duplicates,
+            "dedup_ratio": round(self.ratio, 4),
+        }
@@ -0,0 +1,480 @@
+"""
+Shared asyncio LLM execution engine.
+
+Every runner in the project (orchestrator, judges, multi-agent evaluators,
+iterative experiment scripts) goes through one engine instead of building
+its own blocking OpenAI client and thread pool:
+
+- One pooled keep-alive HTTP client (httpx) shared by all callers
+- One background event loop, so sync code can use it from any thread
+- Bounded in-flight concurrency (engine-wide + per-call limits)
+- Persistent response cache for temperature-0 calls (see cache.py)
+- Per-model RPM/TPM rate limiting (see rate_limiter.py)
+- Classified retries with backoff and a per-call deadline (see retry.py)
+- Uniform LLMResult object with usage/latency metrics
+- Optional in-flight deduplication of identical request bodies (see dedup.py)
+- Per-call trace entries for latency/cost reports (see traces.py)
+
+Usage:
+    from llm import get_engine, LLMRequest
+
+    engine = get_engine()
+    result = engine.complete(LLMRequest.from_prompt("...", model="gpt-4o-mini"))
+    results = engine.run_many(requests, concurrency=20)
+
+    for idx, result in engine.iter_results(requests, concurrency=20):
+        ...  # results arrive as they complete
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import OPENAI_API_KEY, DEFAULT_MODEL, DEFAULT_TEMPERATURE, LLM_CACHE_ENABLED, LLM_TRACES_ENABLED
+
+from .cache import ResponseCache
+from .dedup import RequestDeduper
+from .rate_limiter import RateLimiter
+from .retry import RetryPolicy, classify_error
+from .traces import TraceStore, get_trace_store
+
+# Engine defaults
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEDUP_SETTLED_RESULTS = 2048  # Finished leader results kept for later duplicates
+
+
+# ============================================================================
+# Request / Result
+# ============================================================================
+
+@dataclass
+class LLMRequest:
+    """Single chat-completion request."""
+    messages: List[dict]
+    model: str = DEFAULT_MODEL
+    temperature: Optional[float] = DEFAULT_TEMPERATURE
+    response_format: Optional[dict] = None
+    max_tokens: Optional[int] = None
+    use_cache: bool = True
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_prompt(cls, prompt: str, system: Optional[str] = None, **kwargs) -> "LLMRequest":
+        """Build a request from a user prompt and optional system message."""
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        return cls(messages=messages, **kwargs)
+
+    def to_kwargs(self) -> dict:
+        """Convert to chat.completions.create() keyword arguments."""
+        kwargs = {"model": self.model, "messages": self.messages}
+        if self.temperature is not None:
+            kwargs["temperature"] = self.temperature
+        if self.response_format:
+            kwargs["response_format"] = self.response_format
+        if self.max_tokens:
+            kwargs["max_tokens"] = self.max_tokens
+        return kwargs
+
+
+@dataclass
+class LLMResult:
+    """Uniform result of a chat-completion call."""
+    content: Optional[str] = None
+    model: str = ""
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    duration: float = 0.0
+    rate_limit_wait: float = 0.0
+    retries: int = 0
+    cached: bool = False
+    deduplicated: bool = False
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def parsed(self) -> Optional[Any]:
+        """Content parsed as JSON, or None if it is not valid JSON."""
+        if self.content is None:
+            return None
+        try:
+            return json.loads(self.content)
+        except json.JSONDecodeError:
+            return None
+
+    def as_output(self) -> dict:
+        """Parsed JSON dict, falling back to the raw text with a parse_error flag."""
+        parsed = self.parsed
+        if isinstance(parsed, dict):
+            return parsed
+        return {"raw_output": self.content, "parse_error": True}
+
+    def metrics(self) -> dict:
+        """Metrics dict in the `_metrics` format used by experiment outputs."""
+        return {
+            "cached": self.cached,
+            "deduplicated": self.deduplicated,
+            "duration": self.duration,
+            "llm_duration": 0.0 if self.cached or self.deduplicated else self.duration,
+            "rate_limit_wait": self.rate_limit_wait,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+# ============================================================================
+# Engine
+# ============================================================================
+
+class LLMEngine:
+    """
+    Async chat-completion engine running on its own event loop thread.
+
+    The async API (`acomplete`, `agather`) must run on the engine loop;
+    sync callers use `complete`, `submit`, `run_many` and `iter_results`,
+    which are safe to call from any thread.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        traces: Optional[TraceStore] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.api_key = api_key or OPENAI_API_KEY
+        self.base_url = base_url
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.traces = traces
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # ------------------------------------------------------------------
+    # Loop / client lifecycle
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use."""
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-engine", daemon=True)
+                thread.start()
+                self._loop = loop
+                self._thread = thread
+        return self._loop
+
+    def _get_client(self):
+        """Create the pooled async client (called on the engine loop)."""
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+            )
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0,  # Retries are handled by RetryPolicy
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def close(self) -> None:
+        """Close the HTTP client and stop the event loop."""
+        if self._loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+            self._client = None
+        if self.cache is not None:
+            self.cache.close()
+        if self.traces is not None:
+            self.traces.close()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        """
+        Effective base URL (as the OpenAI client resolves it), or None for the
+        default OpenAI API. Part of the response cache key.
+        """
+        base_url = (self.base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        return None if base_url == DEFAULT_BASE_URL else base_url
+
+    # ------------------------------------------------------------------
+    # Async API (engine loop only)
+    # ------------------------------------------------------------------
+
+    async def acomplete(self, request: LLMRequest) -> LLMResult:
+        """Execute one request; errors are returned in the result, never raised."""
+        result = await self._acomplete(request)
+        if self.traces is not None:
+            self.traces.record_result(request, result)
+        return result
+
+    async def _acomplete(self, request: LLMRequest) -> LLMResult:
+        kwargs = request.to_kwargs()
+
+        cache_key = None
+        if self.cache is not None and request.use_cache and self.cache.is_cacheable(kwargs):
+            cache_key = self.cache.make_key(kwargs, endpoint=self.endpoint)
+            start_time = time.time()
+            hit = self.cache.get(cache_key)
+            if hit is not None:
+                return LLMResult(
+                    **hit,
+                    duration=time.time() - start_time,
+                    cached=True,
+                    metadata=request.metadata,
+                )
+
+        client = self._get_client()
+        limiter = self.rate_limiter
+        policy = self.retry_policy
+        estimate = limiter.estimate_tokens(kwargs) if limiter else 0
+
+        call_start = time.time()
+        deadline = call_start + policy.deadline if policy.deadline else None
+        waited = 0.0
+        attempt = 0
+
+        while True:
+            error = None
+            async with self._semaphore:
+                if limiter:
+                    waited += await limiter.acquire(request.model, estimate)
+                timeout = self.timeout
+                if deadline is not None:
+                    timeout = max(1.0, min(timeout, deadline - time.time()))
+                start_time = time.time()
+                try:
+                    raw = await client.chat.completions.with_raw_response.create(**kwargs, timeout=timeout)
+                    response = raw.parse()
+                except Exception as e:
+                    error = e
+                    if limiter:
+                        # A failed attempt used no tokens: refund its reservation (the
+                        # retry reserves again), then let the headers clamp the level
+                        limiter.reconcile(request.model, estimate, 0)
+                        error_response = getattr(e, "response", None)
+                        if error_response is not None:
+                            limiter.update_from_headers(request.model, error_response.headers)
+                duration = time.time() - start_time
+
+            if error is None:
+                break
+
+            retryable, retry_after = classify_error(error)
+            delay = policy.next_delay(attempt, retry_after)
+            past_deadline = deadline is not None and time.time() + delay >= deadline
+            if not retryable or attempt >= policy.max_retries or past_deadline:
+                message = str(error)
+                if retryable:
+                    reason = "deadline exceeded" if past_deadline else "retries exhausted"
+                    message = f"{message} ({reason} after {attempt} retries)"
+                return LLMResult(
+                    model=request.model,
+                    duration=time.time() - call_start,
+                    rate_limit_wait=waited,
+                    retries=attempt,
+                    error=message,
+                    error_type=type(error).__name__,
+                    metadata=request.metadata,
+                )
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        usage = response.usage
+        prompt_details = getattr(usage, "prompt_tokens_details", None) if usage else None
+        if limiter:
+            limiter.update_from_headers(request.model, raw.headers)
+            if usage:
+                limiter.reconcile(request.model, estimate, usage.total_tokens)
+
+        response_data = {
+            "content": response.choices[0].message.content,
+            "model": response.model or request.model,
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "cached_tokens": (getattr(prompt_details, "cached_tokens", 0) or 0) if prompt_details else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0,
+            "total_tokens": usage.total_tokens if usage else 0,
+        }
+        if cache_key is not None and response_data["content"] is not None:
+            self.cache.put(cache_key, response_data, model=request.model)
+
+        return LLMResult(
+            **response_data,
+            duration=duration,
+            rate_limit_wait=waited,
+            retries=attempt,
+            metadata=request.metadata,
+        )
+
+    async def agather(
+        self,
+        requests: List[LLMRequest],
+        concurrency: Optional[int] = None,
+        on_result: Optional[Callable[[int, LLMResult], None]] = None,
+    ) -> List[LLMResult]:
+        """Execute many requests with an optional per-call concurrency cap."""
+        limit = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def _one(idx: int, request: LLMRequest) -> LLMResult:
+            async with limit:
+                result = await self.acomplete(request)
+            if on_result:
+                on_result(idx, result)
+            return result
+
+        return await asyncio.gather(*(_one(i, r) for i, r in enumerate(requests)))
+
+    # ------------------------------------------------------------------
+    # Sync API (any thread)
+    # ------------------------------------------------------------------
+
+    def submit(self, request: LLMRequest) -> Future:
+        """Schedule a request on the engine loop and return a Future."""
+        return asyncio.run_coroutine_threadsafe(self.acomplete(request), self._ensure_loop())
+
+    def complete(self, request: LLMRequest) -> LLMResult:
+        """Execute one request and block until it finishes."""
+        return self.submit(request).result()
+
+    def run_many(self, requests: List[LLMRequest], concurrency: Optional[int] = None) -> List[LLMResult]:
+        """Execute many requests concurrently; results keep request order."""
+        future = asyncio.run_coroutine_threadsafe(
+            self.agather(requests, concurrency=concurrency), self._ensure_loop()
+        )
+        return future.result()
+
+    def iter_results(
+        self,
+        requests: Iterable[LLMRequest],
+        concurrency: Optional[int] = None,
+        dedup: Optional[RequestDeduper] = None,
+    ) -> Iterator[Tuple[int, LLMResult]]:
+        """
+        Execute many requests, yielding (index, result) as each one completes.
+
+        `requests` may be a lazy iterable (e.g. a generator over a JSONL file):
+        only `concurrency` requests are pulled from it and in flight at once.
+
+        With `dedup`, a request whose body repeats an earlier one is not sent:
+        it waits for that leader and yields a copy of its result marked
+        `deduplicated` (waiting duplicates count toward `concurrency`). Only
+        the last DEDUP_SETTLED_RESULTS finished leaders are kept, so memory
+        stays bounded; a duplicate of an older leader is sent again.
+        """
+        limit = concurrency or self.max_concurrency
+        source = enumerate(requests)
+        pending: Dict[Future, int] = {}
+        waiting: Dict[int, List[Tuple[int, LLMRequest]]] = {}  # leader idx -> duplicates
+        settled: "OrderedDict[int, LLMResult]" = OrderedDict()  # finished leader idx -> result (LRU)
+        held = 0
+        exhausted = False
+
+        def follow(result: LLMResult, request: LLMRequest) -> LLMResult:
+            return replace(result, duration=0.0, rate_limit_wait=0.0, retries=0,
+                           deduplicated=True, metadata=request.metadata)
+
+        while True:
+            while not exhausted and len(pending) + held < limit:
+                try:
+                    idx, request = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                leader = dedup.add(idx, request.to_kwargs()) if dedup is not None else None
+                if leader is None:
+                    pending[self.submit(request)] = idx
+                elif leader in settled:
+                    settled.move_to_end(leader)
+                    yield idx, follow(settled[leader], request)
+                else:
+                    waiting.setdefault(leader, []).append((idx, request))
+                    held += 1
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, result = pending.pop(future), future.result()
+                yield idx, result
+                if dedup is not None:
+                    settled[idx] = result
+                    if len(settled) > DEDUP_SETTLED_RESULTS:
+                        dedup.release(settled.popitem(last=False)[0])
+                for follower, request in waiting.pop(idx, ()):
+                    held -= 1
+                    yield follower, follow(result, request)
+
+
+# ============================================================================
+# Shared instance
+# ============================================================================
+
+_default_engine: Optional[LLMEngine] = None
+_default_lock = threading.Lock()
+
+
+def get_engine() -> LLMEngine:
+    """Return the process-wide shared engine (created on first use)."""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            traces = get_trace_store() if LLM_TRACES_ENABLED else None
+            _default_engine = LLMEngine(rate_limiter=RateLimiter(), traces=traces)
+            # Only OpenAI answers go to the shared cache: a proxy or the mock
+            # server (which answers with gold labels) must never feed later runs
+            if LLM_CACHE_ENABLED and _default_engine.endpoint is None:
+                _default_engine.cache = ResponseCache()
+        return _default_engine
@@ -0,0 +1,827 @@
+#!/usr/bin/env python3
+"""
+Mock OpenAI-compatible server for offline benchmarking.
+
+Stand-in for the OpenAI API so the orchestrator, batch scripts and judge
+runners can be exercised end to end with no network and no cost:
+
+- POST /v1/chat/completions           - canned, schema-valid responses
+- POST /v1/files, GET /v1/files/{id}[/content]
+- POST /v1/batches, GET /v1/batches[/{id}], POST /v1/batches/{id}/cancel
+- GET  /mock/stats, POST /mock/reset  - request/error counters
+
+Responses for structured-output requests are built from the request's JSON
+schema and filled with the `expected` values of the matching record in
+datasets/single/*.jsonl. The module comes from the schema name (or the
+prompt heading), the record from its input values found in the prompt.
+Multi-keyword schemas (`results[]` with a `keyword`) get one result per
+record whose keyword is listed in the prompt; results nesting one object per
+module (`"m13": {...}, "m14": {...}`, the fused Path A call) get each
+module's record under its id.
+Module prompts without a schema get the record's `expected` as JSON,
+other json_object requests (judges) get `--json-object-response`.
+
+Latency, 5xx errors, 429s and a hard RPM/TPM limit are configurable and
+seeded, so concurrency/retry changes can be measured deterministically.
+
+Usage:
+    python scripts/llm/mock_server.py --port 8765 --latency lognormal:0.4,0.3
+    python scripts/llm/mock_server.py --error-rate 0.02 --rate-limit-rate 0.05 --rpm 600
+
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock LLM_CACHE=0 LLM_TRACES=0
+    python scripts/orchestrator.py run --module m13 --samples 200
+
+Answers copy the gold `expected` values, so they must never reach the
+response cache: the shared engine (get_engine) only caches when no
+OPENAI_BASE_URL is set, and LLM_CACHE=0 keeps it off for any other client.
+LLM_TRACES=0 keeps mock calls out of `orchestrator.py traces report`.
+
+    # In-process (benchmarks)
+    server, base_url = start_mock_server(MockConfig(latency="fixed:0.05"))
+"""
+
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import DATASETS_DIR, PROMPTS_DIR
+
+CHARS_PER_TOKEN = 4
+
+# OpenAI caches prompt prefixes in 128-token blocks once a prompt reaches 1024
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_BLOCK = 128
+
+SCHEMA_NAME_PATTERN = re.compile(r"^module_(\d+)([a-z]?)_")
+PROMPT_FILE_PATTERN = re.compile(r"^(m\d+[a-z]?)_")
+MODULE_ID_PATTERN = re.compile(r"m\d+[a-z]?")
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*\w+\s*\}\}")
+
+# Static prompt text shorter than this is not stripped before record matching
+MIN_STATIC_CHUNK = 20
+
+DEFAULT_JSON_OBJECT_RESPONSE = {
+    "verdict": "PASS",
+    "label": "Pass",
+    "score": 1.0,
+    "reasoning": "Mock response",
+}
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock provider."""
+    latency: str = "fixed:0"  # fixed:S | uniform:A,B | normal:MU,SD | lognormal:MEDIAN,SIGMA
+    token_latency: float = 0.0  # Extra seconds per completion token
+    error_rate: float = 0.0  # Fraction of calls answered with a 5xx
+    rate_limit_rate: float = 0.0  # Fraction of calls answered with a 429
+    retry_after_ms: int = 200  # Retry-After sent with injected 429s
+    rpm: Optional[int] = None  # Enforced requests/minute (None = unlimited)
+    tpm: Optional[int] = None  # Enforced tokens/minute (None = unlimited)
+    batch_delay: float = 1.0  # Seconds a batch stays in_progress
+    seed: int = 42
+    datasets_dir: Path = DATASETS_DIR
+    prompts_dir: Path = PROMPTS_DIR
+    json_object_response: Dict[str, Any] = field(default_factory=lambda: dict(DEFAULT_JSON_OBJECT_RESPONSE))
+
+
+# ============================================================================
+# Canned Outputs
+# ============================================================================
+
+def module_from_schema_name(name: str) -> Optional[str]:
+    """module_12b_CombinedClassification_output -> m12b"""
+    match = SCHEMA_NAME_PATTERN.match(name or "")
+    if not match:
+        return None
+    return f"m{int(match.group(1)):02d}{match.group(2)}"
+
+
+def synthesize(schema: dict, expected: Any = None, root: Optional[dict] = None) -> Any:
+    """Build a value valid for `schema`, preferring `expected` where it fits."""
+    root = root or schema
+    if "$ref" in schema:
+        ref = schema["$ref"].split("/")[-1]
+        schema = root.get("$defs", root.get("definitions", {})).get(ref, {})
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            branches = schema[key]
+            fitting = [b for b in branches if _fits(b, expected)]
+            return synthesize((fitting or branches)[0], expected, root)
+
+    types = schema.get("type", "object")
+    types = types if isinstance(types, list) else [types]
+    if expected is None and "null" in types:
+        return None
+    fitting = [t for t in types if t != "null" and _fits({**schema, "type": t}, expected)]
+    chosen = fitting[0] if fitting else next((t for t in types if t != "null"), "null")
+
+    if chosen == "null":
+        return None
+    if chosen == "object":
+        properties = schema.get("properties", {})
+        values = expected if isinstance(expected, dict) else {}
+        return {name: synthesize(sub, values.get(name), root) for name, sub in properties.items()}
+    if chosen == "array":
+        if isinstance(expected, list):
+            items = schema.get("items", {})
+            return [synthesize(items, item, root) for item in expected]
+        return []
+
+    if expected is not None and _fits({**schema, "type": chosen}, expected):
+        return expected
+    enum = [v for v in schema.get("enum", []) if v is not None]
+    if enum:
+        return enum[0]
+    return {"string": "mock", "boolean": False, "number": 0.5, "integer": 0}.get(chosen)
+
+
+def _fits(schema: dict, value: Any) -> bool:
+    """Loose type/enum check for a single value."""
+    if value is None:
+        types = schema.get("type", [])
+        types = types if isinstance(types, list) else [types]
+        return "null" in types
+    if "enum" in schema and value not in schema["enum"]:
+        return False
+    checks = {
+        "string": lambda v: isinstance(v, str),
+        "boolean": lambda v: isinstance(v, bool),
+        "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+        "object": lambda v: isinstance(v, dict),
+        "array": lambda v: isinstance(v, list),
+        "null": lambda v: v is None,
+    }
+    types = schema.get("type")
+    if types is None:
+        return True
+    types = types if isinstance(types, list) else [types]
+    return any(checks.get(t, lambda v: False)(value) for t in types)
+
+
+class CannedOutputs:
+    """Looks up a record's `expected` output from the prompt text."""
+
+    def __init__(self, datasets_dir: Path = DATASETS_DIR, prompts_dir: Path = PROMPTS_DIR, memo_size: int = 4096):
+        self.datasets_dir = Path(datasets_dir)
+        self.prompts_dir = Path(prompts_dir)
+        self._modules: Dict[str, List[Tuple[List[str], dict, Optional[str]]]] = {}
+        self._signatures: Optional[Dict[str, str]] = None
+        self._static_chunks: Dict[str, List[List[str]]] = {}  # module -> chunks per template
+        self._memo: "OrderedDict[str, Optional[dict]]" = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def _records(self, module_id: str) -> List[Tuple[List[str], dict, Optional[str]]]:
+        """(needles, expected, keyword) per record; needles are the record's string inputs."""
+        with self._lock:
+            if module_id not in self._modules:
+                entries = []
+                for path in sorted(self.datasets_dir.glob(f"{module_id}_v*.jsonl")):
+                    with open(path, encoding="utf-8") as f:
+                        for line in f:
+                            if not line.strip():
+                                continue
+                            record = json.loads(line)
+                            input_data = record.get("input", {})
+                            needles = [
+                                value for value in input_data.values()
+                                if isinstance(value, str) and len(value.strip()) >= 2
+                            ]
+                            if needles:
+                                entries.append((needles, record.get("expected", {}), input_data.get("keyword")))
+                self._modules[module_id] = entries
+            return self._modules[module_id]
+
+    def _load_prompts(self) -> None:
+        """Index module prompts: heading -> module, module -> static chunks per template."""
+        with self._lock:
+            if self._signatures is not None:
+                return
+            signatures = {}
+            # Single-record templates, then the multi-keyword ones next to them
+            paths = sorted(self.prompts_dir.glob("*.md")) + sorted((self.prompts_dir.parent / "batch").glob("*.md"))
+            for path in paths:
+                match = PROMPT_FILE_PATTERN.match(path.name)
+                if not match:
+                    continue
+                template = path.read_text(encoding="utf-8")
+                lines = [line.strip() for line in template.splitlines() if line.strip()]
+                if lines:
+                    signatures.setdefault(lines[0], match.group(1))
+                chunks = [c.strip() for c in PLACEHOLDER_PATTERN.split(template) if len(c.strip()) >= MIN_STATIC_CHUNK]
+                self._static_chunks.setdefault(match.group(1), []).append(sorted(chunks, key=len, reverse=True))
+            self._signatures = signatures
+
+    def _strip_template(self, module_id: str, text: str) -> str:
+        """Remove the static text of the module template the prompt was rendered from."""
+        self._load_prompts()
+        best, best_len = [], 0
+        for chunks in self._static_chunks.get(module_id, []):
+            matched = sum(len(chunk) for chunk in chunks if chunk in text)
+            if matched > best_len:
+                best, best_len = chunks, matched
+        for chunk in best:
+            text = text.replace(chunk, "\0")
+        return text
+
+    def detect_module(self, text: str) -> Optional[str]:
+        """Module whose prompt heading (first non-empty line) appears in `text`."""
+        self._load_prompts()
+        # Longest heading first, so "Module 12 ... Decision" beats a shorter prefix
+        for signature in sorted(self._signatures, key=len, reverse=True):
+            if signature in text:
+                return self._signatures[signature]
+        return None
+
+    def expected_for(self, module_id: str, text: str) -> Optional[dict]:
+        """Expected output of the most specific record whose inputs all appear in `text`."""
+        memo_key = hashlib.sha1(f"{module_id}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if memo_key in self._memo:
+                self._memo.move_to_end(memo_key)
+                return self._memo[memo_key]
+
+        # Few-shot examples in the template mention other keywords; drop static text
+        text = self._strip_template(module_id, text)
+
+        candidates = [
+            (needles, expected) for needles, expected, _ in self._records(module_id)
+            if all(needle in text for needle in needles)
+        ]
+        if len(candidates) > 1:
+            # Records of one product share title/description; a keyword that only
+            # occurs inside that shared text does not identify the record
+            common = set.intersection(*(set(needles) for needles, _ in candidates))
+            stripped = text
+            for needle in sorted(common, key=len, reverse=True):
+                stripped = stripped.replace(needle, "\0")
+            distinct = [
+                (needles, expected) for needles, expected in candidates
+                if all(needle in stripped for needle in needles if needle not in common)
+            ]
+            candidates = distinct or candidates
+
+        best, best_score = None, 0
+        for needles, expected in candidates:
+            score = sum(len(needle) for needle in needles)
+            if score > best_score:
+                best, best_score = expected, score
+
+        with self._lock:
+            self._memo[memo_key] = best
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+        return best
+
+    def expected_for_pack(self, module_id: str, text: str) -> List[dict]:
+        """
+        `results[]` for a multi-keyword prompt (prompts/modules/batch).
+
+        Keywords are found as JSON strings ("kw") in the prompt; a record
+        whose other string inputs also appear is preferred over one that
+        only shares the keyword. Results follow the prompt's keyword order.
+        """
+        text = self._strip_template(module_id, text)
+        found: Dict[str, Tuple[int, int, dict]] = {}  # keyword -> (position, context score, expected)
+        for needles, expected, keyword in self._records(module_id):
+            if not keyword:
+                continue
+            positions = [text.find(json.dumps(keyword, ensure_ascii=ascii_only)) for ascii_only in (False, True)]
+            position = min((p for p in positions if p >= 0), default=-1)
+            if position < 0:
+                continue
+            score = sum(1 for needle in needles if needle != keyword and needle in text)
+            if keyword not in found or score > found[keyword][1]:
+                found[keyword] = (position, score, expected)
+        ordered = sorted(found.items(), key=lambda item: item[1][0])
+        return [{"keyword": keyword, **expected} for keyword, (_, _, expected) in ordered]
+
+    def expected_for_steps(self, module_ids: List[str], text: str) -> List[dict]:
+        """`results[]` answering several modules per keyword: each module's expected under its id."""
+        merged: Dict[str, dict] = {}
+        for module_id in module_ids:
+            for result in self.expected_for_pack(module_id, text):
+                keyword = result.pop("keyword")
+                merged.setdefault(keyword, {"keyword": keyword})[module_id] = result
+        return list(merged.values())
+
+
+# ============================================================================
+# Provider Simulation
+# ============================================================================
+
+class MockProvider:
+    """Request handling shared by the realtime and batch endpoints."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.canned = CannedOutputs(config.datasets_dir, config.prompts_dir)
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._window: "deque[Tuple[float, int]]" = deque()  # (time, tokens) in the last minute
+        self._seen_prefixes: set = set()
+        self.files: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {
+                "requests": 0, "completed": 0, "errors_5xx": 0, "rate_limited": 0,
+                "matched": 0, "unmatched": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            }
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}-mock-{self._rng.getrandbits(48):012x}"
+
+    # ------------------------------------------------------------------
+    # Latency / Limits
+    # ------------------------------------------------------------------
+
+    def sample_latency(self, completion_tokens: int = 0) -> float:
+        kind, _, params = self.config.latency.partition(":")
+        values = [float(v) for v in params.split(",") if v.strip()]
+        with self._lock:
+            if kind == "uniform":
+                delay = self._rng.uniform(values[0], values[1])
+            elif kind == "normal":
+                delay = self._rng.gauss(values[0], values[1])
+            elif kind == "lognormal":
+                delay = values[0] * self._rng.lognormvariate(0, values[1])
+            else:
+                delay = values[0] if values else 0.0
+        return max(0.0, delay) + completion_tokens * self.config.token_latency
+
+    def check_limits(self, tokens: int) -> Tuple[Optional[float], Dict[str, str]]:
+        """Return (retry_after_seconds or None, x-ratelimit headers)."""
+        if self.config.rpm is None and self.config.tpm is None:
+            return None, {}
+        now = time.time()
+        with self._lock:
+            while self._window and now - self._window[0][0] >= 60:
+                self._window.popleft()
+            used_requests = len(self._window)
+            used_tokens = sum(t for _, t in self._window)
+            over_requests = self.config.rpm is not None and used_requests + 1 > self.config.rpm
+            over_tokens = self.config.tpm is not None and used_tokens + tokens > self.config.tpm
+            retry_after = None
+            if over_requests or over_tokens:
+                retry_after = max(0.05, 60 - (now - self._window[0][0])) if self._window else 1.0
+            else:
+                self._window.append((now, tokens))
+                used_requests += 1
+                used_tokens += tokens
+
+        headers = {}
+        if self.config.rpm is not None:
+            headers["x-ratelimit-limit-requests"] = str(self.config.rpm)
+            headers["x-ratelimit-remaining-requests"] = str(max(0, self.config.rpm - used_requests))
+        if self.config.tpm is not None:
+            headers["x-ratelimit-limit-tokens"] = str(self.config.tpm)
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, self.config.tpm - used_tokens))
+        return retry_after, headers
+
+    # ------------------------------------------------------------------
+    # Chat Completions
+    # ------------------------------------------------------------------
+
+    def render_content(self, body: dict) -> str:
+        """Canned assistant content for a chat-completion request body."""
+        text = "\n".join(_message_text(m) for m in body.get("messages", []))
+        response_format = body.get("response_format") or {}
+        kind = response_format.get("type")
+
+        if kind == "json_schema":
+            json_schema = response_format.get("json_schema", {})
+            step_modules = _packed_step_modules(json_schema.get("schema", {}))
+            module_id = module_from_schema_name(json_schema.get("name", "")) or self.canned.detect_module(text)
+            if step_modules:
+                results = self.canned.expected_for_steps(step_modules, text)
+                expected = {"results": results} if results else None
+            elif module_id and _is_packed_schema(json_schema.get("schema", {})):
+                results = self.canned.expected_for_pack(module_id, text)
+                expected = {"results": results} if results else None
+            else:
+                expected = self.canned.expected_for(module_id, text) if module_id else None
+            self._count("matched" if expected is not None else "unmatched")
+            return json.dumps(synthesize(json_schema.get("schema", {}), expected), ensure_ascii=False)
+
+        # No schema: module prompts still get their record's expected output
+        module_id = self.canned.detect_module(text)
+        expected = self.canned.expected_for(module_id, text) if module_id else None
+        if expected is not None:
+            self._count("matched")
+            return json.dumps(expected, ensure_ascii=False)
+        if kind == "json_object":
+            return json.dumps(self.config.json_object_response, ensure_ascii=False)
+        self._count("unmatched")
+        return "Mock response."
+
+    def usage(self, body: dict, content: str) -> dict:
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(_message_text(m)) for m in messages) // CHARS_PER_TOKEN + 4 * len(messages)
+        completion_tokens = max(1, len(content) // CHARS_PER_TOKEN)
+
+        # Prompt caching: the first message is a stable prefix once seen
+        cached_tokens = 0
+        if messages and prompt_tokens >= PROMPT_CACHE_MIN_TOKENS:
+            prefix = _message_text(messages[0])
+            prefix_key = hashlib.sha1(f"{body.get('model')}\0{prefix}".encode("utf-8")).hexdigest()
+            with self._lock:
+                seen = prefix_key in self._seen_prefixes
+                self._seen_prefixes.add(prefix_key)
+            if seen:
+                prefix_tokens = len(prefix) // CHARS_PER_TOKEN
+                cached_tokens = prefix_tokens // PROMPT_CACHE_BLOCK * PROMPT_CACHE_BLOCK
+
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            "completion_tokens_details": {"reasoning_tokens": 0},
+        }
+
+    def completion(self, body: dict) -> dict:
+        """Build a chat.completion object (no latency, no errors)."""
+        content = self.render_content(body)
+        usage = self.usage(body, content)
+        self._count("completed")
+        self._count("prompt_tokens", usage["prompt_tokens"])
+        self._count("completion_tokens", usage["completion_tokens"])
+        return {
+            "id": self._new_id("chatcmpl"),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "logprobs": None,
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+            "system_fingerprint": "fp_mock",
+        }
+
+    def injected_error(self) -> Optional[Tuple[int, dict, Dict[str, str]]]:
+        """Randomly inject a 429 or 5xx: (status, error body, headers)."""
+        roll = self._random()
+        if roll < self.config.rate_limit_rate:
+            self._count("rate_limited")
+            headers = {"retry-after-ms": str(self.config.retry_after_ms)}
+            return 429, _error_body("Rate limit reached (mock)", "requests", "rate_limit_exceeded"), headers
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self._count("errors_5xx")
+            status = (500, 502, 503)[int(self._random() * 3)]
+            return status, _error_body("The server had an error (mock)", "server_error"), {}
+        return None
+
+    def chat_completion(self, body: dict) -> Tuple[int, dict, Dict[str, str]]:
+        """Handle one realtime call: limits, injected errors, latency, response."""
+        self._count("requests")
+        estimate = sum(len(_message_text(m)) for m in body.get("messages", [])) // CHARS_PER_TOKEN
+        retry_after, headers = self.check_limits(estimate + (body.get("max_tokens") or 0))
+        if retry_after is not None:
+            self._count("rate_limited")
+            headers["retry-after-ms"] = str(int(retry_after * 1000))
+            return 429, _error_body("Rate limit reached (mock RPM/TPM)", "requests", "rate_limit_exceeded"), headers
+
+        injected = self.injected_error()
+        if injected:
+            time.sleep(self.sample_latency() / 4)
+            status, error, extra = injected
+            return status, error, {**headers, **extra}
+
+        response = self.completion(body)
+        time.sleep(self.sample_latency(response["usage"]["completion_tokens"]))
+        return 200, response, headers
+
+    # ------------------------------------------------------------------
+    # Files / Batches
+    # ------------------------------------------------------------------
+
+    def create_file(self, filename: str, purpose: str, data: bytes) -> dict:
+        file_id = self._new_id("file")
+        self.files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+            "_data": data,
+        }
+        return _public(self.files[file_id])
+
+    def create_batch(self, body: dict) -> Tuple[int, dict]:
+        input_file = self.files.get(body.get("input_file_id", ""))
+        if input_file is None:
+            return 404, _error_body("No such file (mock)", "invalid_request_error")
+        batch_id = self._new_id("batch")
+        now = int(time.time())
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": input_file["id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": now,
+            "in_progress_at": None,
+            "expires_at": now + 86400,
+            "finalizing_at": None,
+            "completed_at": None,
+            "failed_at": None,
+            "expired_at": None,
+            "cancelling_at": None,
+            "cancelled_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+        }
+        self.batches[batch_id] = batch
+        threading.Thread(target=self._process_batch, args=(batch_id,), daemon=True).start()
+        return 200, dict(batch)
+
+    def _process_batch(self, batch_id: str) -> None:
+        batch = self.batches[batch_id]
+        lines = self.files[batch["input_file_id"]]["_data"].decode("utf-8").splitlines()
+        requests = [json.loads(line) for line in lines if line.strip()]
+        batch.update(status="in_progress", in_progress_at=int(time.time()))
+        batch["request_counts"]["total"] = len(requests)
+
+        outputs, errors = [], []
+        for request in requests:
+            if batch["status"] == "cancelling":
+                break
+            request_id = self._new_id("req")
+            injected = self.injected_error()
+            if injected:
+                status, error, _ = injected
+                errors.append({"id": self._new_id("batch_req"), "custom_id": request.get("custom_id"),
+                               "response": {"status_code": status, "request_id": request_id, "body": error},
+                               "error": None})
+                batch["request_counts"]["failed"] += 1
+            else:
+                outputs.append({"id": self._new_id("batch_req"), "custom_id": request.get("custom_id"),
+                                "response": {"status_code": 200, "request_id": request_id,
+                                             "body": self.completion(request.get("body", {}))},
+                                "error": None})
+                batch["request_counts"]["completed"] += 1
+
+        time.sleep(self.config.batch_delay)
+        batch.update(status="finalizing", finalizing_at=int(time.time()))
+        if outputs:
+            batch["output_file_id"] = self.create_file(
+                f"{batch_id}_output.jsonl", "batch_output", _jsonl(outputs))["id"]
+        if errors:
+            batch["error_file_id"] = self.create_file(
+                f"{batch_id}_error.jsonl", "batch_output", _jsonl(errors))["id"]
+        if batch["status"] == "cancelling":
+            batch.update(status="cancelled", cancelled_at=int(time.time()))
+        else:
+            batch.update(status="completed", completed_at=int(time.time()))
+
+
+def _is_packed_schema(schema: dict) -> bool:
+    """Multi-keyword output: {"results": [{"keyword": ..., ...}]}"""
+    results = schema.get("properties", {}).get("results", {})
+    return "keyword" in results.get("items", {}).get("properties", {})
+
+
+def _packed_step_modules(schema: dict) -> List[str]:
+    """Module ids nested per keyword in a multi-keyword output ({"keyword", "m13": {...}, ...})."""
+    if not _is_packed_schema(schema):
+        return []
+    properties = schema["properties"]["results"]["items"]["properties"]
+    return [name for name in properties if MODULE_ID_PATTERN.fullmatch(name)]
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def _error_body(message: str, error_type: str, code: Optional[str] = None) -> dict:
+    return {"error": {"message": message, "type": error_type, "param": None, "code": code}}
+
+
+def _public(obj: dict) -> dict:
+    return {k: v for k, v in obj.items() if not k.startswith("_")}
+
+
+def _jsonl(rows: List[dict]) -> bytes:
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+# ============================================================================
+# HTTP Server
+# ============================================================================
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI-style endpoints to the MockProvider."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    provider: MockProvider = None  # Set by make_server
+
+    def log_message(self, format, *args):  # noqa: A002 - quiet by default
+        pass
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None,
+              content_type: str = "application/json") -> None:
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("x-request-id", self.provider._new_id("req"))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _not_found(self) -> None:
+        self._send(404, _error_body(f"Unknown route {self.command} {self.path} (mock)", "invalid_request_error"))
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        provider = self.provider
+
+        if path == "/mock/stats":
+            return self._send(200, provider.stats)
+        if path == "/v1/batches":
+            data = [dict(b) for b in provider.batches.values()]
+            return self._send(200, {"object": "list", "data": data, "has_more": False,
+                                    "first_id": data[0]["id"] if data else None,
+                                    "last_id": data[-1]["id"] if data else None})
+
+        match = re.fullmatch(r"/v1/batches/([\w-]+)", path)
+        if match:
+            batch = provider.batches.get(match.group(1))
+            return self._send(200, dict(batch)) if batch else self._not_found()
+
+        match = re.fullmatch(r"/v1/files/([\w-]+)(/content)?", path)
+        if match:
+            file = provider.files.get(match.group(1))
+            if not file:
+                return self._not_found()
+            if match.group(2):
+                return self._send(200, file["_data"], content_type="application/octet-stream")
+            return self._send(200, _public(file))
+
+        self._not_found()
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        provider = self.provider
+        raw = self._body()
+
+        if path == "/v1/chat/completions":
+            try:
+                body = json.loads(raw or b"{}")
+            except json.JSONDecodeError:
+                return self._send(400, _error_body("Invalid JSON body (mock)", "invalid_request_error"))
+            status, payload, headers = provider.chat_completion(body)
+            return self._send(status, payload, headers)
+
+        if path == "/v1/files":
+            fields = _parse_multipart(self.headers.get("Content-Type", ""), raw)
+            filename, data = fields.get("file", ("upload.jsonl", b""))
+            purpose = fields.get("purpose", ("", b"batch"))[1].decode("utf-8")
+            return self._send(200, provider.create_file(filename, purpose, data))
+
+        if path == "/v1/batches":
+            status, payload = provider.create_batch(json.loads(raw or b"{}"))
+            return self._send(status, payload)
+
+        match = re.fullmatch(r"/v1/batches/([\w-]+)/cancel", path)
+        if match:
+            batch = provider.batches.get(match.group(1))
+            if not batch:
+                return self._not_found()
+            if batch["status"] in ("validating", "in_progress"):
+                batch.update(status="cancelling", cancelling_at=int(time.time()))
+            return self._send(200, dict(batch))
+
+        if path == "/mock/reset":
+            provider.reset_stats()
+            return self._send(200, provider.stats)
+
+        self._not_found()
+
+
+def _parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[str, bytes]]:
+    """Parse multipart/form-data into {field: (filename, bytes)}."""
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        fields[name] = (part.get_filename() or "", part.get_payload(decode=True) or b"")
+    return fields
+
+
+def make_server(config: MockConfig, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Create (but do not start) a mock server; port 0 picks a free port."""
+    handler = type("BoundMockRequestHandler", (MockRequestHandler,), {"provider": MockProvider(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_mock_server(config: Optional[MockConfig] = None, host: str = "127.0.0.1",
+                      port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start a mock server on a background thread; returns (server, base_url)."""
+    server = make_server(config or MockConfig(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server for offline benchmarking")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="fixed:S | uniform:A,B | normal:MU,SD | lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Extra seconds per completion token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls returning 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls returning 429")
+    parser.add_argument("--retry-after-ms", type=int, default=200, help="Retry-After for injected 429s")
+    parser.add_argument("--rpm", type=int, help="Enforced requests per minute")
+    parser.add_argument("--tpm", type=int, help="Enforced tokens per minute")
+    parser.add_argument("--batch-delay", type=float, default=1.0, help="Seconds a batch stays in progress")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--datasets-dir", type=Path, default=DATASETS_DIR, help="Source of canned outputs")
+    parser.add_argument("--prompts-dir", type=Path, default=PROMPTS_DIR, help="Module prompts (module detection)")
+    parser.add_argument("--json-object-response", help="JSON returned for json_object requests (judges)")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_ms=args.retry_after_ms,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        batch_delay=args.batch_delay,
+        seed=args.seed,
+        datasets_dir=args.datasets_dir,
+        prompts_dir=args.prompts_dir,
+    )
+    if args.json_object_response:
+        config.json_object_response = json.loads(args.json_object_response)
+
+    server = make_server(config, args.host, args.port)
+    base_url = f"http://{args.host}:{server.server_address[1]}/v1"
+    print(f"Mock OpenAI server on {base_url}")
+    print(f"  export OPENAI_BASE_URL={base_url} OPENAI_API_KEY=mock LLM_CACHE=0 LLM_TRACES=0")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Per-model RPM/TPM token-bucket rate limiter.
+
+Each model gets two buckets (requests per minute, tokens per minute) that
+refill continuously. Before a call the engine reserves one request and an
+estimated token count; after the call the reservation is reconciled against
+the returned `usage` (a failed attempt is refunded in full, so retries during
+a 429 storm do not drain the bucket), and bucket capacity/level are
+corrected from the provider's `x-ratelimit-*` response headers. Runs
+therefore pace themselves to the actual account limit instead of a
+hard-coded sleep.
+
+All methods run on the engine event loop (no thread locking needed).
+
+Usage:
+    limiter = RateLimiter()
+    estimate = limiter.estimate_tokens(request_kwargs)
+    await limiter.acquire(model, estimate)
+    ...
+    limiter.reconcile(model, estimate, usage.total_tokens)
+    limiter.update_from_headers(model, response_headers)
+"""
+
+import asyncio
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+from config import MODEL_RATE_LIMITS, DEFAULT_RATE_LIMITS
+
+# Rough prompt-size heuristic (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+# Completion reservation when a request sets no max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 512
+
+
+def estimate_prompt_tokens(messages: list) -> int:
+    """Estimate prompt tokens for chat messages."""
+    chars = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+        chars += len(content)
+    return chars // CHARS_PER_TOKEN + TOKENS_PER_MESSAGE * len(messages)
+
+
+class TokenBucket:
+    """Continuously refilling bucket; capacity is the per-minute limit."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Refund (positive) or charge (negative) tokens after the fact."""
+        self._refill()
+        self.level = min(self.capacity, self.level + delta)
+
+    def set_capacity(self, per_minute: float) -> None:
+        self._refill()
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+    def set_remaining(self, remaining: float) -> None:
+        """Clamp level to the server-reported remaining budget."""
+        self._refill()
+        self.level = min(self.level, float(remaining))
+
+
+class ModelLimiter:
+    """RPM + TPM buckets for one model."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.lock = asyncio.Lock()
+        self.waited = 0.0
+
+
+class RateLimiter:
+    """Per-model request/token rate limiter."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        default: Tuple[int, int] = DEFAULT_RATE_LIMITS,
+    ):
+        self.limits = dict(MODEL_RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self._models: Dict[str, ModelLimiter] = {}
+
+    def _get(self, model: str) -> ModelLimiter:
+        if model not in self._models:
+            rpm, tpm = self.limits.get(model, self.default)
+            self._models[model] = ModelLimiter(rpm, tpm)
+        return self._models[model]
+
+    # ------------------------------------------------------------------
+    # Estimation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def estimate_tokens(request_kwargs: dict) -> int:
+        """Estimate prompt + completion tokens for a chat-completion request."""
+        prompt_tokens = estimate_prompt_tokens(request_kwargs.get("messages", []))
+        completion_tokens = request_kwargs.get("max_tokens") or DEFAULT_COMPLETION_ESTIMATE
+        return prompt_tokens + completion_tokens
+
+    # ------------------------------------------------------------------
+    # Acquire / Reconcile
+    # ------------------------------------------------------------------
+
+    async def acquire(self, model: str, tokens: int) -> float:
+        """Wait until one request and `tokens` tokens are available; returns seconds waited."""
+        limiter = self._get(model)
+        waited = 0.0
+        # Lock keeps waiters FIFO so large requests are not starved
+        async with limiter.lock:
+            while True:
+                delay = max(limiter.requests.wait_time(1), limiter.tokens.wait_time(tokens))
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+                waited += delay
+            limiter.requests.consume(1)
+            limiter.tokens.consume(tokens)
+        limiter.waited += waited
+        return waited
+
+    def reconcile(self, model: str, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the real usage is known."""
+        self._get(model).tokens.adjust(estimated - actual)
+
+    def update_from_headers(self, model: str, headers: Mapping[str, str]) -> None:
+        """Adapt capacity/level to the provider's x-ratelimit-* headers."""
+        limiter = self._get(model)
+        for kind, bucket in (("requests", limiter.requests), ("tokens", limiter.tokens)):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            try:
+                if limit is not None:
+                    bucket.set_capacity(float(limit))
+                if remaining is not None:
+                    bucket.set_remaining(float(remaining))
+            except ValueError:
+                continue
+
+    def stats(self) -> dict:
+        """Current limits and total wait time per model."""
+        return {
+            model: {
+                "rpm": limiter.requests.capacity,
+                "tpm": limiter.tokens.capacity,
+                "waited_seconds": limiter.waited,
+            }
+            for model, limiter in self._models.items()
+        }
@@ -0,0 +1,103 @@
+"""
+Retry policy for LLM calls.
+
+Errors are classified before retrying:
+- Retryable: 429 rate limits, 408/409, 5xx, connection errors and timeouts
+- Fatal: 400/401/403/404/422, exhausted quota, anything unrecognised
+
+Retryable errors back off exponentially (capped, full jitter). A server
+`Retry-After` / `retry-after-ms` header (or the x-ratelimit-reset-* hint on
+429s) overrides the computed delay. Every call has an overall deadline; a
+retry that would end past it is not attempted.
+
+Usage:
+    policy = RetryPolicy(max_retries=6, deadline=300)
+    retryable, retry_after = classify_error(error)
+    delay = policy.next_delay(attempt, retry_after)
+"""
+
+import random
+import re
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+import openai
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+@dataclass
+class RetryPolicy:
+    """Capped exponential backoff with full jitter and a per-call deadline."""
+    max_retries: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    deadline: Optional[float] = 300.0  # seconds per call, None = no deadline
+
+    def next_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt + 1`."""
+        if retry_after is not None:
+            # Honor the server, plus a little jitter to spread out waiters
+            return min(retry_after, self.max_delay) + random.uniform(0, self.base_delay / 4)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+def parse_reset_duration(value: str) -> Optional[float]:
+    """Parse OpenAI reset durations like '1s', '6m0s', '20ms' into seconds."""
+    parts = _DURATION_PART.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds to wait from Retry-After style headers, if present."""
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    # 429 without Retry-After: fall back to the rate-limit reset hints
+    resets = [
+        parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+        for kind in ("requests", "tokens")
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def classify_error(error: Exception) -> Tuple[bool, Optional[float]]:
+    """Return (retryable, retry_after_seconds) for an exception from the client."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True, None
+
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        if status == 429 and getattr(error, "code", None) == "insufficient_quota":
+            return False, None
+        if status in RETRYABLE_STATUS or status >= 500:
+            return True, parse_retry_after(error.response.headers)
+        return False, None
+
+    return False, None
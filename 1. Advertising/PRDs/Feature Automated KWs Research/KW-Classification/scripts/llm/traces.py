@@ -0,0 +1,269 @@
+"""
+Per-call LLM trace store.
+
+Every call made through the engine (orchestrator modules, pipeline DAG,
+judges, multi-agent evaluators, batch retries) is appended as one JSON line
+to `.cache/traces/calls_YYYYMMDD.jsonl`; callers outside the engine (the prompt
+optimizer's OpenAI client, GEPA's litellm calls) add theirs with
+trace_call() or litellm_tracer(). Entries are never rewritten, so several
+processes can trace into the same directory (LLM_TRACES=0 disables tracing).
+
+Entry fields: ts, module, prompt_hash, model, latency (s), rate_limit_wait,
+prompt/cached/completion/total tokens, retries, cached (response cache
+hit), error_type, keywords, cost (USD, scripts/pricing.py; cache hits
+are free) and unpriced (the model has no price, its cost is 0). `module`, `prompt_hash` and `keywords` come from the request
+metadata; without them the module is "-", the prompt hash is taken from
+the first message and a call counts as one keyword.
+
+report() aggregates entries per module or model: calls, cache hits,
+errors, p50/p95/p99 latency of the calls that reached the API,
+completion tokens/sec, total cost and $/1k keywords
+(`python scripts/orchestrator.py traces report`); rows with unpriced calls
+are marked and their models listed under the table.
+
+Usage:
+    traces = TraceStore()
+    traces.record_result(request, result)
+    rows = report(traces.entries(since=time.time() - 86400), by="model")
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from config import LLM_TRACE_DIR, LLM_TRACES_ENABLED
+from pricing import model_price, token_cost
+
+FILE_PATTERN = "calls_*.jsonl"
+PERCENTILES = (50, 95, 99)
+SINCE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def prompt_hash(messages: List[dict]) -> Optional[str]:
+    """Short hash of the first message (the system prompt / static instructions)."""
+    if not messages:
+        return None
+    content = messages[0].get("content") or ""
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+
+
+class TraceStore:
+    """Append-only JSONL trace files, one per day."""
+
+    def __init__(self, directory: Path = LLM_TRACE_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_day = None
+
+    def _path(self, day: str) -> Path:
+        return self.directory / f"calls_{day}.jsonl"
+
+    def record(self, entry: dict) -> None:
+        """Append one entry (ts is added if missing)."""
+        entry = {"ts": time.time(), **entry}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        day = datetime.fromtimestamp(entry["ts"]).strftime("%Y%m%d")
+        with self._lock:
+            if self._file_day != day:
+                if self._file:
+                    self._file.close()
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._file = open(self._path(day), "a", encoding="utf-8")
+                self._file_day = day
+            self._file.write(line)
+            self._file.flush()
+
+    def record_result(self, request, result) -> None:
+        """Trace an engine call (LLMRequest, LLMResult)."""
+        metadata = request.metadata or {}
+        model = result.model or request.model
+        self.record({
+            "module": metadata.get("module", "-"),
+            "prompt_hash": metadata.get("prompt_hash") or prompt_hash(request.messages),
+            "model": model,
+            "latency": round(result.duration, 4),
+            "rate_limit_wait": round(result.rate_limit_wait, 4),
+            "prompt_tokens": result.prompt_tokens,
+            "cached_tokens": result.cached_tokens,
+            "completion_tokens": result.completion_tokens,
+            "total_tokens": result.total_tokens,
+            "retries": result.retries,
+            "cached": result.cached,
+            "error_type": result.error_type,
+            "keywords": metadata.get("keywords", 1),
+            "cost": 0.0 if result.cached else token_cost(
+                model, result.prompt_tokens, result.completion_tokens, result.cached_tokens
+            ),
+            "unpriced": model_price(model) is None,
+        })
+
+    def entries(self, since: Optional[float] = None) -> Iterator[dict]:
+        """Stored entries, oldest file first; `since` filters by ts (epoch seconds)."""
+        first_day = datetime.fromtimestamp(since).strftime("%Y%m%d") if since else ""
+        for path in sorted(self.directory.glob(FILE_PATTERN)):
+            if path.stem[len("calls_"):] < first_day:
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # A line cut short by a killed process
+                    if since is None or entry.get("ts", 0) >= since:
+                        yield entry
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = None
+            self._file_day = None
+
+
+_default_store: Optional[TraceStore] = None
+_default_lock = threading.Lock()
+
+
+def get_trace_store() -> TraceStore:
+    """Process-wide trace store (the engine's, when it traces)."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = TraceStore()
+        return _default_store
+
+
+def trace_call(
+    module: str,
+    kwargs: dict,
+    response: Any,
+    latency: float,
+    error: Optional[BaseException] = None,
+    store: Optional[TraceStore] = None,
+) -> None:
+    """Trace a chat completion made outside the engine (`kwargs` as sent, `response` with `.usage`)."""
+    if store is None and not LLM_TRACES_ENABLED:
+        return
+    usage = getattr(response, "usage", None)
+    model = str(kwargs.get("model", "")).split("/")[-1]
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    (store or get_trace_store()).record({
+        "module": module,
+        "prompt_hash": prompt_hash(kwargs.get("messages") or []),
+        "model": model,
+        "latency": round(latency, 4),
+        "rate_limit_wait": 0.0,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "retries": 0,
+        "cached": False,
+        "error_type": type(error).__name__ if error is not None else None,
+        "keywords": 1,
+        "cost": token_cost(model, prompt_tokens, completion_tokens, cached_tokens),
+        "unpriced": model_price(model) is None,
+    })
+
+
+def litellm_tracer(module: str, store: Optional[TraceStore] = None) -> Callable:
+    """
+    litellm success/failure callback that traces each call under `module`:
+        litellm.success_callback.append(tracer); litellm.failure_callback.append(tracer)
+    """
+    def trace(kwargs, response, start_time, end_time) -> None:
+        error = None
+        if getattr(response, "usage", None) is None:  # Failure callback
+            error = kwargs.get("exception") or RuntimeError("response without usage")
+        trace_call(module, kwargs, response, (end_time - start_time).total_seconds(), error, store)
+    return trace
+
+
+# ============================================================================
+# Report
+# ============================================================================
+
+def parse_since(text: str, now: Optional[float] = None) -> Optional[float]:
+    """'24h', '7d', '90m' -> epoch seconds that long ago; 'all' -> None."""
+    if text == "all":
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([mhd])", text.strip())
+    if not match:
+        raise ValueError(f"invalid --since {text!r} (e.g. 90m, 24h, 7d or all)")
+    return (now or time.time()) - float(match.group(1)) * SINCE_UNITS[match.group(2)]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))]
+
+
+def report(entries: Iterable[dict], by: str = "module") -> List[dict]:
+    """One row per `by` value (module or model), most expensive first."""
+    groups: Dict[str, dict] = {}
+    for entry in entries:
+        group = groups.setdefault(str(entry.get(by) or "-"), {
+            "calls": 0, "cache_hits": 0, "errors": 0, "latencies": [], "api_seconds": 0.0,
+            "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost": 0.0, "keywords": 0,
+            "unpriced": set(),
+        })
+        group["calls"] += 1
+        if entry.get("unpriced"):
+            group["unpriced"].add(str(entry.get("model") or "unknown"))
+        group["keywords"] += entry.get("keywords", 1) or 0
+        group["cost"] += entry.get("cost", 0.0)
+        if entry.get("error_type"):
+            group["errors"] += 1
+        if entry.get("cached"):
+            group["cache_hits"] += 1
+            continue
+        group["latencies"].append(entry.get("latency", 0.0))
+        if not entry.get("error_type"):
+            group["api_seconds"] += entry.get("latency", 0.0)
+            for field in ("prompt_tokens", "cached_tokens", "completion_tokens"):
+                group[field] += entry.get(field, 0)
+
+    rows = []
+    for name, group in groups.items():
+        latencies = sorted(group.pop("latencies"))
+        api_seconds = group.pop("api_seconds")
+        row = {by: name, **group, "unpriced": sorted(group["unpriced"])}
+        for q in PERCENTILES:
+            row[f"p{q}"] = percentile(latencies, q)
+        row["tokens_per_sec"] = group["completion_tokens"] / api_seconds if api_seconds else 0.0
+        row["cost_per_1k_keywords"] = group["cost"] / group["keywords"] * 1000 if group["keywords"] else 0.0
+        rows.append(row)
+    return sorted(rows, key=lambda row: row["cost"], reverse=True)
+
+
+def format_report(rows: List[dict], by: str = "module") -> List[str]:
+    """Table lines for report() rows; a cost marked * leaves out calls to unpriced models."""
+    header = (f"{by.capitalize():<22} {'Calls':>7} {'Cached':>7} {'Errors':>6} {'p50 s':>7} {'p95 s':>7} "
+              f"{'p99 s':>7} {'Tok/s':>7} {'Cost $':>9} {'$/1k kw':>8}")
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row[by][:22]:<22} {row['calls']:>7} {row['cache_hits']:>7} {row['errors']:>6} "
+            f"{row['p50']:>7.2f} {row['p95']:>7.2f} {row['p99']:>7.2f} {row['tokens_per_sec']:>7.1f} "
+            f"{row['cost']:>9.4f}{'*' if row['unpriced'] else ' '}{row['cost_per_1k_keywords']:>8.4f}"
+        )
+    unpriced = sorted({model for row in rows for model in row["unpriced"]})
+    if unpriced:
+        lines.append(f"* unpriced models (not in config.MODEL_PRICING, counted as $0): {', '.join(unpriced)}")
+    return lines
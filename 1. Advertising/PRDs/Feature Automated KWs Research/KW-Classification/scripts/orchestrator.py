@@ -22,31 +22,55 @@ Usage:
 
     # Save both CSV and upload to Braintrust
     python scripts/orchestrator.py run --module m12 --samples 50 --output both
+
+    # Also keep a JSONL sidecar with full results
+    python scripts/orchestrator.py run --module m13 --full --jsonl
+
+    # Resume an interrupted run (explicit file, or latest matching run)
+    python scripts/orchestrator.py run --module m13 --full --resume experiment_results/M13_.../file.csv
+    python scripts/orchestrator.py run --all --full --resume
+
+    # Decide unambiguous brand keywords locally (M02/M04/M05), LLM for the rest
+    python scripts/orchestrator.py run --module m04 --full --brand-fast-path
+    python scripts/orchestrator.py run --module m02 --full --brand-fast-path fuzzy   # also typo'd brands
+
+    # Path A relevance checks with early exit (M12 -> M13 -> M14/M15 -> M16), scored as M12b
+    python scripts/orchestrator.py run --module m12b --samples 200 --cascade
+
+    # Same, in two packed calls per product context: M12, then M13-M16 fused into one
+    python scripts/orchestrator.py run --module m12b --samples 200 --fused
+
+    # Pack keywords sharing a product context into one call (batch prompts);
+    # packs are sized to the model's context window and the max_tokens cap
+    python scripts/orchestrator.py run --module m13 --full --pack --pack-size 50 --pack-max-tokens 4096
+
+Results are written row by row as calls complete (fsync'd periodically),
+so an interrupted run keeps everything finished up to that point.
 """
 
 import argparse
+import hashlib
 import json
 import os
 import sys
 import csv
 import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple, Union
 from dataclasses import dataclass, field
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 from config import (
     PROJECT_ROOT, MODULES, PROMPTS_DIR, SCHEMAS_DIR, DATASETS_DIR,
     EXPERIMENT_RESULTS_DIR, PROJECT_NAME, get_module, load_api_key,
-    OPENAI_API_KEY, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+    DEFAULT_MODEL, DEFAULT_TEMPERATURE, DEFAULT_MAX_TOKENS
 )
 
 try:
-    from openai import OpenAI
+    import openai  # noqa: F401 - required by the LLM engine
     import braintrust
 except ImportError as e:
     print(f"Error: {e}")
@@ -54,6 +78,18 @@ except ImportError as e:
     sys.exit(1)
 
 from experiment_registry import ExperimentRegistry, ExperimentRecord, compute_prompt_hash
+from prompt_template import JsonCache, compile_template
+from brand_matching import BrandFastPath
+from relevance_cascade import (
+    CASCADE_MODULES, CASCADE_TARGET, FUSED_COMPLETION_PER_KEYWORD, FusedPathA, RelevanceCascade,
+)
+from keyword_packing import (
+    DEFAULT_COMPLETION_PER_KEYWORD, DEFAULT_PACK_SIZE, KeywordPacker, Pack, TokenBudget,
+    completion_per_keyword, unpack_output,
+)
+from pricing import token_cost
+from llm import LLMEngine, LLMRequest, LLMResult, RequestDeduper, ResponseCache, TraceStore, get_engine
+from llm.traces import format_report as format_trace_report, parse_since, report as trace_report
 
 
 # ============================================================================
@@ -71,6 +107,16 @@ class ExperimentConfig:
     version: str = "v1"
     parallel_requests: int = 5
     dry_run: bool = False
+    prompt_layout: str = "inline"  # "inline" or "prefix_cache"
+    jsonl: bool = False  # Also write a JSONL sidecar next to the CSV
+    resume: Optional[str] = None  # Previous CSV/JSONL to resume, or "auto"
+    pack: bool = False  # Pack records sharing a product context into multi-keyword calls
+    pack_size: int = DEFAULT_PACK_SIZE  # Max keywords per packed call
+    pack_max_tokens: int = DEFAULT_MAX_TOKENS  # Completion cap for packed calls
+    brand_fast_path: Optional[str] = None  # "exact"/"fuzzy": decide unambiguous brand keywords without the LLM (M02/M04/M05)
+    cascade: bool = False  # M12b records through M12 -> M16 with early exit (scripts/relevance_cascade.py)
+    fused: bool = False  # M12b records in packs: M12, then M13-M16 in one call (relevance_cascade.py)
+    dedup: bool = True  # Send each identical request body once, copy its result to the duplicates
 
 
 # ============================================================================
@@ -157,13 +203,23 @@ def load_schema(schema_path: Path) -> dict:
     return json.loads(schema_path.read_text(encoding="utf-8"))
 
 
-def load_dataset(dataset_path: Path, samples: Optional[int] = None) -> List[dict]:
-    """Load dataset records from JSONL file."""
-    records = []
+def iter_dataset(dataset_path: Path) -> Iterator[dict]:
+    """Stream dataset records from JSONL file one at a time."""
     with open(dataset_path, encoding="utf-8") as f:
         for line in f:
             if line.strip():
-                records.append(json.loads(line))
+                yield json.loads(line)
+
+
+def count_records(dataset_path: Path) -> int:
+    """Count non-empty JSONL lines without parsing them."""
+    with open(dataset_path, encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def load_dataset(dataset_path: Path, samples: Optional[int] = None) -> List[dict]:
+    """Load dataset records from JSONL file."""
+    records = list(iter_dataset(dataset_path))
 
     if samples and samples < len(records):
         # Stratified sampling would be better, but simple random for now
@@ -178,25 +234,79 @@ def load_dataset(dataset_path: Path, samples: Optional[int] = None) -> List[dict
 # Template Rendering
 # ============================================================================
 
-def render_template(prompt_template: str, record: dict) -> str:
-    """Render prompt template with record data using {{variable}} syntax."""
-    rendered = prompt_template
+PROMPT_LAYOUTS = ("inline", "prefix_cache")
 
+# Pretty JSON for nested input values, shared across records
+PRETTY_JSON = JsonCache(indent=2)
+
+
+def flatten_input(record: dict, names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Flatten record input into template strings (nested values as JSON).
+
+    With `names`, only those keys are flattened (the template's placeholders).
+    """
     input_data = record.get("input", record)
+    keys = input_data if names is None else [name for name in names if name in input_data]
 
-    # Flatten nested input for template rendering
     flat_data = {}
-    for key, value in input_data.items():
+    for key in keys:
+        value = input_data[key]
         if isinstance(value, (dict, list)):
-            flat_data[key] = json.dumps(value, indent=2)
+            flat_data[key] = PRETTY_JSON.dumps(value)
         else:
             flat_data[key] = str(value) if value is not None else ""
+    return flat_data
 
-    # Replace {{variable}} patterns
-    for key, value in flat_data.items():
-        rendered = rendered.replace(f"{{{{{key}}}}}", value)
 
-    return rendered
+def render_template(prompt_template: str, record: dict) -> str:
+    """Render prompt template with record data using {{variable}} syntax."""
+    template = compile_template(prompt_template)
+    return template.render(flatten_input(record, template.placeholders))
+
+
+@lru_cache(maxsize=64)
+def split_template(prompt_template: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Split a template into a static instruction block and its placeholders.
+
+    Each {{variable}} becomes a <variable> reference, so the block is
+    byte-identical for every record of a module. Returns the block and the
+    placeholder names in first-appearance order.
+    """
+    template = compile_template(prompt_template)
+    names = template.placeholders
+    static_block = template.render({name: f"<{name}>" for name in names})
+    return static_block, names
+
+
+def render_messages(prompt_template: str, record: dict, layout: str = "inline") -> List[dict]:
+    """
+    Render chat messages for a record.
+
+    Layouts:
+        inline       - one user message with values substituted in place
+        prefix_cache - static instructions/examples first (system message),
+                       per-record values last (user message), so the
+                       provider's automatic prompt caching sees a stable prefix
+    """
+    if layout == "inline":
+        return [{"role": "user", "content": render_template(prompt_template, record)}]
+
+    if layout != "prefix_cache":
+        raise ValueError(f"Unknown prompt layout: {layout}. Available: {PROMPT_LAYOUTS}")
+
+    static_block, names = split_template(prompt_template)
+    flat_data = flatten_input(record, names)
+
+    sections = ["Input data for the <placeholders> referenced in the instructions:"]
+    for name in names:
+        if name in flat_data:
+            sections.append(f"<{name}>\n{flat_data[name]}\n</{name}>")
+
+    return [
+        {"role": "system", "content": static_block},
+        {"role": "user", "content": "\n\n".join(sections)},
+    ]
 
 
 # ============================================================================
@@ -204,85 +314,77 @@ def render_template(prompt_template: str, record: dict) -> str:
 # ============================================================================
 
 class LLMRunner:
-    """Handles LLM API calls with rate limiting."""
-
-    def __init__(self, model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    """Handles LLM API calls through the shared async engine."""
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        engine: Optional[LLMEngine] = None,
+    ):
+        self.engine = engine or get_engine()
         self.model = model
         self.temperature = temperature
-        self._lock = threading.Lock()
-        self._request_count = 0
-
-    def run(self, prompt: str, schema: Optional[dict] = None) -> dict:
-        """Execute LLM call and return parsed response with metrics."""
-        messages = [{"role": "user", "content": prompt}]
-
-        kwargs = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": self.temperature,
-        }
-
-        # Add structured output if schema provided
-        if schema:
-            kwargs["response_format"] = schema
-
-        start_time = time.time()
+        self.last_dedup: Optional[dict] = None
+
+    def build_request(
+        self,
+        prompt: Union[str, List[dict]],
+        schema: Optional[dict] = None,
+        max_tokens: Optional[int] = None,
+        metadata: Optional[dict] = None,
+    ) -> LLMRequest:
+        """Build engine request for a rendered prompt or message list (`metadata` labels its trace)."""
+        messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+        return LLMRequest(
+            messages=messages,
+            model=self.model,
+            temperature=self.temperature,
+            response_format=schema,  # Structured output if schema provided
+            max_tokens=max_tokens,
+            metadata=metadata or {},
+        )
 
-        try:
-            response = self.client.chat.completions.create(**kwargs)
-            duration = time.time() - start_time
-
-            content = response.choices[0].message.content
-            usage = response.usage
-
-            # Calculate cost estimate (gpt-4o-mini pricing)
-            prompt_cost = (usage.prompt_tokens / 1_000_000) * 0.15
-            completion_cost = (usage.completion_tokens / 1_000_000) * 0.60
-            estimated_cost = prompt_cost + completion_cost
-
-            # Try to parse as JSON
-            try:
-                parsed = json.loads(content)
-            except json.JSONDecodeError:
-                parsed = {"raw_output": content, "parse_error": True}
-
-            # Add metrics to result
-            parsed["_metrics"] = {
-                "duration": duration,
-                "llm_duration": duration,
-                "prompt_tokens": usage.prompt_tokens,
-                "completion_tokens": usage.completion_tokens,
-                "total_tokens": usage.total_tokens,
-                "estimated_cost": estimated_cost,
+    def to_output(self, result: LLMResult) -> dict:
+        """Convert engine result to parsed output with `_metrics`."""
+        if not result.ok:
+            # Only unrecoverable errors (or exhausted retries) reach this point
+            return {
+                "error": result.error,
+                "error_type": result.error_type,
+                "_metrics": {**result.metrics(), "estimated_cost": 0.0},
             }
 
-            return parsed
+        # Cost at the model's price (pricing.py); cache hits and deduplicated copies are free
+        estimated_cost = 0.0 if result.cached or result.deduplicated else token_cost(
+            result.model or self.model, result.prompt_tokens, result.completion_tokens, result.cached_tokens,
+        )
 
-        except Exception as e:
-            return {"error": str(e), "error_type": type(e).__name__}
-
-    def run_batch(self, items: List[tuple], parallel: int = 5) -> List[dict]:
-        """Run multiple LLM calls in parallel."""
-        results = [None] * len(items)
-
-        def process_item(idx, prompt, schema):
-            result = self.run(prompt, schema)
-            with self._lock:
-                self._request_count += 1
-            return idx, result
-
-        with ThreadPoolExecutor(max_workers=parallel) as executor:
-            futures = {
-                executor.submit(process_item, idx, prompt, schema): idx
-                for idx, (prompt, schema) in enumerate(items)
-            }
+        parsed = result.as_output()
+        parsed["_metrics"] = {
+            **result.metrics(),
+            "estimated_cost": estimated_cost,
+        }
+        return parsed
 
-            for future in as_completed(futures):
-                idx, result = future.result()
-                results[idx] = result
+    def run(self, prompt: Union[str, List[dict]], schema: Optional[dict] = None) -> dict:
+        """Execute LLM call and return parsed response with metrics."""
+        return self.to_output(self.engine.complete(self.build_request(prompt, schema)))
 
-        return results
+    def run_batch(self, items: List[tuple], parallel: int = 5, dedup: bool = True) -> List[dict]:
+        """
+        Run multiple LLM calls concurrently (at most `parallel` in flight).
+
+        Identical prompts are sent once (unless dedup=False); the counts are
+        left in `last_dedup` (RequestDeduper.summary()).
+        """
+        requests = [self.build_request(prompt, schema) for prompt, schema in items]
+        deduper = RequestDeduper() if dedup else None
+        outputs: List[Optional[dict]] = [None] * len(requests)
+        for idx, result in self.engine.iter_results(requests, concurrency=parallel, dedup=deduper):
+            outputs[idx] = self.to_output(result)
+        self.last_dedup = deduper.summary() if deduper else None
+        return outputs
 
 
 # ============================================================================
@@ -336,31 +438,119 @@ def compare_outputs(expected: Any, actual: Any, module_type: str) -> dict:
     return result
 
 
-def calculate_metrics(results: List[dict]) -> dict:
-    """Calculate aggregate metrics from results."""
-    total = len(results)
-    correct = sum(1 for r in results if r.get("comparison", {}).get("match", False))
-    errors = sum(1 for r in results if "error" in r.get("output", {}))
-
-    metrics = {
-        "total": total,
-        "correct": correct,
-        "errors": errors,
-        "accuracy": correct / total if total > 0 else 0,
-        "error_rate": errors / total if total > 0 else 0,
+def compare_result(expected: dict, output: dict, module: dict) -> dict:
+    """Compare a record's expected value with the module output."""
+    # Get the primary output field based on module type
+    if module["type"] in ("binary_classifier", "classifier"):
+        exp_val = expected.get("relevancy", expected.get("classification", expected.get("result")))
+        act_val = output.get("relevancy", output.get("classification", output.get("result")))
+    else:
+        exp_val = expected
+        act_val = output
+
+    return compare_outputs(exp_val, act_val, module["type"])
+
+
+def build_result(
+    record: dict,
+    output: dict,
+    module: dict,
+    record_id: Optional[str] = None,
+    decided_by: str = "llm",
+) -> dict:
+    """Combine a dataset record and its LLM (or fast path) output into a result row."""
+    expected = record.get("expected", {})
+
+    # Extract metrics from output (added by LLMRunner)
+    metrics_data = output.pop("_metrics", {}) if isinstance(output, dict) else {}
+
+    comparison = compare_result(expected, output, module)
+
+    return {
+        "id": record_id or record_key(record),
+        "input": record.get("input", {}),
+        "expected": expected,
+        "output": output,
+        "comparison": comparison,
+        "metadata": record.get("metadata", {}),
+        "decided_by": decided_by,  # "llm" or "fast_path"
+        # Metrics from LLM call
+        "cached": metrics_data.get("cached"),
+        "deduplicated": metrics_data.get("deduplicated", False),
+        "duration": metrics_data.get("duration", 0),
+        "llm_duration": metrics_data.get("llm_duration", 0),
+        "retries": metrics_data.get("retries", 0),
+        "prompt_tokens": metrics_data.get("prompt_tokens", 0),
+        "cached_tokens": metrics_data.get("cached_tokens", 0),
+        "completion_tokens": metrics_data.get("completion_tokens", 0),
+        "total_tokens": metrics_data.get("total_tokens", 0),
+        "estimated_cost": metrics_data.get("estimated_cost", 0),
     }
 
-    # Add precision/recall/f1 if available
-    precisions = [r["comparison"]["precision"] for r in results if "precision" in r.get("comparison", {})]
-    recalls = [r["comparison"]["recall"] for r in results if "recall" in r.get("comparison", {})]
-    f1s = [r["comparison"]["f1"] for r in results if "f1" in r.get("comparison", {})]
 
-    if precisions:
-        metrics["avg_precision"] = sum(precisions) / len(precisions)
-        metrics["avg_recall"] = sum(recalls) / len(recalls)
-        metrics["avg_f1"] = sum(f1s) / len(f1s)
+class MetricsAccumulator:
+    """Running aggregate metrics, updated one result at a time."""
+
+    def __init__(self):
+        self.total = 0
+        self.correct = 0
+        self.errors = 0
+        self.retries = 0
+        self.fast_path = 0  # Results decided without an LLM call
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.scored = 0  # Results with precision/recall/f1
+        self.precision_sum = 0.0
+        self.recall_sum = 0.0
+        self.f1_sum = 0.0
+
+    def add(self, result: dict) -> None:
+        comparison = result.get("comparison", {})
+        self.total += 1
+        self.correct += 1 if comparison.get("match", False) else 0
+        self.errors += 1 if "error" in result.get("output", {}) else 0
+        self.retries += result.get("retries", 0)
+        self.fast_path += 1 if result.get("decided_by") == "fast_path" else 0
+        self.prompt_tokens += result.get("prompt_tokens", 0)
+        self.cached_tokens += result.get("cached_tokens", 0)
+        if "precision" in comparison:
+            self.scored += 1
+            self.precision_sum += comparison["precision"]
+            self.recall_sum += comparison["recall"]
+            self.f1_sum += comparison["f1"]
+
+    def summary(self) -> dict:
+        total = self.total
+        metrics = {
+            "total": total,
+            "correct": self.correct,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "prompt_cache_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens > 0 else 0,
+            "accuracy": self.correct / total if total > 0 else 0,
+            "error_rate": self.errors / total if total > 0 else 0,
+        }
+
+        if self.fast_path:
+            metrics["fast_path"] = self.fast_path
+
+        # Add precision/recall/f1 if available
+        if self.scored:
+            metrics["avg_precision"] = self.precision_sum / self.scored
+            metrics["avg_recall"] = self.recall_sum / self.scored
+            metrics["avg_f1"] = self.f1_sum / self.scored
+
+        return metrics
 
-    return metrics
+
+def calculate_metrics(results: Iterable[dict]) -> dict:
+    """Calculate aggregate metrics from results."""
+    accumulator = MetricsAccumulator()
+    for result in results:
+        accumulator.add(result)
+    return accumulator.summary()
 
 
 # ============================================================================
@@ -381,9 +571,9 @@ def get_output_filename(module_id: str, version: str = "v1") -> str:
     module = get_module(module_id)
     date_str = datetime.now().strftime("%d%m%y")
 
-    # Find next run number
+    # Find next run number (a run may only have its JSONL sidecar)
     folder = get_output_folder(module_id)
-    existing = list(folder.glob(f"*_{date_str}_*.csv"))
+    existing = {p.stem for pattern in ("*.csv", "*.jsonl") for p in folder.glob(f"*_{date_str}_{pattern}")}
     run_num = len(existing) + 1
 
     return f"{module_id.upper()}_{module['name']}_{version}_{date_str}_{run_num}.csv"
@@ -432,6 +622,162 @@ def extract_module_specific_values(module_id: str, result: dict) -> dict:
     return values
 
 
+def csv_fieldnames(module_id: str) -> List[str]:
+    """CSV columns: base + module-specific + trailing columns."""
+    module_columns = get_module_specific_columns(module_id)
+    return ["name", "input", "output", "expected", "ASIN", "Brand", "Keyword"] + \
+           module_columns + ["Reasoning", "metrics", "metadata"]
+
+
+def build_csv_row(result: dict, module_id: str, version: str = "v1") -> dict:
+    """Build one CSV row matching the existing format."""
+    input_data = result.get("input", {})
+    output_data = result.get("output", {})
+    expected_data = result.get("expected", {})
+    record_metadata = result.get("metadata", {})
+
+    # Build metrics dict
+    metrics_dict = {
+        "cached": result.get("cached"),
+        "deduplicated": result.get("deduplicated", False),
+        "duration": result.get("duration", 0),
+        "llm_duration": result.get("llm_duration", 0),
+        "retries": result.get("retries", 0),
+        "time_to_first_token": result.get("time_to_first_token", 0),
+        "prompt_tokens": result.get("prompt_tokens", 0),
+        "cached_tokens": result.get("cached_tokens", 0),
+        "completion_tokens": result.get("completion_tokens", 0),
+        "total_tokens": result.get("total_tokens", 0),
+        "estimated_cost": result.get("estimated_cost", 0),
+    }
+
+    # Build metadata dict matching existing format
+    metadata_dict = {
+        "record_id": result.get("id", ""),
+        "asin": record_metadata.get("asin", ""),
+        "module_id": module_id,
+        "split": record_metadata.get("split", "eval"),
+        "version": version,
+        "keyword": input_data.get("keyword", ""),
+        "brand_name": record_metadata.get("brand_name", ""),
+        "decided_by": result.get("decided_by", "llm"),
+    }
+
+    # Get module-specific values
+    module_values = extract_module_specific_values(module_id, result)
+
+    # Extract reasoning - handle both direct and nested formats
+    reasoning = output_data.get("reasoning", "")
+    if not reasoning and isinstance(output_data, dict):
+        # For M12B-style outputs with step-based reasoning
+        for step_key in ["step1_hard_constraint", "step2_product_type", "step3_primary_use", "step4_complementary"]:
+            step_data = output_data.get(step_key)
+            if isinstance(step_data, dict) and step_data.get("reasoning"):
+                reasoning = step_data.get("reasoning", "")
+                break
+
+    return {
+        "name": "eval",
+        "input": json.dumps(input_data),
+        "output": json.dumps(output_data),
+        "expected": json.dumps(expected_data),
+        "ASIN": record_metadata.get("asin", ""),
+        "Brand": record_metadata.get("brand_name", ""),
+        "Keyword": input_data.get("keyword", ""),
+        "Reasoning": reasoning,
+        "metrics": json.dumps(metrics_dict),
+        "metadata": json.dumps(metadata_dict),
+        **module_values,
+    }
+
+
+class StreamingResultWriter:
+    """
+    Write results to CSV (and optionally a JSONL sidecar) as they complete.
+
+    Every row is flushed to the OS immediately; files are fsync'd every
+    `fsync_every` rows or `fsync_interval` seconds, and on close. A crash
+    mid-run keeps everything written so far.
+
+    Usage:
+        with StreamingResultWriter("m12", "v1", csv_path=path) as writer:
+            for result in results:
+                writer.write(result)
+    """
+
+    def __init__(
+        self,
+        module_id: str,
+        version: str = "v1",
+        csv_path: Optional[Path] = None,
+        jsonl_path: Optional[Path] = None,
+        fsync_every: int = 50,
+        fsync_interval: float = 10.0,
+        append: bool = False,
+    ):
+        self.module_id = module_id
+        self.version = version
+        self.csv_path = csv_path
+        self.jsonl_path = jsonl_path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.rows = 0
+
+        self._files = []
+        self._csv_writer = None
+        self._jsonl_file = None
+        self._last_sync = time.time()
+
+        # Append mode continues existing files (header written only if new)
+        mode = "a" if append else "w"
+
+        if csv_path:
+            write_header = not (append and Path(csv_path).exists() and Path(csv_path).stat().st_size > 0)
+            csv_file = open(csv_path, mode, newline="", encoding="utf-8")
+            self._csv_writer = csv.DictWriter(csv_file, fieldnames=csv_fieldnames(module_id), extrasaction="ignore")
+            if write_header:
+                self._csv_writer.writeheader()
+            self._files.append(csv_file)
+
+        if jsonl_path:
+            self._jsonl_file = open(jsonl_path, mode, encoding="utf-8")
+            self._files.append(self._jsonl_file)
+
+    def write(self, result: dict) -> None:
+        """Append one result and flush it."""
+        if self._csv_writer:
+            self._csv_writer.writerow(build_csv_row(result, self.module_id, self.version))
+        if self._jsonl_file:
+            self._jsonl_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+        for f in self._files:
+            f.flush()
+        if self.rows % self.fsync_every == 0 or time.time() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Force written rows to disk."""
+        for f in self._files:
+            f.flush()
+            os.fsync(f.fileno())
+        self._last_sync = time.time()
+
+    def close(self) -> None:
+        if not self._files:
+            return
+        self.sync()
+        for f in self._files:
+            f.close()
+        self._files = []
+
+    def __enter__(self) -> "StreamingResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
 def save_to_csv(results: List[dict], module_id: str, version: str = "v1", run_metrics: dict = None) -> Path:
     """Save results to CSV file matching existing format."""
     folder = get_output_folder(module_id)
@@ -442,75 +788,14 @@ def save_to_csv(results: List[dict], module_id: str, version: str = "v1", run_me
         print(f"  No results to save for {module_id}")
         return filepath
 
-    # Base columns + module-specific + trailing columns
-    module_columns = get_module_specific_columns(module_id)
-    fieldnames = ["name", "input", "output", "expected", "ASIN", "Brand", "Keyword"] + \
-                 module_columns + ["Reasoning", "metrics", "metadata"]
-
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
-        writer.writeheader()
-
+    with StreamingResultWriter(module_id, version, csv_path=filepath, fsync_every=len(results)) as writer:
         for result in results:
-            input_data = result.get("input", {})
-            output_data = result.get("output", {})
-            expected_data = result.get("expected", {})
-            record_metadata = result.get("metadata", {})
-
-            # Build metrics dict
-            metrics_dict = {
-                "cached": None,
-                "duration": result.get("duration", 0),
-                "llm_duration": result.get("llm_duration", 0),
-                "time_to_first_token": result.get("time_to_first_token", 0),
-                "prompt_tokens": result.get("prompt_tokens", 0),
-                "completion_tokens": result.get("completion_tokens", 0),
-                "total_tokens": result.get("total_tokens", 0),
-                "estimated_cost": result.get("estimated_cost", 0),
-            }
-
-            # Build metadata dict matching existing format
-            metadata_dict = {
-                "asin": record_metadata.get("asin", ""),
-                "module_id": module_id,
-                "split": record_metadata.get("split", "eval"),
-                "version": version,
-                "keyword": input_data.get("keyword", ""),
-                "brand_name": record_metadata.get("brand_name", ""),
-            }
-
-            # Get module-specific values
-            module_values = extract_module_specific_values(module_id, result)
-
-            # Extract reasoning - handle both direct and nested formats
-            reasoning = output_data.get("reasoning", "")
-            if not reasoning and isinstance(output_data, dict):
-                # For M12B-style outputs with step-based reasoning
-                for step_key in ["step1_hard_constraint", "step2_product_type", "step3_primary_use", "step4_complementary"]:
-                    step_data = output_data.get(step_key)
-                    if isinstance(step_data, dict) and step_data.get("reasoning"):
-                        reasoning = step_data.get("reasoning", "")
-                        break
-
-            row = {
-                "name": "eval",
-                "input": json.dumps(input_data),
-                "output": json.dumps(output_data),
-                "expected": json.dumps(expected_data),
-                "ASIN": record_metadata.get("asin", ""),
-                "Brand": record_metadata.get("brand_name", ""),
-                "Keyword": input_data.get("keyword", ""),
-                "Reasoning": reasoning,
-                "metrics": json.dumps(metrics_dict),
-                "metadata": json.dumps(metadata_dict),
-                **module_values,
-            }
-            writer.writerow(row)
+            writer.write(result)
 
     return filepath
 
 
-def upload_to_braintrust(results: List[dict], module_id: str, metrics: dict) -> str:
+def upload_to_braintrust(results: Iterable[dict], module_id: str, metrics: dict) -> str:
     """Upload results to Braintrust as experiment."""
     module = get_module(module_id)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -549,6 +834,179 @@ def upload_to_braintrust(results: List[dict], module_id: str, metrics: dict) ->
         return ""
 
 
+# ============================================================================
+# Resume
+# ============================================================================
+
+def record_key(record: dict) -> str:
+    """Stable record id: the dataset `id`, else a hash of the record input."""
+    if record.get("id"):
+        return str(record["id"])
+    encoded = json.dumps(record.get("input", {}), sort_keys=True, ensure_ascii=False)
+    return "sha1:" + hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def with_record_ids(records: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+    """Pair records with unique ids (repeated ids get a #n suffix)."""
+    seen: Dict[str, int] = {}
+    for record in records:
+        key = record_key(record)
+        seen[key] = seen.get(key, 0) + 1
+        yield (key if seen[key] == 1 else f"{key}#{seen[key]}"), record
+
+
+def is_successful(output: Any) -> bool:
+    """True if an output is a parsed response rather than an error."""
+    return isinstance(output, dict) and "error" not in output and not output.get("parse_error")
+
+
+def iter_csv_results(csv_path: Path) -> Iterator[dict]:
+    """Read result rows back from an orchestrator CSV."""
+    csv.field_size_limit(16 * 1024 * 1024)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            metadata = json.loads(row.get("metadata") or "{}")
+            result = {
+                "input": json.loads(row.get("input") or "{}"),
+                "expected": json.loads(row.get("expected") or "{}"),
+                "output": json.loads(row.get("output") or "{}"),
+                "metadata": {
+                    "asin": metadata.get("asin", ""),
+                    "split": metadata.get("split", "eval"),
+                    "brand_name": metadata.get("brand_name", ""),
+                },
+                **json.loads(row.get("metrics") or "{}"),
+            }
+            # CSVs written before record ids existed fall back to the input hash
+            if metadata.get("record_id"):
+                result["id"] = metadata["record_id"]
+            if metadata.get("decided_by"):
+                result["decided_by"] = metadata["decided_by"]
+            yield result
+
+
+def find_resume_path(module_id: str, config: ExperimentConfig, prompt_path: Path) -> Optional[Path]:
+    """Resolve `config.resume` ("auto" or a CSV/JSONL path) to a previous run's output."""
+    if not config.resume:
+        return None
+
+    if config.resume != "auto":
+        path = Path(config.resume).resolve()
+        if not path.with_suffix(".csv").exists() and not path.with_suffix(".jsonl").exists():
+            raise FileNotFoundError(f"Nothing to resume at {path}")
+        return path
+
+    exp = ExperimentRegistry().find_resumable(
+        module_id,
+        prompt_hash=compute_prompt_hash(prompt_path),
+        model=config.model,
+        prompt_version=config.version,
+        requested_samples=config.samples,
+    )
+    if not exp:
+        return None
+    return Path(exp.get("csv_path") or exp.get("jsonl_path"))
+
+
+def compact_for_resume(
+    resume_path: Path,
+    module_id: str,
+    module: dict,
+    version: str,
+    csv_path: Optional[Path],
+    jsonl_path: Optional[Path],
+    record_ids: set,
+    accumulator: MetricsAccumulator,
+) -> set:
+    """
+    Keep only the successful rows of a previous run, for records still in the dataset.
+
+    The outputs are rewritten to temp files and swapped in atomically, so an
+    interruption here never loses the previous run. Kept rows are added to
+    `accumulator`; returns their record ids.
+    """
+    source_jsonl = resume_path.with_suffix(".jsonl")
+    source_csv = resume_path.with_suffix(".csv")
+    # The JSONL sidecar has full results; the CSV is the fallback
+    previous = iter_dataset(source_jsonl) if source_jsonl.exists() else iter_csv_results(source_csv)
+
+    tmp_csv = csv_path.with_name(csv_path.name + ".tmp") if csv_path else None
+    tmp_jsonl = jsonl_path.with_name(jsonl_path.name + ".tmp") if jsonl_path else None
+
+    done = set()
+    with StreamingResultWriter(module_id, version, csv_path=tmp_csv, jsonl_path=tmp_jsonl) as writer:
+        for key, result in with_record_ids(previous):
+            if key not in record_ids or key in done or not is_successful(result.get("output")):
+                continue
+            result["id"] = key
+            if "comparison" not in result:
+                result["comparison"] = compare_result(result.get("expected", {}), result["output"], module)
+            writer.write(result)
+            accumulator.add(result)
+            done.add(key)
+
+    for tmp, final in ((tmp_csv, csv_path), (tmp_jsonl, jsonl_path)):
+        if tmp:
+            os.replace(tmp, final)
+
+    return done
+
+
+def past_completion_tokens(module_id: str, model: str, max_runs: int = 5) -> List[int]:
+    """
+    Per-record completion tokens of the module's latest runs with `model`.
+
+    The model of a run comes from the registry, else from the `.meta.json`
+    next to exported results; runs with an unknown model are skipped.
+    """
+    registry = ExperimentRegistry()
+    runs = {}
+    for path in get_output_folder(module_id).glob("*.*"):
+        if path.suffix in (".csv", ".jsonl") and not path.name.startswith("."):
+            runs.setdefault(path.with_suffix(""), path)
+            if path.suffix == ".jsonl":
+                runs[path.with_suffix("")] = path  # Full results preferred over CSV
+
+    samples = []
+    used = 0
+    for stem, path in sorted(runs.items(), key=lambda item: item[1].stat().st_mtime, reverse=True):
+        if used >= max_runs:
+            break
+        entry = registry.find_by_csv_path(str(stem.with_suffix(".csv")))
+        meta_path = stem.with_suffix(".meta.json")
+        if entry:
+            run_model = entry.get("model")
+        elif meta_path.exists():
+            run_model = json.loads(meta_path.read_text(encoding="utf-8")).get("model")
+        else:
+            continue
+        if run_model != model:
+            continue
+
+        used += 1
+        try:
+            rows = iter_dataset(path) if path.suffix == ".jsonl" else iter_csv_results(path)
+            for row in rows:
+                if is_successful(row.get("output")):
+                    samples.append(int(row.get("completion_tokens") or 0))
+        except (ValueError, KeyError):
+            continue  # Foreign/partial export
+    return samples
+
+
+def pack_budget(module_id: str, config: ExperimentConfig) -> Tuple[TokenBudget, str]:
+    """Token budget for packed calls, and where its per-keyword estimate came from."""
+    samples = past_completion_tokens(module_id, config.model)
+    per_keyword = completion_per_keyword(samples)
+    if per_keyword:
+        source = f"p90 of {len(samples)} past records"
+    else:
+        per_keyword = DEFAULT_COMPLETION_PER_KEYWORD
+        source = "default, no past runs"
+    budget = TokenBudget.for_model(config.model, per_keyword, config.pack_max_tokens)
+    return budget, f"~{per_keyword} completion tokens/keyword ({source}), max_tokens <= {budget.max_output_tokens}"
+
+
 # ============================================================================
 # Main Orchestrator
 # ============================================================================
@@ -582,87 +1040,253 @@ def run_module_experiment(
     print(f"  Schema: {schema_path.name if schema_path else 'None'}")
     print(f"  Dataset: {dataset_path.name}")
 
-    # Load data
+    # Load data (full runs stream the dataset instead of loading it)
     prompt_template = load_prompt(prompt_path)
     schema = load_schema(schema_path) if schema_path else None
-    records = load_dataset(dataset_path, config.samples)
-
-    print(f"  Records: {len(records)}")
+    if config.samples:
+        records = load_dataset(dataset_path, config.samples)
+        total = len(records)
+    else:
+        records = None
+        total = count_records(dataset_path)
+
+    def dataset() -> Iterator[Tuple[str, dict]]:
+        return with_record_ids(records if records is not None else iter_dataset(dataset_path))
+
+    print(f"  Records: {total}")
+
+    # Path A cascade: each step module's own prompt, one keyword at a time
+    cascade = None
+    cascade_prompt_path = None
+    if config.cascade and module_id != CASCADE_TARGET:
+        print(f"  Cascade: runs on {CASCADE_TARGET} records, {module_id} runs normally")
+    elif config.cascade:
+        steps = {}
+        for step_module in CASCADE_MODULES:
+            step_prompt_path = find_prompt_file(step_module)
+            if not step_prompt_path:
+                print(f"  ERROR: Prompt file not found for cascade step {step_module}")
+                return {"error": "prompt_not_found"}
+            step_schema_path = find_schema_file(step_module)
+            step_template = load_prompt(step_prompt_path)
+            steps[step_module] = (
+                lambda record, template=step_template: render_messages(template, record, config.prompt_layout),
+                load_schema(step_schema_path) if step_schema_path else None,
+            )
+            print(f"  Cascade step {step_module}: {step_prompt_path.name}")
+            cascade_prompt_path = cascade_prompt_path or step_prompt_path
+        cascade = RelevanceCascade(runner, steps, parallel=config.parallel_requests)
+
+    # Path A fused: per pack of keywords sharing a product context, M12 then one M13-M16 call
+    fused = None
+    if config.fused and module_id != CASCADE_TARGET:
+        print(f"  Fused: runs on {CASCADE_TARGET} records, {module_id} runs normally")
+    elif config.fused:
+        try:
+            fused = FusedPathA.for_prompts(
+                runner,
+                lambda template, record: render_messages(template, record, config.prompt_layout),
+                size=config.pack_size,
+                parallel=config.parallel_requests,
+            )
+        except FileNotFoundError as e:
+            print(f"  ERROR: {e}")
+            return {"error": "prompt_not_found"}
+        first = records[0] if records else next(iter_dataset(dataset_path), None)
+        missing = fused.missing_fields(first) if first else []
+        if missing:
+            print(f"  ERROR: records lack {', '.join(missing)} for the fused prompts")
+            return {"error": "missing_fields"}
+        fused.packer.budget = TokenBudget.for_model(config.model, FUSED_COMPLETION_PER_KEYWORD, config.pack_max_tokens)
+        fused.packer.render = lambda record: render_messages(fused.packer.template, record, config.prompt_layout)
+        print(f"  Fused: {fused.m12_packer.prompt_path.name} + {fused.packer.prompt_path.name} "
+              f"(up to {config.pack_size} keywords per call, max_tokens <= {fused.packer.budget.max_output_tokens})")
+
+    # Multi-keyword packing needs a batch prompt whose context fields the records have
+    packer = KeywordPacker.for_module(module_id, config.pack_size) if config.pack and not (cascade or fused) else None
+    if config.pack:
+        first = records[0] if records else next(iter_dataset(dataset_path), None)
+        missing = packer.missing_fields(first) if packer and first else []
+        if not packer:
+            print(f"  Packing: no batch prompt for {module_id}, one call per record")
+        elif missing:
+            print(f"  Packing: records lack {', '.join(missing)} for {packer.prompt_path.name}, one call per record")
+            packer = None
+        else:
+            print(f"  Packing: {packer.prompt_path.name} (up to {packer.size} keywords per call)")
+            packer.budget, budget_note = pack_budget(module_id, config)
+            packer.render = lambda record: render_messages(packer.template, record, config.prompt_layout)
+            print(f"  Packing budget: {budget_note}")
+    pack_schema = load_schema(packer.schema_path) if packer and packer.schema_path else None
+
+    fast_path = None
+    if config.brand_fast_path:
+        fast_path = BrandFastPath.for_module(module_id, fuzzy=config.brand_fast_path == "fuzzy")
+        if not fast_path:
+            print(f"  Brand fast path: not available for {module_id}, all records go to the LLM")
+    sent_prompt_path = cascade_prompt_path or (fused.packer.prompt_path if fused else None) or (
+        packer.prompt_path if packer else prompt_path
+    )
 
     if config.dry_run:
         print("  [DRY RUN] Skipping LLM calls")
-        return {"dry_run": True, "records": len(records)}
+        return {"dry_run": True, "records": total}
 
-    # Prepare LLM calls
-    items = []
-    for record in records:
-        rendered_prompt = render_template(prompt_template, record)
-        items.append((rendered_prompt, schema))
+    # Output files are written row by row as results complete.
+    # Braintrust uploads read the results back from the JSONL sidecar.
+    resume_path = find_resume_path(module_id, config, sent_prompt_path)
+    if resume_path:
+        stem_path = resume_path.with_suffix("")
+    else:
+        stem_path = get_output_folder(module_id) / Path(get_output_filename(module_id, config.version)).stem
+    csv_path = stem_path.with_suffix(".csv") if config.output_mode in ("csv", "both") else None
+    write_jsonl = config.jsonl or config.output_mode in ("braintrust", "both")
+    if resume_path and stem_path.with_suffix(".jsonl").exists():
+        write_jsonl = True  # Keep an existing sidecar in sync
+    jsonl_path = stem_path.with_suffix(".jsonl") if write_jsonl else None
+
+    accumulator = MetricsAccumulator()
+    done_ids = set()
+    if resume_path:
+        record_ids = {key for key, _ in dataset()}
+        done_ids = compact_for_resume(
+            resume_path, module_id, module, config.version,
+            csv_path, jsonl_path, record_ids, accumulator,
+        )
+        print(f"  Resuming {stem_path.name}: {len(done_ids)} done, {total - len(done_ids)} to run")
+
+    # Register up front so an interrupted run can be found with --resume auto
+    registry = ExperimentRegistry()
+    prompt_hash = compute_prompt_hash(sent_prompt_path)
+    previous = registry.find_by_csv_path(str(csv_path)) if resume_path and csv_path else None
+    local_id = previous["local_id"] if previous else registry.generate_local_id(module_id)
+    registry.add_experiment(ExperimentRecord(
+        local_id=local_id,
+        module_id=module_id,
+        csv_path=str(csv_path) if csv_path else "",
+        jsonl_path=str(jsonl_path) if jsonl_path else None,
+        created_at=previous["created_at"] if previous else datetime.now().isoformat(),
+        prompt_version=config.version,
+        prompt_hash=prompt_hash,
+        dataset_version="v1.1",
+        requested_samples=config.samples,
+        status="running",
+        model=config.model,
+    ))
+
+    # Requests are rendered lazily; only in-flight records (or packs) are held in memory
+    in_flight: Dict[int, Union[Tuple[str, dict], Pack]] = {}
+
+    def pending_records() -> Iterator[Tuple[str, dict]]:
+        return ((key, record) for key, record in dataset() if key not in done_ids)
+
+    def requests() -> Iterator[LLMRequest]:
+        units = packer.pack(pending_records()) if packer else pending_records()
+        for idx, unit in enumerate(units):
+            in_flight[idx] = unit
+            if packer:
+                messages = render_messages(packer.template, unit.as_record(), config.prompt_layout)
+                trace = {"module": module_id, "prompt_hash": prompt_hash, "keywords": len(unit.members)}
+                yield runner.build_request(messages, pack_schema, unit.max_tokens, trace)
+            else:
+                messages = render_messages(prompt_template, unit[1], config.prompt_layout)
+                yield runner.build_request(messages, schema, metadata={"module": module_id, "prompt_hash": prompt_hash})
 
     # Execute
-    print(f"  Running {len(items)} LLM calls (parallel={config.parallel_requests})...")
+    pending = total - len(done_ids)
+    calls = 0
+    dedup_stats = None
     start_time = time.time()
-    outputs = runner.run_batch(items, parallel=config.parallel_requests)
-    elapsed = time.time() - start_time
-    print(f"  Completed in {elapsed:.1f}s ({len(items)/elapsed:.1f} req/s)")
-
-    # Process results
-    results = []
-    for record, output in zip(records, outputs):
-        expected = record.get("expected", {})
-
-        # Extract metrics from output (added by LLMRunner)
-        metrics_data = output.pop("_metrics", {}) if isinstance(output, dict) else {}
-
-        # Get the primary output field based on module type
-        if module["type"] in ("binary_classifier", "classifier"):
-            exp_val = expected.get("relevancy", expected.get("classification", expected.get("result")))
-            act_val = output.get("relevancy", output.get("classification", output.get("result")))
+    with StreamingResultWriter(
+        module_id, config.version, csv_path=csv_path, jsonl_path=jsonl_path, append=bool(resume_path)
+    ) as writer:
+        if fast_path:
+            # Unambiguous keywords are written first; the LLM only sees the rest
+            decided = set()
+            for key, record in pending_records():
+                output = fast_path.decide(record)
+                if output is not None:
+                    result = build_result(record, output, module, record_id=key, decided_by="fast_path")
+                    writer.write(result)
+                    accumulator.add(result)
+                    decided.add(key)
+            done_ids |= decided
+            pending -= len(decided)
+            print(f"  Brand fast path ({config.brand_fast_path}): {len(decided)} decided locally, {pending} to the LLM")
+
+        if cascade or fused:
+            if cascade:
+                print(f"  Cascading {pending} records through {' -> '.join(CASCADE_MODULES)} "
+                      f"(parallel={config.parallel_requests})...")
+            else:
+                print(f"  Packing {pending} records by product context, m12 then fused m13-m16 "
+                      f"(parallel={config.parallel_requests})...")
+            path_a = cascade or fused
+            for key, record, output in path_a.run(pending_records()):
+                result = build_result(record, output, module, record_id=key)
+                writer.write(result)
+                accumulator.add(result)
+            calls = path_a.stats.summary()["calls"]
         else:
-            exp_val = expected
-            act_val = output
-
-        comparison = compare_outputs(exp_val, act_val, module["type"])
-
-        results.append({
-            "input": record.get("input", {}),
-            "expected": expected,
-            "output": output,
-            "comparison": comparison,
-            "metadata": record.get("metadata", {}),
-            # Metrics from LLM call
-            "duration": metrics_data.get("duration", 0),
-            "llm_duration": metrics_data.get("llm_duration", 0),
-            "prompt_tokens": metrics_data.get("prompt_tokens", 0),
-            "completion_tokens": metrics_data.get("completion_tokens", 0),
-            "total_tokens": metrics_data.get("total_tokens", 0),
-            "estimated_cost": metrics_data.get("estimated_cost", 0),
-        })
+            if packer:
+                print(f"  Packing {pending} records by product context (parallel={config.parallel_requests})...")
+            else:
+                print(f"  Running {pending} LLM calls (parallel={config.parallel_requests})...")
+            deduper = RequestDeduper() if config.dedup else None
+            results = runner.engine.iter_results(requests(), concurrency=config.parallel_requests, dedup=deduper)
+            for idx, llm_result in results:
+                unit = in_flight.pop(idx)
+                output = runner.to_output(llm_result)
+                calls += 1
+                rows = zip(unit.members, unpack_output(unit, output)) if packer else [(unit, output)]
+                for (key, record), record_output in rows:
+                    result = build_result(record, record_output, module, record_id=key)
+                    writer.write(result)
+                    accumulator.add(result)
+            if deduper and deduper.duplicates:
+                calls -= deduper.duplicates
+                dedup_stats = deduper.summary()
+    elapsed = time.time() - start_time
+    print(f"  Completed in {elapsed:.1f}s ({calls} calls, {pending/elapsed if elapsed else 0:.1f} records/s)")
 
     # Calculate metrics
-    metrics = calculate_metrics(results)
+    metrics = accumulator.summary()
     print(f"  Accuracy: {metrics['accuracy']:.1%} ({metrics['correct']}/{metrics['total']})")
+    if cascade:
+        metrics["cascade"] = cascade.stats.summary()
+        for line in cascade.stats.report():
+            print(f"  {line}")
+    if fused:
+        metrics["fused"] = fused.stats.summary()
+        for line in fused.stats.report():
+            print(f"  {line}")
+    if dedup_stats:
+        metrics["dedup"] = dedup_stats
+        print(f"  Dedup: {dedup_stats['duplicates']}/{dedup_stats['requests']} requests were repeats "
+              f"({dedup_stats['dedup_ratio']:.1%}), sent {dedup_stats['unique']}")
+    if metrics["cached_tokens"]:
+        print(f"  Prompt cache: {metrics['prompt_cache_rate']:.1%} of input tokens cached")
+    if metrics["retries"] or metrics["errors"]:
+        print(f"  Retries: {metrics['retries']}, failed rows: {metrics['errors']}")
+        if metrics["errors"]:
+            print(f"  Re-run failed rows with: --resume {csv_path or jsonl_path}")
     if metrics.get("avg_f1"):
         print(f"  Avg F1: {metrics['avg_f1']:.3f}")
 
     # Output
     output_paths = {}
-    registry = ExperimentRegistry()
-    local_id = registry.generate_local_id(module_id)
-
-    # Compute prompt hash for versioning
-    prompt_hash = compute_prompt_hash(prompt_path) if prompt_path else None
-
-    if config.output_mode in ("csv", "both"):
-        csv_path = save_to_csv(results, module_id, config.version)
+    if csv_path:
         output_paths["csv"] = str(csv_path)
         print(f"  CSV: {csv_path}")
+    if jsonl_path:
+        output_paths["jsonl"] = str(jsonl_path)
+        print(f"  JSONL: {jsonl_path}")
 
     braintrust_id = None
     braintrust_url = None
 
     if config.output_mode in ("braintrust", "both"):
-        bt_url = upload_to_braintrust(results, module_id, metrics)
+        bt_url = upload_to_braintrust(iter_dataset(jsonl_path), module_id, metrics)
         if bt_url:
             output_paths["braintrust"] = bt_url
             braintrust_url = bt_url
@@ -670,25 +1294,17 @@ def run_module_experiment(
             braintrust_id = bt_url.split("/")[-1] if bt_url else None
             print(f"  Braintrust: {bt_url}")
 
-    # Register experiment
-    record = ExperimentRecord(
-        local_id=local_id,
-        module_id=module_id,
-        csv_path=output_paths.get("csv", ""),
-        created_at=datetime.now().isoformat(),
+    # Finalize registry entry
+    registry.update_experiment(
+        local_id,
         braintrust_id=braintrust_id,
         braintrust_url=braintrust_url,
         uploaded_at=datetime.now().isoformat() if braintrust_url else None,
-        prompt_version=config.version,
-        prompt_hash=prompt_hash,
-        dataset_version="v1.1",
-        samples=len(results),
+        samples=metrics["total"],
         accuracy=metrics.get("accuracy", 0),
         metrics=metrics,
         status="uploaded" if braintrust_url else "local_only",
-        model=config.model,
     )
-    registry.add_experiment(record)
     print(f"  Registered: {local_id}")
 
     return {
@@ -709,6 +1325,7 @@ def run_experiments(config: ExperimentConfig) -> dict:
     print(f"Samples: {config.samples or 'full'}")
     print(f"Output: {config.output_mode}")
     print(f"Model: {config.model}")
+    print(f"Prompt layout: {config.prompt_layout}")
 
     runner = LLMRunner(model=config.model, temperature=config.temperature)
 
@@ -735,9 +1352,19 @@ def run_experiments(config: ExperimentConfig) -> dict:
             metrics = result.get("metrics", {})
             print(f"  {module_id}: {metrics.get('accuracy', 0):.1%} accuracy")
 
+    if runner.engine.cache is not None:
+        print_cache_stats(runner.engine.cache)
+
     return results
 
 
+def print_cache_stats(cache: ResponseCache) -> None:
+    """Print response cache counters."""
+    stats = cache.stats()
+    print(f"\nLLM cache: {stats['hits']} hits / {stats['misses']} misses "
+          f"({stats['hit_rate']:.1%}), {stats['entries']} entries, {stats['size_mb']:.1f} MB")
+
+
 # ============================================================================
 # CLI
 # ============================================================================
@@ -760,8 +1387,23 @@ Examples:
   # Full dataset + upload to Braintrust
   python scripts/orchestrator.py run --module m12b --full --upload-braintrust
 
+  # Resume an interrupted/partially failed run (skips successful records)
+  python scripts/orchestrator.py run --module m13 --full --resume
+
+  # Cache-friendly layout (static prompt prefix, record data last)
+  python scripts/orchestrator.py run --module m13 --full --prompt-layout prefix_cache
+
+  # One call per product context instead of per keyword (multi-keyword prompts)
+  python scripts/orchestrator.py run --module m04 --full --pack
+
   # List available modules
   python scripts/orchestrator.py list
+
+  # Show / evict / clear the LLM response cache (LLM_CACHE=0 disables it)
+  python scripts/orchestrator.py cache stats
+
+  # Latency / cost percentiles of traced LLM calls (LLM_TRACES=0 disables tracing)
+  python scripts/orchestrator.py traces report --since 7d --by model
         """
     )
 
@@ -781,10 +1423,52 @@ Examples:
     run_parser.add_argument("--version", "-v", default="v1", help="Version label for output files")
     run_parser.add_argument("--parallel", "-p", type=int, default=5, help="Parallel requests (default: 5)")
     run_parser.add_argument("--dry-run", action="store_true", help="Don't make LLM calls")
+    run_parser.add_argument("--jsonl", action="store_true",
+                          help="Also stream full results to a JSONL sidecar next to the CSV")
+    run_parser.add_argument("--resume", nargs="?", const="auto", metavar="CSV",
+                          help="Resume a previous run: skip records with a successful output and "
+                               "re-run missing/errored ones. Without a path, the latest interrupted "
+                               "run with the same prompt/model/samples is found via the registry")
+    run_parser.add_argument("--pack", action="store_true",
+                          help="Pack records sharing a product context into multi-keyword calls "
+                               "(prompts/modules/batch), results unpacked per record")
+    run_parser.add_argument("--pack-size", type=int, default=DEFAULT_PACK_SIZE,
+                          help=f"Max keywords per packed call (default: {DEFAULT_PACK_SIZE})")
+    run_parser.add_argument("--pack-max-tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                          help="Completion cap for packed calls; packs are sized so the expected "
+                               f"output fits it and the model's context window (default: {DEFAULT_MAX_TOKENS})")
+    run_parser.add_argument("--brand-fast-path", nargs="?", const="exact", choices=["exact", "fuzzy"],
+                          help="M02/M04/M05: decide keywords that match a brand entity list locally "
+                               "(see scripts/brand_matching.py report), LLM for the rest; "
+                               "'fuzzy' also matches misspelled brands (default: exact)")
+    run_parser.add_argument("--cascade", action="store_true",
+                          help=f"{CASCADE_TARGET.upper()}: run Path A steps ({', '.join(CASCADE_MODULES)}) per keyword "
+                               "and stop as soon as a step settles R/S/C/N; reports calls saved per step")
+    run_parser.add_argument("--fused", action="store_true",
+                          help=f"{CASCADE_TARGET.upper()}: pack keywords by product context and run M12, then "
+                               "M13-M16 in one structured-output call per pack (--pack-size, --pack-max-tokens)")
+    run_parser.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default="inline",
+                          help="inline: substitute values in place; prefix_cache: static instructions "
+                               "first, record data last (enables provider prompt caching)")
+    run_parser.add_argument("--no-dedup", action="store_true",
+                          help="Send every request even when its body repeats an earlier one "
+                               "(by default duplicates reuse the first call's result)")
 
     # List command
     list_parser = subparsers.add_parser("list", help="List available modules")
 
+    # Cache command
+    cache_parser = subparsers.add_parser("cache", help="Inspect or maintain the LLM response cache")
+    cache_parser.add_argument("action", choices=["stats", "evict", "clear"], help="Cache action")
+
+    # Traces command
+    traces_parser = subparsers.add_parser("traces", help="Report on the per-call LLM trace store")
+    traces_parser.add_argument("action", choices=["report"], help="Traces action")
+    traces_parser.add_argument("--since", default="7d",
+                               help="Only calls from the last 90m / 24h / 7d ... (default: 7d; 'all' for every trace)")
+    traces_parser.add_argument("--by", choices=["module", "model"], default="module",
+                               help="Group calls by module or model (default: module)")
+
     args = parser.parse_args()
 
     if args.command == "list":
@@ -803,6 +1487,32 @@ Examples:
             print(f"  {status} {module_id}: {module['name']} ({module['type']}){disabled_tag}")
         return
 
+    if args.command == "cache":
+        cache = ResponseCache()
+        if args.action == "evict":
+            print(f"Evicted {cache.evict()} entries")
+        elif args.action == "clear":
+            print(f"Removed {cache.clear()} entries")
+        stats = cache.stats()
+        print(f"Cache: {stats['path']}")
+        print(f"  Entries: {stats['entries']} ({stats['size_mb']:.1f} MB)")
+        return
+
+    if args.command == "traces":
+        store = TraceStore()
+        try:
+            since = parse_since(args.since)
+        except ValueError as e:
+            parser.error(str(e))
+        rows = trace_report(store.entries(since=since), by=args.by)
+        print(f"Traces: {store.directory} ({'all' if since is None else 'last ' + args.since})")
+        if not rows:
+            print("  No traced calls")
+            return
+        for line in format_trace_report(rows, by=args.by):
+            print(f"  {line}")
+        return
+
     if args.command == "run":
         # Determine modules to run
         if args.all:
@@ -824,6 +1534,12 @@ Examples:
         # Determine samples
         samples = None if args.full else args.samples
 
+        if args.cascade and args.fused:
+            parser.error("--cascade and --fused are alternative Path A modes, pick one")
+
+        if args.resume and args.resume != "auto" and len(modules) > 1:
+            parser.error("--resume <csv> takes a single module (use --resume without a path for several)")
+
         config = ExperimentConfig(
             modules=modules,
             samples=samples,
@@ -832,6 +1548,16 @@ Examples:
             version=args.version,
             parallel_requests=args.parallel,
             dry_run=args.dry_run,
+            prompt_layout=args.prompt_layout,
+            jsonl=args.jsonl,
+            resume=args.resume,
+            pack=args.pack,
+            pack_size=args.pack_size,
+            pack_max_tokens=args.pack_max_tokens,
+            brand_fast_path=args.brand_fast_path,
+            cascade=args.cascade,
+            fused=args.fused,
+            dedup=not args.no_dedup,
         )
 
         run_experiments(config)
@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+"""
+Pipeline DAG Executor (M01 → M16 per ASIN)
+
+Runs the whole pipeline for many ASINs at once instead of module by module.
+Each module is a stage with the upstream modules whose outputs build its
+input (see README "Stage Details"):
+
+    Path A:  M01, M03 ─→ M02, M04, M05            (per keyword)
+             M06 ∥ M07 → M08 → M09 → M10 → M11 ─→ M12, M13, M14, M15, M16   (per keyword)
+    Path B:  M01a ∥ M01b → M02b                   (per keyword)
+             M06 ∥ M07 → M08 → M09 → M10 → M11 ─→ M12b                       (per keyword)
+
+A stage call is submitted as soon as its inputs exist for that ASIN, so
+independent stages (M01 ∥ M06 ∥ M07, the M12–M16 fan-out, other ASINs)
+share the engine's concurrency and an ASIN's latency is bounded by its
+critical path (M06/M07 → M11 → slowest keyword check), not by the sum of
+all modules. Ready calls are ordered by ASIN admission, then by the longest
+chain still ahead of the stage; `--max-asins` ASINs are in flight at a time.
+
+Every output is appended to `{run_dir}/{module}.jsonl` as it arrives, so an
+interrupted run continues with `--resume RUN_DIR` (failed calls are retried,
+their downstream stages skipped until then). M04b/M05b are not part of the
+DAG: their input needs M01a/M01b outputs for every competitor ASIN.
+
+Usage:
+    # Path A for 5 ASINs assembled from datasets/single (keywords from the keyword-level datasets)
+    python scripts/pipeline_dag.py run --asins 5
+
+    # Own product file: one JSON object per line with asin, product fields and keywords
+    python scripts/pipeline_dag.py run --products products.jsonl --path b --parallel 40
+
+    # Only some modules (their upstream modules are added automatically), 20 keywords per ASIN
+    python scripts/pipeline_dag.py run --asins 5 --modules m13,m14 --keywords 20
+
+    # Continue an interrupted run
+    python scripts/pipeline_dag.py run --resume experiment_results/pipeline/path_a_171026_1412
+
+    # Show the stage graph
+    python scripts/pipeline_dag.py graph --path a
+"""
+
+import argparse
+import heapq
+import json
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config import (
+    DATASETS_DIR, DEFAULT_MODEL, DEFAULT_TEMPERATURE, EXPERIMENT_RESULTS_DIR, PROMPTS_DIR, SCHEMAS_DIR,
+)
+from orchestrator import PROMPT_LAYOUTS, LLMRunner, is_successful, load_prompt, load_schema, render_messages
+
+PIPELINE_RESULTS_DIR = EXPERIMENT_RESULTS_DIR / "pipeline"
+SINGLE_SCHEMAS_DIR = SCHEMAS_DIR / "single"
+
+PROMPT_VERSION = re.compile(r"_v(\d+(?:\.\d+)?)_")
+
+DEFAULT_PARALLEL = 20
+DEFAULT_MAX_ASINS = 8
+
+# Product fields each product-level prompt reads
+LISTING_FIELDS = ("title", "bullet_points", "description")
+CATEGORY_FIELDS = ("category_root", "category_sub", "product_type")
+M07_FIELDS = (
+    "color", "included_components", "item_form", "material", "model", "number_of_items",
+    "size", "specific_uses", "style", "target_audience",
+)
+PRODUCT_FIELDS = ("brand_name", "manufacturer", "known_competitor_brands") + LISTING_FIELDS + CATEGORY_FIELDS + M07_FIELDS
+
+
+# ============================================================================
+# Stage Inputs
+# ============================================================================
+
+def pick(product: dict, names: Iterable[str]) -> dict:
+    return {name: product.get(name, "") for name in names}
+
+
+def product_attributes(product: dict) -> dict:
+    return pick(product, CATEGORY_FIELDS)
+
+
+def brand_input(product: dict, up: dict) -> dict:
+    return {**pick(product, ("brand_name",) + LISTING_FIELDS), "manufacturer": product.get("manufacturer", "")}
+
+
+def m01a_input(product: dict, up: dict) -> dict:
+    return {"brand_name": product.get("brand_name", "")}
+
+
+def m03_input(product: dict, up: dict) -> dict:
+    return {
+        **pick(product, ("brand_name",) + LISTING_FIELDS + CATEGORY_FIELDS),
+        "known_competitor_brands": product.get("known_competitor_brands", []),
+    }
+
+
+def m02_input(product: dict, up: dict) -> dict:
+    return {"brand_entities": up["m01"].get("brand_entities", [])}
+
+
+def m02b_input(product: dict, up: dict) -> dict:
+    related = up["m01b"]
+    manufacturer = related.get("manufacturer") or {}
+    terms = list(related.get("sub_brands") or [])
+    if manufacturer.get("searchable"):
+        terms.append(manufacturer.get("short") or manufacturer.get("name", ""))
+    return {
+        "variations_own": ", ".join(up["m01a"].get("variations", [])),
+        "related_terms_own": ", ".join(term for term in terms if term),
+    }
+
+
+def m04_input(product: dict, up: dict) -> dict:
+    return {
+        "own_brand": {"name": product.get("brand_name", ""), "entities": up["m01"].get("brand_entities", [])},
+        "competitor_entities": up["m03"].get("competitor_entities", []),
+    }
+
+
+def m05_input(product: dict, up: dict) -> dict:
+    return {
+        "brand_entities": up["m01"].get("brand_entities", []),
+        "competitor_entities": up["m03"].get("competitor_entities", []),
+    }
+
+
+def m06_input(product: dict, up: dict) -> dict:
+    return pick(product, LISTING_FIELDS + CATEGORY_FIELDS)
+
+
+def m07_input(product: dict, up: dict) -> dict:
+    return pick(product, LISTING_FIELDS + CATEGORY_FIELDS + M07_FIELDS)
+
+
+def m08_input(product: dict, up: dict) -> dict:
+    return {
+        **pick(product, LISTING_FIELDS),
+        "taxonomy": up["m06"].get("taxonomy", []),
+        "audiences": up["m07"].get("audiences", []),
+        "use_cases": up["m07"].get("use_cases", []),
+        "variants": up["m07"].get("variants", []),
+    }
+
+
+def m09_input(product: dict, up: dict) -> dict:
+    return {
+        **pick(product, LISTING_FIELDS),
+        "product_attributes": product_attributes(product),
+        "taxonomy": up["m06"].get("taxonomy", []),
+        "attribute_table": up["m08"].get("attribute_table", []),
+    }
+
+
+def m10_input(product: dict, up: dict) -> dict:
+    return {**m09_input(product, up), "primary_use": up["m09"].get("primary_use", "")}
+
+
+def m11_input(product: dict, up: dict) -> dict:
+    return {**m09_input(product, up), "validated_use": up["m10"].get("validated_use", "")}
+
+
+def relevance_input(product: dict, up: dict) -> dict:
+    """M12-M16: product definition from Stage 3 (brand scope is not used)."""
+    return {
+        **m11_input(product, up),
+        "hard_constraints": up["m11"].get("hard_constraints", []),
+    }
+
+
+# ============================================================================
+# Stage Graph
+# ============================================================================
+
+@dataclass(frozen=True)
+class Stage:
+    """One module in the DAG."""
+    module_id: str
+    requires: Tuple[str, ...]
+    build_input: Callable[[dict, dict], dict]  # (product, upstream outputs) -> input
+    per_keyword: bool = False  # One call per keyword (input gets "keyword")
+
+
+PRODUCT_DEFINITION = (
+    Stage("m06", (), m06_input),
+    Stage("m07", (), m07_input),
+    Stage("m08", ("m06", "m07"), m08_input),
+    Stage("m09", ("m06", "m08"), m09_input),
+    Stage("m10", ("m06", "m08", "m09"), m10_input),
+    Stage("m11", ("m06", "m08", "m10"), m11_input),
+)
+RELEVANCE_INPUTS = ("m06", "m08", "m10", "m11")
+
+PATHS: Dict[str, Tuple[Stage, ...]] = {
+    "a": (
+        Stage("m01", (), brand_input),
+        Stage("m03", (), m03_input),
+        Stage("m02", ("m01",), m02_input, per_keyword=True),
+        Stage("m04", ("m01", "m03"), m04_input, per_keyword=True),
+        Stage("m05", ("m01", "m03"), m05_input, per_keyword=True),
+        *PRODUCT_DEFINITION,
+        *(Stage(module_id, RELEVANCE_INPUTS, relevance_input, per_keyword=True)
+          for module_id in ("m12", "m13", "m14", "m15", "m16")),
+    ),
+    "b": (
+        Stage("m01a", (), m01a_input),
+        Stage("m01b", (), brand_input),
+        Stage("m02b", ("m01a", "m01b"), m02b_input, per_keyword=True),
+        *PRODUCT_DEFINITION,
+        Stage("m12b", RELEVANCE_INPUTS, relevance_input, per_keyword=True),
+    ),
+}
+
+
+class PipelineGraph:
+    """Stages of one path, restricted to the requested modules and their upstream."""
+
+    def __init__(self, path: str = "a", modules: Optional[Iterable[str]] = None):
+        if path not in PATHS:
+            raise ValueError(f"Unknown path: {path}. Available: {sorted(PATHS)}")
+        by_id = {stage.module_id: stage for stage in PATHS[path]}
+
+        wanted = set(by_id) if modules is None else set()
+        stack = list(modules or ())
+        while stack:
+            module_id = stack.pop()
+            if module_id not in by_id:
+                raise ValueError(f"{module_id} is not in path {path.upper()}. Available: {list(by_id)}")
+            if module_id not in wanted:
+                wanted.add(module_id)
+                stack.extend(by_id[module_id].requires)
+
+        self.path = path
+        self.stages: Dict[str, Stage] = {m: s for m, s in by_id.items() if m in wanted}
+        self.dependents: Dict[str, List[str]] = {module_id: [] for module_id in self.stages}
+        for stage in self.stages.values():
+            for required in stage.requires:
+                self.dependents[required].append(stage.module_id)
+        self.roots = [m for m, s in self.stages.items() if not s.requires]
+        self.rank = {}  # Stages on the longest chain ahead first
+        for module_id in reversed(list(self.stages)):
+            self.rank[module_id] = 1 + max((self.rank[d] for d in self.dependents[module_id]), default=0)
+
+    def describe(self) -> List[str]:
+        lines = []
+        for module_id, stage in self.stages.items():
+            needs = ", ".join(stage.requires) or "product"
+            scope = "per keyword" if stage.per_keyword else "per ASIN"
+            lines.append(f"{module_id:<5} <- {needs:<22} {scope:<12} chain {self.rank[module_id]}")
+        return lines
+
+
+# ============================================================================
+# Prompts, Schemas and Products
+# ============================================================================
+
+def find_module_prompt(module_id: str) -> Optional[Path]:
+    """Latest prompts/modules/single/{module_id}_v*.md (m01 does not match m01a)."""
+    matches = [p for p in PROMPTS_DIR.glob(f"{module_id}_v*.md") if PROMPT_VERSION.search(p.name)]
+    if not matches:
+        return None
+    return max(matches, key=lambda p: (float(PROMPT_VERSION.search(p.name).group(1)), p.name))
+
+
+def find_module_schema(module_id: str) -> Optional[Path]:
+    """prompts/json_schemas/single/{module_id}_{slug}_schema*.json (unversioned slug)."""
+    for path in sorted(SINGLE_SCHEMAS_DIR.glob(f"{module_id}_*schema*.json")):
+        if not re.match(rf"{module_id}_v\d", path.name):
+            return path
+    return None
+
+
+def load_products(path: Path) -> List[dict]:
+    """Product records: asin, product fields and a `keywords` list."""
+    products = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if "input" in record:  # Dataset-style record
+                    record = {"asin": record.get("id"), **record["input"], **record.get("metadata", {})}
+                products.append(record)
+    return products
+
+
+def products_from_datasets(graph: PipelineGraph, limit: Optional[int] = None) -> List[dict]:
+    """Assemble products from datasets/single: product fields and each ASIN's keywords."""
+    products: Dict[str, dict] = {}
+    keywords: Dict[str, Dict[str, None]] = {}
+    for dataset in sorted(DATASETS_DIR.glob("m*_v1_*.jsonl")):
+        module_id = dataset.name.split("_")[0]
+        with open(dataset, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                asin = record.get("metadata", {}).get("asin") or record.get("id")
+                data = record.get("input", {})
+                if "keyword" in data:
+                    if module_id in graph.stages:
+                        keywords.setdefault(asin, {})[data["keyword"]] = None
+                    continue
+                product = products.setdefault(asin, {"asin": asin})
+                for key in PRODUCT_FIELDS:
+                    if key in data:
+                        product.setdefault(key, data[key])
+                product.setdefault("brand_name", record.get("metadata", {}).get("brand_name", ""))
+
+    needs_keywords = any(stage.per_keyword for stage in graph.stages.values())
+    assembled = []
+    for asin, product in products.items():
+        if "title" not in product or (needs_keywords and asin not in keywords):
+            continue
+        assembled.append({**product, "keywords": list(keywords.get(asin, {}))})
+        if limit and len(assembled) >= limit:
+            break
+    return assembled
+
+
+# ============================================================================
+# Execution
+# ============================================================================
+
+TaskKey = Tuple[str, str, Optional[str]]  # (asin, module_id, keyword)
+
+
+class PipelineRun:
+    """Streams ASINs through the stage graph on the shared LLM engine."""
+
+    def __init__(
+        self,
+        graph: PipelineGraph,
+        run_dir: Path,
+        runner: LLMRunner,
+        parallel: int = DEFAULT_PARALLEL,
+        max_asins: int = DEFAULT_MAX_ASINS,
+        prompt_layout: str = "inline",
+        prompt_paths: Optional[Dict[str, Path]] = None,
+    ):
+        self.graph = graph
+        self.run_dir = run_dir
+        self.runner = runner
+        self.parallel = parallel
+        self.max_asins = max_asins
+        self.prompt_layout = prompt_layout
+
+        self.prompts: Dict[str, str] = {}
+        self.schemas: Dict[str, Optional[dict]] = {}
+        self.prompt_names: Dict[str, str] = {}
+        for module_id in graph.stages:
+            prompt_path = (prompt_paths or {}).get(module_id) or find_module_prompt(module_id)
+            if not prompt_path:
+                raise FileNotFoundError(f"Prompt file not found for {module_id}")
+            schema_path = find_module_schema(module_id)
+            self.prompts[module_id] = load_prompt(prompt_path)
+            self.schemas[module_id] = load_schema(schema_path) if schema_path else None
+            self.prompt_names[module_id] = prompt_path.name
+
+        self.products: Dict[str, dict] = {}
+        self.outputs: Dict[TaskKey, dict] = {}
+        self.latency: Dict[str, Dict[str, List[float]]] = {}  # asin -> module -> call seconds
+        self.restored: Dict[TaskKey, dict] = {}
+        self.failed: Dict[TaskKey, str] = {}
+        self.scheduled: Set[Tuple[str, str]] = set()  # (asin, module_id) queued once
+        self.open_tasks: Dict[str, int] = {}
+        self.asin_started: Dict[str, float] = {}
+        self.asin_elapsed: Dict[str, float] = {}
+        self.active = 0  # Admitted ASINs with open tasks
+        self._ready: List[tuple] = []
+        self._order: Dict[str, int] = {}
+        self._sequence = 0
+        self._files = {}
+        self.calls = 0
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def restore(self) -> int:
+        """Load successful outputs of an earlier run from run_dir."""
+        for module_id in self.graph.stages:
+            path = self.run_dir / f"{module_id}.jsonl"
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        if is_successful(row.get("output")):
+                            self.restored[(row["asin"], module_id, row.get("keyword"))] = row["output"]
+        return len(self.restored)
+
+    def _write(self, key: TaskKey, output: dict) -> None:
+        asin, module_id, keyword = key
+        f = self._files.get(module_id)
+        if f is None:
+            f = self._files[module_id] = open(self.run_dir / f"{module_id}.jsonl", "a", encoding="utf-8")
+        row = {"asin": asin, "module": module_id, "keyword": keyword, "output": output}
+        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        f.flush()
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _upstream(self, asin: str, stage: Stage) -> Optional[dict]:
+        """Outputs of the required stages for an ASIN, or None if one is missing."""
+        upstream = {}
+        for required in stage.requires:
+            output = self.outputs.get((asin, required, None))
+            if output is None:
+                return None
+            upstream[required] = output
+        return upstream
+
+    def _schedule(self, asin: str, module_id: str) -> None:
+        """Queue a stage whose inputs are complete (one task per keyword for keyword stages)."""
+        if (asin, module_id) in self.scheduled:
+            return
+        self.scheduled.add((asin, module_id))
+        stage = self.graph.stages[module_id]
+        keywords = self.products[asin].get("keywords", []) if stage.per_keyword else [None]
+        for keyword in keywords:
+            key = (asin, module_id, keyword)
+            self.open_tasks[asin] += 1
+            if key in self.restored:
+                self._complete(key, self.restored[key], 0.0, persist=False)
+                continue
+            self._sequence += 1
+            priority = (self._order[asin], -self.graph.rank[module_id], self._sequence)
+            heapq.heappush(self._ready, (priority, key))
+
+    def _complete(self, key: TaskKey, output: dict, latency: float, persist: bool = True) -> None:
+        asin, module_id, keyword = key
+        self.latency[asin].setdefault(module_id, []).append(latency)
+        if persist:
+            self._write(key, output)
+        if not is_successful(output):
+            self.failed[key] = output.get("error") or "parse_error"
+        else:
+            output = {k: v for k, v in output.items() if not k.startswith("_")}
+            self.outputs[key] = output
+            if keyword is None:
+                for dependent in self.graph.dependents[module_id]:
+                    if self._upstream(asin, self.graph.stages[dependent]) is not None:
+                        self._schedule(asin, dependent)
+        # Closed after its dependents are queued, so the ASIN stays open meanwhile
+        self.open_tasks[asin] -= 1
+        if self.open_tasks[asin] == 0:
+            self._finish(asin)
+
+    def _finish(self, asin: str) -> None:
+        self.asin_elapsed[asin] = time.time() - self.asin_started[asin]
+        self.active -= 1
+
+    def _admit(self, product: dict) -> None:
+        asin = product["asin"]
+        self.products[asin] = product
+        self._order[asin] = len(self._order)
+        self.latency[asin] = {}
+        self.asin_started[asin] = time.time()
+        self.active += 1
+        self.open_tasks[asin] = 1  # Held while the roots are queued (restored ones complete at once)
+        for module_id in self.graph.roots:
+            self._schedule(asin, module_id)
+        self.open_tasks[asin] -= 1
+        if self.open_tasks[asin] == 0:
+            self._finish(asin)
+
+    def _request(self, key: TaskKey):
+        asin, module_id, keyword = key
+        stage = self.graph.stages[module_id]
+        input_data = stage.build_input(self.products[asin], self._upstream(asin, stage))
+        if keyword is not None:
+            input_data = {**input_data, "keyword": keyword}
+        messages = render_messages(self.prompts[module_id], {"input": input_data}, self.prompt_layout)
+        return self.runner.build_request(messages, self.schemas[module_id], metadata={"module": module_id})
+
+    def run(self, products: Iterable[dict]) -> None:
+        """Run every product through the graph; outputs stream to run_dir."""
+        waiting: Iterator[dict] = iter(products)
+        exhausted = False
+        in_flight: Dict[Future, Tuple[TaskKey, float]] = {}
+
+        try:
+            while True:
+                while not exhausted and self.active < max(1, self.max_asins):
+                    try:
+                        self._admit(next(waiting))
+                    except StopIteration:
+                        exhausted = True
+                while self._ready and len(in_flight) < self.parallel:
+                    _, key = heapq.heappop(self._ready)
+                    in_flight[self.runner.engine.submit(self._request(key))] = (key, time.time())
+                if not in_flight:
+                    if exhausted:
+                        return
+                    continue  # Every admitted ASIN finished; admit the next ones
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, submitted = in_flight.pop(future)
+                    self.calls += 1
+                    self._complete(key, self.runner.to_output(future.result()), time.time() - submitted)
+        finally:
+            self.close()
+
+    # ------------------------------------------------------------------
+    # Summary
+    # ------------------------------------------------------------------
+
+    def critical_path(self, asin: str) -> Tuple[float, float]:
+        """(longest dependency chain, sum of all calls) in call seconds for one ASIN."""
+        latency = self.latency.get(asin, {})
+        finish: Dict[str, float] = {}
+        total = 0.0
+        for module_id, stage in self.graph.stages.items():
+            own = latency.get(module_id, [])
+            total += sum(own)
+            start = max((finish.get(required, 0.0) for required in stage.requires), default=0.0)
+            finish[module_id] = start + max(own, default=0.0)
+        return max(finish.values(), default=0.0), total
+
+    def summary(self, elapsed: float) -> dict:
+        failed: Dict[str, int] = {}
+        for asin, _, _ in self.failed:
+            failed[asin] = failed.get(asin, 0) + 1
+        per_asin = {}
+        for asin, asin_elapsed in self.asin_elapsed.items():
+            critical, total = self.critical_path(asin)
+            per_asin[asin] = {
+                "elapsed": round(asin_elapsed, 3),
+                "critical_path": round(critical, 3),
+                "sum_of_calls": round(total, 3),
+                "failed": failed.get(asin, 0),
+            }
+        # Stages never reached because an upstream call failed (or an ASIN has no keywords)
+        blocked = {asin: [m for m in self.graph.stages if m not in self.latency[asin]] for asin in per_asin}
+        return {
+            "path": self.graph.path,
+            "modules": list(self.graph.stages),
+            "prompts": self.prompt_names,
+            "asins": len(per_asin),
+            "calls": self.calls,
+            "restored": len(self.restored),
+            "failed": len(self.failed),
+            "elapsed": round(elapsed, 3),
+            "per_asin": per_asin,
+            "blocked": {asin: modules for asin, modules in blocked.items() if modules},
+        }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_summary(summary: dict) -> None:
+    per_asin = list(summary["per_asin"].values())
+    print(f"  Completed in {summary['elapsed']:.1f}s ({summary['calls']} calls, {summary['restored']} restored)")
+    for label, name in (("ASIN latency", "elapsed"), ("Critical path", "critical_path"),
+                        ("Sum of calls", "sum_of_calls")):
+        values = [row[name] for row in per_asin]
+        print(f"  {label + ':':<15} p50 {percentile(values, 0.5):.2f}s, p95 {percentile(values, 0.95):.2f}s")
+    if summary["failed"]:
+        print(f"  Failed calls: {summary['failed']} (downstream stages skipped; re-run with --resume)")
+    if summary["blocked"]:
+        print(f"  ASINs with skipped stages: {len(summary['blocked'])}")
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def parse_prompt_overrides(values: List[str]) -> Dict[str, Path]:
+    overrides = {}
+    for value in values:
+        module_id, _, path = value.partition("=")
+        if not path:
+            raise SystemExit(f"--prompt expects MODULE=PATH, got {value!r}")
+        overrides[module_id.lower()] = Path(path)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the M01-M16 pipeline per ASIN as a dependency graph")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
+
+    run_parser = subparsers.add_parser("run", help="Run the pipeline for a set of ASINs")
+    run_parser.add_argument("--path", choices=sorted(PATHS), default="a", help="Pipeline path (default: a)")
+    run_parser.add_argument("--modules", help="Comma-separated target modules (upstream modules are added)")
+    run_parser.add_argument("--products", type=Path,
+                            help="JSONL with asin, product fields and keywords (default: assembled from datasets/single)")
+    run_parser.add_argument("--asins", type=int, help="Only the first N products")
+    run_parser.add_argument("--keywords", type=int, help="Only the first N keywords per product")
+    run_parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                            help=f"LLM calls in flight (default: {DEFAULT_PARALLEL})")
+    run_parser.add_argument("--max-asins", type=int, default=DEFAULT_MAX_ASINS,
+                            help=f"ASINs in flight at a time (default: {DEFAULT_MAX_ASINS})")
+    run_parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model (default: {DEFAULT_MODEL})")
+    run_parser.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default="inline",
+                            help="Message layout (see orchestrator.py --prompt-layout)")
+    run_parser.add_argument("--prompt", action="append", default=[], metavar="MODULE=PATH",
+                            help="Use this prompt file for a module (default: latest version)")
+    run_parser.add_argument("--resume", type=Path, metavar="RUN_DIR", help="Continue an earlier run")
+
+    graph_parser = subparsers.add_parser("graph", help="Print the stage graph")
+    graph_parser.add_argument("--path", choices=sorted(PATHS), default="a")
+    graph_parser.add_argument("--modules", help="Comma-separated target modules")
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return
+
+    modules = [m.strip().lower() for m in args.modules.split(",")] if args.modules else None
+    graph = PipelineGraph(args.path, modules)
+
+    if args.command == "graph":
+        print(f"Path {graph.path.upper()} ({len(graph.stages)} modules)")
+        for line in graph.describe():
+            print(f"  {line}")
+        return
+
+    if args.resume:
+        run_dir = args.resume
+        meta = json.loads((run_dir / "run.json").read_text(encoding="utf-8"))
+        graph = PipelineGraph(meta["path"], meta["modules"])
+        products = load_products(run_dir / "products.jsonl")
+    else:
+        products = load_products(args.products) if args.products else products_from_datasets(graph, args.asins)
+        products = products[:args.asins] if args.asins else products
+        if args.keywords:
+            products = [{**p, "keywords": p.get("keywords", [])[:args.keywords]} for p in products]
+        run_dir = PIPELINE_RESULTS_DIR / f"path_{graph.path}_{datetime.now().strftime('%d%m%y_%H%M%S')}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+        with open(run_dir / "products.jsonl", "w", encoding="utf-8") as f:
+            for product in products:
+                f.write(json.dumps(product, ensure_ascii=False) + "\n")
+        meta = {"path": graph.path, "modules": list(graph.stages), "model": args.model,
+                "created_at": datetime.now().isoformat()}
+        (run_dir / "run.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    print("\n" + "=" * 60)
+    print(f"PIPELINE DAG - PATH {graph.path.upper()}")
+    print("=" * 60)
+    print(f"Modules: {', '.join(graph.stages)}")
+    keywords = sum(len(p.get("keywords", [])) for p in products)
+    print(f"ASINs: {len(products)} ({keywords} keywords), parallel={args.parallel}, max ASINs={args.max_asins}")
+
+    runner = LLMRunner(model=meta.get("model", args.model), temperature=DEFAULT_TEMPERATURE)
+    pipeline = PipelineRun(
+        graph, run_dir, runner,
+        parallel=args.parallel,
+        max_asins=args.max_asins,
+        prompt_layout=args.prompt_layout,
+        prompt_paths=parse_prompt_overrides(args.prompt),
+    )
+    if args.resume:
+        print(f"Resuming {run_dir.name}: {pipeline.restore()} outputs restored")
+
+    start = time.time()
+    pipeline.run(products)
+    summary = pipeline.summary(time.time() - start)
+    (run_dir / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print_summary(summary)
+    print(f"  Outputs: {run_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Model Pricing Registry
+
+One place to turn token usage into USD. Prices live in config.MODEL_PRICING
+as (input, cached input, output) USD per 1M tokens; every cost in the
+project is computed here:
+
+- orchestrator.py: per-call `estimated_cost` in the result metrics
+- scripts/llm/traces.py: cost of each traced call
+- scripts/batch/batch_router.py: batch vs realtime estimates and actual
+  shard costs
+- scripts/batch/calculate_batch_costs.py and
+  tracking_dashboard/scripts/calculate_costs.py: cost reports
+
+Prompt tokens served from the provider's prompt cache (`cached_tokens`,
+part of `prompt_tokens`) are billed at the cached-input price; Batch API
+calls at BATCH_PRICE_FACTOR of the total. Model names are matched after
+dropping a provider prefix (openai/gpt-4o) and a snapshot suffix
+(gpt-4o-mini-2024-07-18, claude-sonnet-4-20250514); filename spellings
+such as gpt4omini match too.
+
+A model missing from the registry is not guessed at: token_cost() warns
+once per model and counts it as $0, and reports list it from
+unpriced_models(). Only estimates made before a call (batch_router's
+route estimates, token_cost(..., estimate=True)) price unknown models as
+DEFAULT_MODEL.
+
+Usage:
+    cost = token_cost("gpt-4o", prompt_tokens=1200, completion_tokens=80, cached_tokens=1024)
+    cost = usage_cost(line["response"]["body"]["usage"], "gpt-4o-mini", batch=True)
+"""
+
+import re
+import sys
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import BATCH_PRICE_FACTOR, DEFAULT_PRICING, MODEL_PRICING
+
+SNAPSHOT_SUFFIX = re.compile(r"\d{4,8}|latest")  # 20240718, 0613, latest (separators removed)
+
+_unpriced: Set[str] = set()
+_unpriced_lock = threading.Lock()
+
+
+def _compact(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def normalize_model(model: Optional[str]) -> Optional[str]:
+    """Registry name for a model id or filename spelling; None if it is not priced."""
+    if not model:
+        return None
+    name = model.lower().strip().split("/")[-1]
+    if name in MODEL_PRICING:
+        return name
+    # Filename spellings and snapshot ids: a registry name followed by a date
+    compact = _compact(name)
+    for known in MODEL_PRICING:
+        suffix = compact[len(_compact(known)):] if compact.startswith(_compact(known)) else None
+        if suffix is not None and (suffix == "" or SNAPSHOT_SUFFIX.fullmatch(suffix)):
+            return known
+    return None
+
+
+def model_price(model: Optional[str]) -> Optional[Tuple[float, float, float]]:
+    """(input, cached input, output) USD per 1M tokens, or None for an unknown model."""
+    name = normalize_model(model)
+    return MODEL_PRICING[name] if name else None
+
+
+def warn_unpriced(model: Optional[str]) -> None:
+    """Record a model without a price, warning on stderr the first time it is seen."""
+    name = model or "unknown"
+    with _unpriced_lock:
+        if name in _unpriced:
+            return
+        _unpriced.add(name)
+    print(f"Warning: no price for model {name!r} in config.MODEL_PRICING; its calls are reported as unpriced ($0)",
+          file=sys.stderr)
+
+
+def unpriced_models() -> List[str]:
+    """Models costed so far in this process without a price."""
+    with _unpriced_lock:
+        return sorted(_unpriced)
+
+
+def token_cost(
+    model: Optional[str],
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int = 0,
+    batch: bool = False,
+    estimate: bool = False,
+) -> float:
+    """
+    USD for one call's (or a total of calls') tokens; `cached_tokens` is part of `prompt_tokens`.
+    An unpriced model costs $0 (see warn_unpriced), or DEFAULT_MODEL's price when `estimate` is set.
+    """
+    prices = model_price(model)
+    if prices is None:
+        if not estimate:
+            warn_unpriced(model)
+            return 0.0
+        prices = DEFAULT_PRICING
+    input_price, cached_price, output_price = prices
+    cached_tokens = min(cached_tokens or 0, prompt_tokens)
+    cost = ((prompt_tokens - cached_tokens) * input_price
+            + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+    return cost * BATCH_PRICE_FACTOR if batch else cost
+
+
+def usage_cost(usage: dict, model: Optional[str], batch: bool = False) -> float:
+    """USD for an OpenAI `usage` object (dict form, e.g. from a batch result line)."""
+    details = usage.get("prompt_tokens_details") or {}
+    return token_cost(
+        model,
+        usage.get("prompt_tokens", 0) or 0,
+        usage.get("completion_tokens", 0) or 0,
+        details.get("cached_tokens", 0) or 0,
+        batch,
+    )
+
+
+def pricing_table() -> Dict[str, dict]:
+    """The registry as {model: {"input", "cached_input", "output", "batch_factor"}} (for reports)."""
+    return {
+        model: {"input": prices[0], "cached_input": prices[1], "output": prices[2], "batch_factor": BATCH_PRICE_FACTOR}
+        for model, prices in MODEL_PRICING.items()
+    }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Precompiled Prompt Templates
+
+A prompt template is parsed once into literal and placeholder segments;
+rendering a record is then a single join, instead of one str.replace pass
+over the whole (often 20 KB) template per variable. Compiled templates are
+cached, so callers can keep passing the raw template string.
+
+Placeholders missing from the values are left in place (e.g. "{{keyword}}")
+unless a `missing` string is given. Values are inserted verbatim: a value
+that itself contains "{{x}}" is not expanded again.
+
+Nested values (dicts/lists) can go through a JsonCache. With indent set, json
+uses its pure-Python encoder, so the pretty JSON of a sub-object that repeats
+across records (product title/attributes/taxonomy shared by every keyword of
+an ASIN) is cached under its compact C-encoded form and rendered once.
+
+Usage:
+    from prompt_template import compile_template, JsonCache
+
+    template = compile_template(prompt_text)
+    template.placeholders                      # ("title", "keyword", ...)
+    prompt = template.render({"title": "...", "keyword": "..."})
+
+    pretty_json = JsonCache(indent=2, ensure_ascii=False)
+    prompt = template.render(values, format_value=lambda v: pretty_json.dumps(v)
+                             if isinstance(v, (dict, list)) else str(v))
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Pattern, Tuple
+
+# {{variable}}
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+# {{variable}} or {variable}
+BRACE_PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}|\{(\w+)\}")
+
+
+class CompiledTemplate:
+    """A template split into literals[0], (name, literal)... segments."""
+
+    __slots__ = ("source", "literals", "names", "raw", "placeholders")
+
+    def __init__(self, source: str, pattern: Pattern = PLACEHOLDER_PATTERN):
+        self.source = source
+        literals, names, raw = [], [], []
+        position = 0
+        for match in pattern.finditer(source):
+            literals.append(source[position:match.start()])
+            names.append(next(group for group in match.groups() if group))
+            raw.append(match.group(0))
+            position = match.end()
+        literals.append(source[position:])
+        self.literals: Tuple[str, ...] = tuple(literals)
+        self.names: Tuple[str, ...] = tuple(names)
+        self.raw: Tuple[str, ...] = tuple(raw)
+        # Distinct placeholder names in first-appearance order
+        self.placeholders: Tuple[str, ...] = tuple(dict.fromkeys(names))
+
+    def render(
+        self,
+        values: Mapping[str, Any],
+        format_value: Callable[[Any], str] = str,
+        missing: Optional[str] = None,
+    ) -> str:
+        """Substitute every placeholder; each distinct value is formatted once."""
+        formatted: Dict[str, str] = {}
+        for name in self.placeholders:
+            if name in values:
+                formatted[name] = format_value(values[name])
+            elif missing is not None:
+                formatted[name] = missing
+
+        parts = [self.literals[0]]
+        for name, raw, literal in zip(self.names, self.raw, self.literals[1:]):
+            parts.append(formatted.get(name, raw))
+            parts.append(literal)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=128)
+def compile_template(source: str, pattern: Pattern = PLACEHOLDER_PATTERN) -> CompiledTemplate:
+    """Compile (or fetch the cached compilation of) a template."""
+    return CompiledTemplate(source, pattern)
+
+
+class JsonCache:
+    """
+    json.dumps with the given options, memoized by content.
+
+    Only indented output is cached: compact output is what the cache key
+    costs anyway, so it is returned directly.
+    """
+
+    def __init__(self, maxsize: int = 4096, **dumps_kwargs):
+        self.maxsize = maxsize
+        self.dumps_kwargs = dumps_kwargs
+        self._cached = dumps_kwargs.get("indent") is not None
+        self._cache: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def dumps(self, value: Any) -> str:
+        if not self._cached:
+            return json.dumps(value, **self.dumps_kwargs)
+
+        key = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        rendered = self._cache.get(key)
+        if rendered is not None:
+            self.hits += 1
+            return rendered
+
+        self.misses += 1
+        rendered = json.dumps(value, **self.dumps_kwargs)
+        if len(self._cache) >= self.maxsize:
+            del self._cache[next(iter(self._cache))]  # oldest entry
+        self._cache[key] = rendered
+        return rendered
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Early-Exit Relevance Cascade (Path A: M12 → M13 → M14 / M15 → M16)
+
+Path A decides a keyword's R/S/C/N label step by step, the same rules M12b
+applies in one call:
+
+    Step 1   M12  violates a hard constraint?     yes -> N
+    Step 2   M13  same product type?              yes -> Step 3a, no -> Step 3b
+    Step 3a  M14  same primary use?               R or N
+    Step 3b  M15  substitute (same need)?         yes -> S, no -> Step 4
+    Step 4   M16  used together?                  C or N
+
+Running each module over the whole dataset sends every keyword to all five
+modules. The cascade sends a keyword to the next module only while its label
+is still open: 1-4 calls instead of 5, one at a time per keyword, many
+keywords in flight. The step outputs are combined into the M12b output shape
+(`step1_hard_constraint` ... `step4_complementary`, `relevancy`), so cascade
+rows are scored against the M12b gold and written by the usual CSV/JSONL
+writers.
+
+The fused mode trades per-keyword calls for packed ones: keywords sharing a
+product context are packed (scripts/keyword_packing.py), M12 runs once per
+pack with its batch prompt, and the keywords it does not reject go to ONE
+call (prompts/modules/batch/path_a_fused_check_batch.md) that walks
+M13 -> M14 / M15 -> M16 per keyword. Its structured output nests each step
+under its module id with that module's own output schema (null when the step
+is not reached), so the same routing and combination apply. Two calls per
+pack instead of 1-5 per keyword; benchmarks/compare_path_a.py measures
+what that costs in accuracy.
+
+Usage:
+    python scripts/orchestrator.py run --module m12b --cascade --samples 200
+    python scripts/orchestrator.py run --module m12b --fused --samples 200
+
+    cascade = RelevanceCascade(runner, steps, parallel=20)   # steps: module -> (render, schema)
+    for key, record, output in cascade.run(with_record_ids(records)):
+        ...  # output in M12b shape, `_metrics` summed over the step calls
+    cascade.stats.report()
+
+    fused = FusedPathA.for_prompts(runner, render, size=50, parallel=20)   # render: (template, record) -> messages
+    fused.packer.budget = TokenBudget.for_model("gpt-4o-mini", FUSED_COMPLETION_PER_KEYWORD)
+    for key, record, output in fused.run(with_record_ids(records)):
+        ...
+"""
+
+import json
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import SCHEMAS_DIR
+from keyword_packing import BATCH_PROMPTS_DIR, DEFAULT_PACK_SIZE, KeywordPacker, Pack, unpack_output
+
+CASCADE_MODULES = ("m12", "m13", "m14", "m15", "m16")
+CASCADE_TARGET = "m12b"  # Records, gold and output shape
+
+STEP_LABELS = {"m12": "1", "m13": "2", "m14": "3a", "m15": "3b", "m16": "4"}
+
+# Fused mode: M12 batch prompt per pack, then M13-M16 in one call
+FUSED_MODULES = ("m13", "m14", "m15", "m16")
+FUSED_PROMPT_FILE = BATCH_PROMPTS_DIR / "path_a_fused_check_batch.md"
+FUSED_COMPLETION_PER_KEYWORD = 300  # Up to three step objects with short reasoning
+STEP_SCHEMAS_DIR = SCHEMAS_DIR / "single"
+
+# Summed over the step calls of a keyword
+SUMMED_METRICS = (
+    "duration", "llm_duration", "rate_limit_wait", "retries",
+    "prompt_tokens", "cached_tokens", "completion_tokens", "total_tokens", "estimated_cost",
+)
+
+
+def flag(output: dict, field: str, labels: str) -> bool:
+    """A step's yes/no answer: its relevancy label when set (what the module is scored on), else the boolean field."""
+    if output.get("relevancy") is not None:
+        return output["relevancy"] in tuple(labels)
+    return bool(output.get(field))
+
+
+def next_module(module_id: str, output: dict) -> Optional[str]:
+    """The module that decides next, or None once `output` settles the label."""
+    if module_id == "m12":
+        return None if flag(output, "violates_constraint", "N") else "m13"
+    if module_id == "m13":
+        return "m14" if output.get("same_type") else "m15"
+    if module_id == "m15":
+        return None if flag(output, "same_primary_use", "S") else "m16"
+    return None  # M14 and M16 always decide
+
+
+def final_label(module_id: str, output: dict) -> str:
+    """R/S/C/N of the step that ended the cascade."""
+    if module_id == "m12":
+        return "N"
+    if module_id == "m15":
+        return "S"
+    return output.get("relevancy") or "N"
+
+
+def combine(outputs: Dict[str, dict], exit_module: str) -> dict:
+    """Step outputs in the M12b output shape (steps not reached are None)."""
+    m12, m13 = outputs.get("m12"), outputs.get("m13")
+    use = outputs.get("m14") or outputs.get("m15")
+    m16 = outputs.get("m16")
+    violated = (m12 or {}).get("violated_constraint") or {}
+    return {
+        "step1_hard_constraint": m12 and {
+            "violated": flag(m12, "violates_constraint", "N"),
+            "violated_constraint": violated.get("attribute") if isinstance(violated, dict) else violated,
+            "reasoning": m12.get("reasoning", ""),
+        },
+        "step2_product_type": m13 and {
+            "same_type": bool(m13.get("same_type")),
+            "keyword_product_type": m13.get("keyword_product_type", ""),
+            "reasoning": m13.get("reasoning", ""),
+        },
+        "step3_primary_use": use and {
+            "same_use": flag(use, "same_primary_use", "RS"),
+            "reasoning": use.get("reasoning", ""),
+        },
+        "step4_complementary": m16 and {
+            "used_together": flag(m16, "used_together", "C"),
+            "relationship": m16.get("relationship"),
+            "reasoning": m16.get("reasoning", ""),
+        },
+        "relevancy": final_label(exit_module, outputs[exit_module]),
+        "confidence": outputs[exit_module].get("confidence"),
+        "exit_module": exit_module,
+    }
+
+
+def sum_metrics(metrics: List[dict]) -> dict:
+    summed = {name: sum(m.get(name) or 0 for m in metrics) for name in SUMMED_METRICS}
+    summed["cached"] = bool(metrics) and all(m.get("cached") for m in metrics)
+    return summed
+
+
+class CascadeStats:
+    """Calls and exits per step, against running every module on every keyword."""
+
+    def __init__(self):
+        self.records = 0
+        self.calls = {module_id: 0 for module_id in CASCADE_MODULES}
+        self.exits = {module_id: 0 for module_id in CASCADE_MODULES}
+        self.saved = {module_id: 0 for module_id in CASCADE_MODULES}
+        self.failed = 0
+
+    def add(self, modules_called: List[str], exit_module: Optional[str]) -> None:
+        self.records += 1
+        for module_id in modules_called:
+            self.calls[module_id] += 1
+        if exit_module is None:
+            self.failed += 1
+            return
+        self.exits[exit_module] += 1
+        self.saved[exit_module] += len(CASCADE_MODULES) - len(modules_called)
+
+    def summary(self) -> dict:
+        calls = sum(self.calls.values())
+        baseline = self.records * len(CASCADE_MODULES)
+        return {
+            "records": self.records,
+            "calls": calls,
+            "calls_without_cascade": baseline,
+            "calls_saved_rate": (baseline - calls) / baseline if baseline else 0,
+            "failed": self.failed,
+            "steps": {
+                module_id: {"calls": self.calls[module_id], "exits": self.exits[module_id],
+                            "calls_saved": self.saved[module_id]}
+                for module_id in CASCADE_MODULES
+            },
+        }
+
+    def report(self) -> List[str]:
+        summary = self.summary()
+        lines = [
+            f"Cascade: {summary['calls']} calls for {summary['records']} records "
+            f"({summary['calls_without_cascade']} without early exit, {summary['calls_saved_rate']:.1%} saved)",
+            f"  {'Step':<5} {'Module':<7} {'Calls':>7} {'Exits':>7} {'Calls saved':>12}",
+        ]
+        for module_id, step in summary["steps"].items():
+            lines.append(f"  {STEP_LABELS[module_id]:<5} {module_id:<7} {step['calls']:>7} "
+                         f"{step['exits']:>7} {step['calls_saved']:>12}")
+        if summary["failed"]:
+            lines.append(f"  Failed records: {summary['failed']} (error at some step)")
+        return lines
+
+
+Step = Tuple[Callable[[dict], List[dict]], Optional[dict]]  # (record -> messages, schema)
+
+
+class RelevanceCascade:
+    """Runs records through the cascade on the shared LLM engine."""
+
+    def __init__(self, runner, steps: Dict[str, Step], parallel: int = 5):
+        missing = [module_id for module_id in CASCADE_MODULES if module_id not in steps]
+        if missing:
+            raise ValueError(f"Cascade needs prompts for {', '.join(missing)}")
+        self.runner = runner  # orchestrator.LLMRunner
+        self.steps = steps
+        self.parallel = parallel
+        self.stats = CascadeStats()
+
+    def _submit(self, module_id: str, record: dict) -> Future:
+        render, schema = self.steps[module_id]
+        return self.runner.engine.submit(
+            self.runner.build_request(render(record), schema, metadata={"module": f"cascade:{module_id}"})
+        )
+
+    def run(self, records: Iterable[Tuple[str, dict]]) -> Iterator[Tuple[str, dict, dict]]:
+        """Yield (record id, record, output) as each record's label is settled."""
+        source = iter(records)
+        exhausted = False
+        # future -> (record id, record, module, step outputs, step metrics)
+        in_flight: Dict[Future, Tuple[str, dict, str, Dict[str, dict], List[dict]]] = {}
+
+        while True:
+            while not exhausted and len(in_flight) < self.parallel:
+                try:
+                    key, record = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[self._submit("m12", record)] = (key, record, "m12", {}, [])
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, record, module_id, outputs, metrics = in_flight.pop(future)
+                output = self.runner.to_output(future.result())
+                metrics.append(output.pop("_metrics", {}))
+                if "error" in output or output.get("parse_error"):
+                    self.stats.add(list(outputs) + [module_id], None)
+                    yield key, record, {**output, "failed_module": module_id, "_metrics": sum_metrics(metrics)}
+                    continue
+
+                outputs[module_id] = output
+                following = next_module(module_id, output)
+                if following:
+                    # Follow-ups reuse the finished call's slot, so started records finish first
+                    in_flight[self._submit(following, record)] = (key, record, following, outputs, metrics)
+                    continue
+                self.stats.add(list(outputs), module_id)
+                yield key, record, {**combine(outputs, module_id), "_metrics": sum_metrics(metrics)}
+
+
+# ============================================================================
+# Fused mode
+# ============================================================================
+
+def find_step_schema(module_id: str) -> Optional[Path]:
+    """prompts/json_schemas/single/{module_id}_*_schema*.json"""
+    matches = sorted(STEP_SCHEMAS_DIR.glob(f"{module_id}_*schema*.json"))
+    return matches[0] if matches else None
+
+
+def fused_schema() -> dict:
+    """
+    Structured output of the fused call, built from the M13-M16 output schemas.
+
+    {"results": [{"keyword": ..., "m13": {<M13 output>}, "m14": {<M14 output>} | null, ...}]}
+    """
+    steps = {}
+    for module_id in FUSED_MODULES:
+        path = find_step_schema(module_id)
+        if not path:
+            raise FileNotFoundError(f"No output schema for {module_id} in {STEP_SCHEMAS_DIR}")
+        step = json.loads(path.read_text(encoding="utf-8"))["json_schema"]["schema"]
+        # M13 always runs; later steps are null when the chain ends before them
+        steps[module_id] = step if module_id == FUSED_MODULES[0] else {"anyOf": [step, {"type": "null"}]}
+
+    item = {
+        "type": "object",
+        "properties": {"keyword": {"type": "string", "description": "The keyword being classified"}, **steps},
+        "required": ["keyword", *FUSED_MODULES],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "path_a_fused_batch_output",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"results": {"type": "array", "items": item}},
+                "required": ["results"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def route(fused: dict) -> Tuple[Dict[str, dict], Optional[str]]:
+    """Step outputs along the chain from M13, and the step that decided (None if a needed step is missing)."""
+    outputs = {}
+    module_id = FUSED_MODULES[0]
+    while True:
+        output = fused.get(module_id)
+        if not isinstance(output, dict):
+            return outputs, None
+        outputs[module_id] = output
+        following = next_module(module_id, output)
+        if following is None:
+            return outputs, module_id
+        module_id = following
+
+
+def is_failed(output: dict) -> bool:
+    return "error" in output or bool(output.get("parse_error"))
+
+
+class FusedStats:
+    """Calls per stage and exits per step, against one call per module per keyword."""
+
+    STAGES = ("m12", "fused")
+
+    def __init__(self):
+        self.records = 0
+        self.calls = {stage: 0 for stage in self.STAGES}
+        self.keywords = {stage: 0 for stage in self.STAGES}  # Records sent, summed over calls
+        self.exits = {module_id: 0 for module_id in CASCADE_MODULES}
+        self.failed = 0
+
+    def call(self, stage: str, records: int) -> None:
+        self.calls[stage] += 1
+        self.keywords[stage] += records
+
+    def add(self, exit_module: Optional[str]) -> None:
+        self.records += 1
+        if exit_module is None:
+            self.failed += 1
+        else:
+            self.exits[exit_module] += 1
+
+    def summary(self) -> dict:
+        return {
+            "records": self.records,
+            "calls": sum(self.calls.values()),
+            "calls_without_fusion": self.records * len(CASCADE_MODULES),
+            "failed": self.failed,
+            "stages": {
+                stage: {"calls": self.calls[stage],
+                        "records_per_call": self.keywords[stage] / self.calls[stage] if self.calls[stage] else 0}
+                for stage in self.STAGES
+            },
+            "exits": dict(self.exits),
+        }
+
+    def report(self) -> List[str]:
+        summary = self.summary()
+        lines = [
+            f"Fused: {summary['calls']} calls for {summary['records']} records "
+            f"({summary['calls_without_fusion']} with one call per module and keyword)",
+        ]
+        for stage, step in summary["stages"].items():
+            lines.append(f"  {stage:<6} {step['calls']:>6} calls, {step['records_per_call']:.1f} records/call")
+        lines.append("  Exits: " + ", ".join(f"{module_id} {count}" for module_id, count in summary["exits"].items()))
+        if summary["failed"]:
+            lines.append(f"  Failed records: {summary['failed']} (error in a packed call)")
+        return lines
+
+
+class FusedPathA:
+    """Path A in two packed calls per product context: M12, then M13-M16 fused."""
+
+    def __init__(
+        self,
+        runner,
+        packer: KeywordPacker,
+        m12_packer: KeywordPacker,
+        render: Callable[[str, dict], List[dict]],
+        parallel: int = 5,
+    ):
+        self.runner = runner  # orchestrator.LLMRunner
+        self.packer = packer  # Fused prompt; its budget sizes the packs of both calls
+        self.m12_packer = m12_packer
+        self.render = render  # (template, packed record) -> messages
+        self.parallel = parallel
+        self.schema = fused_schema()
+        self.m12_schema = (
+            json.loads(m12_packer.schema_path.read_text(encoding="utf-8")) if m12_packer.schema_path else None
+        )
+        self.stats = FusedStats()
+
+    @classmethod
+    def for_prompts(
+        cls,
+        runner,
+        render: Callable[[str, dict], List[dict]],
+        size: int = DEFAULT_PACK_SIZE,
+        parallel: int = 5,
+    ) -> "FusedPathA":
+        """Fused runner on the M12 batch prompt and path_a_fused_check_batch.md."""
+        m12_packer = KeywordPacker.for_module("m12", size)
+        if not m12_packer:
+            raise FileNotFoundError("No batch prompt for m12")
+        if not FUSED_PROMPT_FILE.exists():
+            raise FileNotFoundError(f"Fused prompt not found: {FUSED_PROMPT_FILE}")
+        template = FUSED_PROMPT_FILE.read_text(encoding="utf-8")
+        packer = KeywordPacker(template, size=size, prompt_path=FUSED_PROMPT_FILE)
+        return cls(runner, packer, m12_packer, render, parallel)
+
+    def missing_fields(self, record: dict) -> List[str]:
+        """Input fields either prompt needs that `record` lacks."""
+        return sorted(set(self.packer.missing_fields(record)) | set(self.m12_packer.missing_fields(record)))
+
+    def _submit(self, stage: str, template: str, schema: Optional[dict], pack: Pack) -> Future:
+        trace = {"module": f"fused:{stage}", "keywords": len(pack.members)}
+        request = self.runner.build_request(self.render(template, pack.as_record()), schema, pack.max_tokens, trace)
+        return self.runner.engine.submit(request)
+
+    def _failed(self, output: dict, module_id: str, metrics: List[dict]) -> dict:
+        self.stats.add(None)
+        return {**output, "failed_module": module_id, "_metrics": sum_metrics(metrics)}
+
+    def run(self, records: Iterable[Tuple[str, dict]]) -> Iterator[Tuple[str, dict, dict]]:
+        """Yield (record id, record, output) as each pack's labels are settled."""
+        packs = self.packer.pack(records)
+        exhausted = False
+        # future -> (stage, pack, M12 output per record id)
+        in_flight: Dict[Future, Tuple[str, Pack, Dict[str, dict]]] = {}
+
+        while True:
+            while not exhausted and len(in_flight) < self.parallel:
+                pack = next(packs, None)
+                if pack is None:
+                    exhausted = True
+                    break
+                in_flight[self._submit("m12", self.m12_packer.template, self.m12_schema, pack)] = ("m12", pack, {})
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, pack, m12_outputs = in_flight.pop(future)
+                self.stats.call(stage, len(pack.members))
+                outputs = unpack_output(pack, self.runner.to_output(future.result()))
+
+                if stage == "m12":
+                    # Rejected keywords are done; the rest go to the fused call
+                    open_pack = Pack(pack.context, max_tokens=pack.max_tokens)
+                    for (key, record), output in zip(pack.members, outputs):
+                        if is_failed(output):
+                            yield key, record, self._failed(output, "m12", [output.pop("_metrics", {})])
+                        elif flag(output, "violates_constraint", "N"):
+                            metrics = output.pop("_metrics", {})
+                            self.stats.add("m12")
+                            yield key, record, {**combine({"m12": output}, "m12"), "_metrics": sum_metrics([metrics])}
+                        else:
+                            open_pack.add(key, record)
+                            m12_outputs[key] = output
+                    if open_pack.members:
+                        # Reuses the finished call's slot, so started packs finish first
+                        in_flight[self._submit("fused", self.packer.template, self.schema, open_pack)] = (
+                            "fused", open_pack, m12_outputs,
+                        )
+                    continue
+
+                for (key, record), output in zip(pack.members, outputs):
+                    m12 = m12_outputs[key]
+                    metrics = [m12.pop("_metrics", {}), output.pop("_metrics", {})]
+                    if is_failed(output):
+                        yield key, record, self._failed(output, "fused", metrics)
+                        continue
+                    steps, exit_module = route(output)
+                    if exit_module is None:
+                        incomplete = {"error": "Fused response stops before the deciding step",
+                                      "error_type": "fused_incomplete"}
+                        yield key, record, self._failed(incomplete, "fused", metrics)
+                        continue
+                    self.stats.add(exit_module)
+                    yield key, record, {**combine({"m12": m12, **steps}, exit_module), "_metrics": sum_metrics(metrics)}
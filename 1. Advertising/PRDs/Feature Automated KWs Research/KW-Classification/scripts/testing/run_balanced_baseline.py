@@ -17,6 +17,11 @@ from pathlib import Path
 from datetime import datetime
 from collections import Counter, defaultdict
 from typing import Optional
+
+# Add scripts folder to path for prompt_template import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from prompt_template import compile_template
+
 from dotenv import load_dotenv
 
 # Load environment
@@ -352,15 +357,12 @@ def get_balanced_samples(records: list[dict], config: dict, percentage: float =
 
 def fill_template(template: str, inputs: dict) -> str:
     """Fill mustache-style template with inputs."""
-    result = template
-    for key, value in inputs.items():
-        placeholder = "{{" + key + "}}"
+    def format_value(value):
         if isinstance(value, (dict, list)):
-            value_str = json.dumps(value, ensure_ascii=False)
-        else:
-            value_str = str(value) if value is not None else ""
-        result = result.replace(placeholder, value_str)
-    return result
+            return json.dumps(value, ensure_ascii=False)
+        return str(value) if value is not None else ""
+
+    return compile_template(template).render(inputs, format_value)
 
 
 def call_openai(prompt: str, schema: dict, model: str = "gpt-4o-mini", temperature: float = 0.0, max_tokens: int = 2000) -> dict:
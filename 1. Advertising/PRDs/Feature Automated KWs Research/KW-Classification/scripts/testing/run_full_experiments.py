@@ -7,10 +7,16 @@ This script runs 50-100 samples per module and creates Braintrust experiments.
 import json
 import os
 import random
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
+
+# Add scripts folder to path for prompt_template import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from prompt_template import JsonCache, compile_template
+
 from dotenv import load_dotenv
 
 # Load environment variables - look in project root
@@ -241,17 +247,18 @@ def load_samples(dataset_file: str, n_samples: Optional[int] = None) -> list:
     return records
 
 
+# Pretty JSON for nested inputs, cached across records
+PRETTY_JSON = JsonCache(indent=2, ensure_ascii=False)
+
+
 def fill_template(template: str, input_data: dict) -> str:
     """Fill placeholders in prompt template."""
-    result = template
-    for key, value in input_data.items():
-        placeholder = "{{" + key + "}}"
+    def format_value(value):
         if isinstance(value, (list, dict)):
-            value_str = json.dumps(value, indent=2, ensure_ascii=False)
-        else:
-            value_str = str(value) if value else ""
-        result = result.replace(placeholder, value_str)
-    return result
+            return PRETTY_JSON.dumps(value)
+        return str(value) if value else ""
+
+    return compile_template(template).render(input_data, format_value)
 
 
 def call_llm(prompt: str, model: str = "gpt-4o-mini") -> tuple[str, dict]:
@@ -9,6 +9,11 @@ import time
 import sys
 from pathlib import Path
 from datetime import datetime
+
+# Add scripts folder to path for prompt_template import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from prompt_template import compile_template
+
 from dotenv import load_dotenv
 
 # Load API key
@@ -72,11 +77,7 @@ def deduplicate_list(items: list) -> list:
 
 
 def fill_template(template: str, inputs: dict) -> str:
-    result = template
-    for key, value in inputs.items():
-        placeholder = "{{" + key + "}}"
-        result = result.replace(placeholder, str(value) if value else "")
-    return result
+    return compile_template(template).render(inputs, lambda value: str(value) if value else "")
 
 
 def call_openai(prompt: str, schema: dict, model: str, temperature: float) -> dict:
@@ -19,6 +19,10 @@ from typing import Dict, List
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+# Add scripts folder to path for prompt_template import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from prompt_template import JsonCache, compile_template
+
 from dotenv import load_dotenv
 load_dotenv(PROJECT_ROOT / ".env")
 
@@ -50,16 +54,17 @@ def load_samples(n: int = 10) -> List[Dict]:
     return samples
 
 
+# Pretty JSON for nested inputs, cached across records
+PRETTY_JSON = JsonCache(indent=2, ensure_ascii=False)
+
+
 def fill_template(template: str, input_data: dict) -> str:
-    result = template
-    for key, value in input_data.items():
-        placeholder = "{{" + key + "}}"
+    def format_value(value):
         if isinstance(value, (list, dict)):
-            value_str = json.dumps(value, indent=2, ensure_ascii=False)
-        else:
-            value_str = str(value) if value else ""
-        result = result.replace(placeholder, value_str)
-    return result
+            return PRETTY_JSON.dumps(value)
+        return str(value) if value else ""
+
+    return compile_template(template).render(input_data, format_value)
 
 
 def call_llm(prompt: str) -> Dict:
@@ -8,6 +8,11 @@ import json
 import random
 import sys
 from pathlib import Path
+
+# Add scripts folder to path for prompt_template import
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from prompt_template import compile_template
+
 from dotenv import load_dotenv
 
 # Load API key
@@ -57,16 +62,13 @@ def load_jsonl(filepath: Path) -> list:
 
 def fill_template(template: str, inputs: dict) -> str:
     """Fill mustache-style template with inputs."""
-    result = template
-    for key, value in inputs.items():
-        placeholder = "{{" + key + "}}"
+    def format_value(value):
         # Convert objects/arrays to JSON string
         if isinstance(value, (dict, list)):
-            value_str = json.dumps(value, ensure_ascii=False)
-        else:
-            value_str = str(value) if value else ""
-        result = result.replace(placeholder, value_str)
-    return result
+            return json.dumps(value, ensure_ascii=False)
+        return str(value) if value else ""
+
+    return compile_template(template).render(inputs, format_value)
 
 
 def call_openai(prompt: str, schema: dict, model: str = "gpt-4o-mini", temperature: float = 0.0) -> dict:
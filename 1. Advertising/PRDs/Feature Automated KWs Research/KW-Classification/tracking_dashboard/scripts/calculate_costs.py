@@ -3,11 +3,15 @@
 Calculate experiment costs based on token usage.
 
 Reads CSV files and extracts token counts from metrics column,
-then calculates costs using model pricing.
+then calculates costs using the project's pricing registry
+(scripts/pricing.py, prices in scripts/config.py MODEL_PRICING).
+Experiments on a model missing from the registry are marked unpriced
+and count $0; the summary lists those models.
 """
 
 import csv
 import json
+import sys
 import yaml
 from pathlib import Path
 from typing import Dict, Optional
@@ -19,38 +23,19 @@ EXPERIMENT_RESULTS_DIR = PROJECT_ROOT / "experiment_results"
 DATA_DIR = SCRIPT_DIR.parent / "data"
 DASHBOARDS_DIR = SCRIPT_DIR.parent / "dashboards"
 
-# Model pricing per million tokens (input, output)
-MODEL_PRICING = {
-    'gpt-4o-mini': {'input': 0.15, 'output': 0.60},
-    'gpt-4o': {'input': 2.50, 'output': 10.00},
-    'gpt-5': {'input': 1.25, 'output': 10.00},
-    'gemini-2.0-flash': {'input': 0.10, 'output': 0.40},
-    'gemini-2.5-pro': {'input': 1.25, 'output': 5.00},
-    'claude-sonnet-4-20250514': {'input': 3.00, 'output': 15.00},
-    'claude-sonnet-4': {'input': 3.00, 'output': 15.00},
-}
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+from pricing import model_price, normalize_model as registry_model, pricing_table, token_cost
 
 # Correction multiplier for estimated costs (based on comparison with actual billing)
 # Token averages are from GPT-4o-mini which had shorter prompts
 # Real prompts for Claude/GPT-5 tend to be ~2x longer
 ESTIMATION_MULTIPLIER = 2.0
 
-# Model name normalization
-MODEL_ALIASES = {
-    'gpt4omini': 'gpt-4o-mini',
-    'gpt4o': 'gpt-4o',
-    'gpt5': 'gpt-5',
-    'gemini20flash': 'gemini-2.0-flash',
-    'gemini25pro': 'gemini-2.5-pro',
-    'claudesonnet420250514': 'claude-sonnet-4-20250514',
-    'claudesonnet4': 'claude-sonnet-4',
-}
 
 
 def normalize_model(model: str) -> str:
-    """Normalize model name to standard format."""
-    model_lower = model.lower().replace('-', '').replace('.', '').replace(' ', '')
-    return MODEL_ALIASES.get(model_lower, model)
+    """Normalize model name to its pricing registry name (unchanged if not priced)."""
+    return registry_model(model) or model
 
 
 def extract_model_from_filename(filename: str) -> str:
@@ -83,18 +68,9 @@ def extract_module_from_path(csv_path: Path) -> str:
     return 'unknown'
 
 
-def calculate_cost(prompt_tokens: int, completion_tokens: int, model: str) -> float:
-    """Calculate cost for given token counts and model."""
-    normalized = normalize_model(model)
-    pricing = MODEL_PRICING.get(normalized)
-
-    if not pricing:
-        return 0.0
-
-    input_cost = (prompt_tokens / 1_000_000) * pricing['input']
-    output_cost = (completion_tokens / 1_000_000) * pricing['output']
-
-    return input_cost + output_cost
+def calculate_cost(prompt_tokens: int, completion_tokens: int, model: str, cached_tokens: int = 0) -> float:
+    """Calculate cost for given token counts and model (0 for models without a price)."""
+    return token_cost(model, prompt_tokens, completion_tokens, cached_tokens)
 
 
 def process_csv_file(csv_path: Path) -> Optional[Dict]:
@@ -105,6 +81,8 @@ def process_csv_file(csv_path: Path) -> Optional[Dict]:
     total_prompt_tokens = 0
     total_completion_tokens = 0
     total_estimated_cost = 0.0
+    # Tokens actually billed: response-cache hits and deduplicated copies are free
+    billed = {'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
     records_with_tokens = 0
     records_with_cost = 0
     total_records = 0
@@ -134,6 +112,10 @@ def process_csv_file(csv_path: Path) -> Optional[Dict]:
                         total_prompt_tokens += prompt_tokens
                         total_completion_tokens += completion_tokens
                         records_with_tokens += 1
+                        if not (metrics.get('cached') or metrics.get('deduplicated')):
+                            billed['prompt_tokens'] += prompt_tokens
+                            billed['cached_tokens'] += metrics.get('cached_tokens', 0) or 0
+                            billed['completion_tokens'] += completion_tokens
 
                     if estimated_cost:
                         total_estimated_cost += estimated_cost
@@ -161,10 +143,18 @@ def process_csv_file(csv_path: Path) -> Optional[Dict]:
         model = normalize_model(model) if model else 'unknown'
 
         # Calculate cost from tokens if we have them
-        calculated_cost = calculate_cost(total_prompt_tokens, total_completion_tokens, model)
-
-        # Use estimated_cost if available, otherwise calculated
-        final_cost = total_estimated_cost if records_with_cost > 0 else calculated_cost
+        calculated_cost = calculate_cost(
+            billed['prompt_tokens'], billed['completion_tokens'], model, billed['cached_tokens']
+        )
+
+        # Token-based cost at the model's price; the run's own estimated_cost only for
+        # runs without token counts. An unpriced model is not guessed at (older runs
+        # estimated every model as gpt-4o-mini): it costs 0 and is listed as unpriced.
+        unpriced = model_price(model) is None
+        if unpriced or records_with_tokens:
+            final_cost = calculated_cost
+        else:
+            final_cost = total_estimated_cost if records_with_cost > 0 else calculated_cost
 
         return {
             'file': csv_path.name,
@@ -174,10 +164,12 @@ def process_csv_file(csv_path: Path) -> Optional[Dict]:
             'records_with_tokens': records_with_tokens,
             'prompt_tokens': total_prompt_tokens,
             'completion_tokens': total_completion_tokens,
+            'cached_tokens': billed['cached_tokens'],
             'total_tokens': total_prompt_tokens + total_completion_tokens,
             'estimated_cost': round(total_estimated_cost, 4),
             'calculated_cost': round(calculated_cost, 4),
             'final_cost': round(final_cost, 4),
+            'unpriced': unpriced,
         }
 
     except Exception as e:
@@ -285,6 +277,7 @@ def generate_cost_summary(costs: list) -> dict:
                 'prompt_tokens': 0,
                 'completion_tokens': 0,
                 'total_cost': 0.0,
+                'unpriced': c['unpriced'],
             }
         by_model[model]['experiments'] += 1
         if c.get('is_estimated', False):
@@ -318,6 +311,7 @@ def generate_cost_summary(costs: list) -> dict:
         'total_experiments': len(costs),
         'total_tokens': total_tokens,
         'total_cost': round(total_cost, 2),
+        'unpriced_models': sorted(model for model, data in by_model.items() if data['unpriced']),
         'generated_at': datetime.now().isoformat(),
     }
 
@@ -334,7 +328,7 @@ def save_costs_data(costs: list, summary: dict):
 const costData = {{
   experiments: {json.dumps(costs, indent=2)},
   summary: {json.dumps(summary, indent=2)},
-  pricing: {json.dumps(MODEL_PRICING, indent=2)}
+  pricing: {json.dumps(pricing_table(), indent=2)}
 }};
 '''
 
@@ -358,12 +352,15 @@ def main():
 
     print("\n--- Cost by Model ---")
     for model, data in sorted(summary['by_model'].items()):
-        print(f"  {model:25} {data['experiments']:3} exp, {data['total_tokens']:>12,} tokens, ${data['total_cost']:.2f}")
+        cost = 'unpriced' if data['unpriced'] else f"${data['total_cost']:.2f}"
+        print(f"  {model:25} {data['experiments']:3} exp, {data['total_tokens']:>12,} tokens, {cost}")
 
     print(f"\n--- Total ---")
     print(f"  Experiments: {summary['total_experiments']}")
     print(f"  Tokens: {summary['total_tokens']:,}")
     print(f"  Cost: ${summary['total_cost']:.2f}")
+    if summary['unpriced_models']:
+        print(f"  Unpriced (not in the cost): {', '.join(summary['unpriced_models'])}")
 
     save_costs_data(costs, summary)
 